@@ -0,0 +1,299 @@
+import os
+import uuid
+from collections import Counter
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from itertools import repeat
+from typing import BinaryIO, Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from .loaders import LOADER_EXECUTEMANY, load_records, resolve_loader, upsert_records
+
+# Columnas que debe traer todo CSV de catálogo
+REQUIRED_COLUMNS = [
+    "sku", "name", "description", "category", "manufacturer",
+    "storage_type", "min_shelf_life_months", "expiration_date",
+    "batch_number", "cold_chain_required", "certifications",
+    "commercialization_auth", "country_regulations", "unit_price",
+    "purchase_conditions", "delivery_time_hours", "external_code",
+    "import_id"
+]
+
+# Columnas del CSV que se copian tal cual a products_stg
+TEXT_COLUMNS = [
+    "sku", "name", "description", "category", "manufacturer",
+    "storage_type", "batch_number", "certifications",
+    "commercialization_auth", "country_regulations",
+    "purchase_conditions", "external_code",
+]
+INT_COLUMNS = ["min_shelf_life_months", "delivery_time_hours"]
+# Columnas NOT NULL en products_stg: filas sin estos valores se rechazan
+NOT_NULL_COLUMNS = ["sku", "name"]
+TRUE_VALUES = ["true", "1", "yes", "1.0"]
+# Columnas de contenido de products_stg que salen de normalize_chunk (entran al content_hash)
+CONTENT_COLUMNS = TEXT_COLUMNS + ["cold_chain_required", "expiration_date"] + INT_COLUMNS + ["unit_price"]
+STAGING_COLUMNS = CONTENT_COLUMNS + ["content_hash"]
+
+# Precio decimal, opcionalmente en notación científica ("1e3"); se parsea a centavos
+PRICE_PATTERN = r"^\s*(?P<sign>[-+]?)(?P<whole>\d*)(?:\.(?P<frac>\d*))?(?:[eE](?P<exp>[-+]?\d+))?\s*$"
+# DECIMAL(12,2): hasta 10 dígitos enteros
+PRICE_MAX_WHOLE_DIGITS = 10
+
+DEFAULT_CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", "5000"))
+
+
+class MissingColumnsError(ValueError):
+    """El CSV no trae todas las columnas de REQUIRED_COLUMNS."""
+
+    def __init__(self, missing):
+        self.missing = missing
+        super().__init__(f"Faltan columnas en el CSV: {missing}")
+
+
+def iter_csv_chunks(source: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Lee el CSV por bloques de `chunk_size` filas sin cargarlo completo en memoria.
+    Todas las columnas se leen como texto para que la normalización sea
+    la misma en todos los bloques (sin inferencia de tipos por bloque).
+    """
+    reader = pd.read_csv(source, sep=",", encoding="utf-8", dtype=str, chunksize=chunk_size)
+    with reader:
+        for chunk in reader:
+            missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+            if missing:
+                raise MissingColumnsError(missing)
+            yield chunk
+
+
+def normalize_bool(values: pd.Series) -> pd.Series:
+    """true/1/yes (sin importar mayúsculas) -> True; cualquier otro valor o vacío -> False."""
+    lowered = values.astype("string").str.strip().str.lower()
+    return lowered.isin(TRUE_VALUES).astype(bool)
+
+
+def parse_price_cents(values: pd.Series) -> pd.Series:
+    """
+    Parsea precios a centavos (entero escalado x100) sin pasar por float ni
+    Decimal por celda. Redondea a 2 decimales (mitad hacia arriba) como
+    DECIMAL(12,2). Los valores inválidos, vacíos o fuera de rango quedan en
+    <NA>. La notación científica ("1e3", "1e-05"), que también aceptaba el
+    parseo con Decimal, se resuelve con Decimal solo en esas celdas.
+    """
+    text = values.astype("string")
+    parts = text.str.extract(PRICE_PATTERN)
+    whole = parts["whole"].fillna("")
+    frac = parts["frac"].fillna("")
+    valid = parts["sign"].notna() & ((whole.str.len() > 0) | (frac.str.len() > 0))
+    scientific = valid & parts["exp"].notna()
+    plain = valid & ~scientific & (whole.str.len() <= PRICE_MAX_WHOLE_DIGITS)
+
+    cents = pd.Series(pd.NA, index=values.index, dtype="Int64")
+    if plain.any():
+        whole = whole[plain].replace("", "0").astype("int64")
+        frac = frac[plain].str.pad(3, side="right", fillchar="0")
+        parsed = whole * 100 + frac.str[:2].astype("int64") + (frac.str[2] >= "5").astype("int64")
+        cents[plain] = np.where(parts["sign"][plain] == "-", -parsed, parsed)
+    if scientific.any():
+        cents[scientific] = text[scientific].map(_scientific_to_cents).astype("Int64")
+    return cents
+
+
+def _scientific_to_cents(value: str):
+    try:
+        cents = (Decimal(value.strip()) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        return pd.NA
+    return int(cents) if abs(cents) < 10 ** (PRICE_MAX_WHOLE_DIGITS + 2) else pd.NA
+
+
+def normalize_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza un bloque con operaciones vectorizadas (sin callbacks por celda).
+    Devuelve un DataFrame nuevo con las columnas de STAGING_COLUMNS más
+    `unit_price_cents` (el precio como entero, usado para el resumen).
+    """
+    out = df[TEXT_COLUMNS].copy()
+    for col in TEXT_COLUMNS:
+        # Los vacíos quedan siempre como None para que el hash sea estable
+        out[col] = _as_text(out[col]).where(out[col].notna(), None)
+
+    out["cold_chain_required"] = normalize_bool(df["cold_chain_required"])
+
+    out["expiration_date"] = pd.to_datetime(df["expiration_date"], errors="coerce").dt.date
+
+    for col in INT_COLUMNS:
+        out[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+
+    cents = parse_price_cents(df["unit_price"])
+    out["unit_price_cents"] = cents
+    # cents / 100 en float no es exacto (0.29 no tiene representación binaria),
+    # pero es el float más cercano: con hasta 12 dígitos significativos su
+    # forma decimal más corta es el valor original y DECIMAL(12,2) lo guarda
+    # exacto. Cálculos sobre el precio usan unit_price_cents, no este float.
+    out["unit_price"] = cents.astype("Float64") / 100
+
+    out["content_hash"] = content_hash(out)
+    return out
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    """
+    Columna como texto. Si pandas infirió números (lectura sin dtype=str), los
+    enteros que leyó como float vuelven a su forma original ("123", no "123.0").
+    """
+    if values.dtype == object:
+        return values
+    if pd.api.types.is_float_dtype(values):
+        present = values.dropna()
+        if (present % 1 == 0).all():
+            return values.astype("Int64").astype(str)
+    return values.astype(str)
+
+
+def content_hash(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash de 64 bits (con signo, para BIGINT) del contenido normalizado de cada fila.
+    Se calcula sobre la forma en texto de cada valor: no depende del dtype con que
+    llegó la columna (object/Int64/float), así ambos modos de carga coinciden.
+    """
+    hashed = pd.util.hash_pandas_object(df[CONTENT_COLUMNS].astype("string"), index=False)
+    return hashed.to_numpy().view("int64")
+
+
+def chunk_to_records(df: pd.DataFrame, created_by: str, import_id: Optional[uuid.UUID] = None) -> list:
+    """
+    Convierte un bloque normalizado en dicts listos para un INSERT masivo
+    (NaN/NA -> None). Sin `import_id` se conserva la columna import_id del bloque.
+    Los dicts se arman desde los arrays de cada columna (evita el boxing
+    celda a celda de DataFrame.to_dict).
+    """
+    columns = STAGING_COLUMNS if import_id is not None else STAGING_COLUMNS + ["import_id"]
+    values = df[columns]
+    values = values.astype(object).where(values.notna(), None)
+    keys = columns + ["created_by"]
+    arrays = [values[col].tolist() for col in columns]
+    arrays.append(repeat(created_by, len(values)))
+    if import_id is not None:
+        keys.append("import_id")
+        arrays.append(repeat(import_id, len(values)))
+    return [dict(zip(keys, row)) for row in zip(*arrays)]
+
+
+def split_rejected(df: pd.DataFrame, unique_sku: bool = False):
+    """
+    Separa las filas sin valores obligatorios. Con `unique_sku` también
+    descarta los SKU repetidos dentro del bloque (queda la última aparición),
+    que un mismo INSERT ... ON CONFLICT no puede aplicar dos veces.
+    Devuelve (válidas, cantidad_rechazadas).
+    """
+    valid = df[df[NOT_NULL_COLUMNS].notna().all(axis=1)]
+    if unique_sku:
+        valid = valid.drop_duplicates("sku", keep="last")
+    return valid, len(df) - len(valid)
+
+
+def write_records(db: Session, records: list, loader: str, upsert: bool = False) -> dict:
+    """Escribe un bloque (INSERT o upsert por SKU) y devuelve los conteos inserted/updated/unchanged."""
+    if upsert:
+        return upsert_records(db, records)
+    inserted = load_records(db, records, loader) if records else 0
+    return {"inserted": inserted, "updated": 0, "unchanged": 0}
+
+
+class ImportSummary:
+    """Acumula el resumen de la importación bloque a bloque."""
+
+    def __init__(self):
+        self.total_products = 0
+        self.rows_rejected = 0
+        self.rows_inserted = 0
+        self.rows_updated = 0
+        self.rows_unchanged = 0
+        self.categories_count = Counter()
+        self.cold_chain_required_count = 0
+        self._price_cents_sum = 0
+        self._price_count = 0
+
+    @property
+    def rows_parsed(self) -> int:
+        return self.total_products + self.rows_rejected
+
+    def update(self, df: pd.DataFrame, rejected: int = 0, counts: Optional[dict] = None):
+        """
+        Suma un bloque ya escrito (`df`), las filas rechazadas del mismo bloque
+        y los conteos de write_records (por defecto, todo `df` insertado).
+        """
+        counts = counts or {"inserted": len(df), "updated": 0, "unchanged": 0}
+        self.rows_rejected += rejected
+        self.rows_inserted += counts["inserted"]
+        self.rows_updated += counts["updated"]
+        self.rows_unchanged += counts["unchanged"]
+        self.total_products += len(df)
+        for category, count in df["category"].value_counts(dropna=False).items():
+            self.categories_count[None if pd.isna(category) else category] += int(count)
+        self.cold_chain_required_count += int(df["cold_chain_required"].sum())
+        cents = df["unit_price_cents"].dropna()
+        self._price_cents_sum += int(cents.sum())
+        self._price_count += len(cents)
+
+    @property
+    def avg_unit_price(self) -> float:
+        if not self._price_count:
+            return 0.0
+        return round(self._price_cents_sum / self._price_count / 100, 2)
+
+    def to_dict(self) -> dict:
+        return {
+            "total_products": self.total_products,
+            "categories_count": dict(self.categories_count),
+            "cold_chain_required_count": self.cold_chain_required_count,
+            "avg_unit_price": self.avg_unit_price,
+        }
+
+
+def ingest_stream(
+    db: Session,
+    source: BinaryIO,
+    created_by: str = "system",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    import_id: Optional[uuid.UUID] = None,
+    loader: Optional[str] = None,
+    on_chunk: Optional[Callable[[ImportSummary], None]] = None,
+    upsert: bool = False,
+) -> dict:
+    """
+    Ingresa el CSV de `source` en products_stg bloque a bloque: cada bloque se
+    normaliza y se carga con el backend `loader` (COPY o INSERT por lotes).
+    Las filas sin sku/name se rechazan y se cuentan en vez de abortar la carga.
+    La memoria usada depende de `chunk_size`, no del tamaño del archivo.
+
+    Con `upsert` los SKU existentes se actualizan (INSERT ... ON CONFLICT)
+    solo si su contenido cambió; COPY no admite ON CONFLICT, así que en ese
+    modo siempre se usa INSERT por lotes.
+
+    No hace commit: el llamador decide la transacción. `on_chunk` se invoca
+    después de cargar cada bloque con el resumen acumulado (progreso).
+    """
+    import_id = import_id or uuid.uuid4()
+    loader = LOADER_EXECUTEMANY if upsert else resolve_loader(db, loader)
+    summary = ImportSummary()
+
+    for chunk in iter_csv_chunks(source, chunk_size):
+        valid, rejected = split_rejected(normalize_chunk(chunk), unique_sku=upsert)
+        counts = write_records(db, chunk_to_records(valid, created_by, import_id), loader, upsert)
+        summary.update(valid, rejected, counts)
+        if on_chunk:
+            on_chunk(summary)
+
+    return {
+        "import_id": import_id,
+        "loader": loader,
+        "rows_parsed": summary.rows_parsed,
+        "rows_inserted": summary.rows_inserted,
+        "rows_updated": summary.rows_updated,
+        "rows_unchanged": summary.rows_unchanged,
+        "rows_rejected": summary.rows_rejected,
+        "summary": summary.to_dict(),
+    }
@@ -0,0 +1,273 @@
+import datetime
+import json
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Optional
+
+from sqlalchemy import func, or_, update
+
+from . import pipeline
+from .database import SessionLocal
+from .ingest import DEFAULT_CHUNK_SIZE, ingest_stream
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# Estados de una importación asíncrona
+JOB_PENDING = "PENDING"
+JOB_RUNNING = "RUNNING"
+JOB_COMPLETED = "COMPLETED"
+JOB_FAILED = "FAILED"
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))
+INGEST_SPOOL_DIR = os.environ.get("INGEST_SPOOL_DIR") or tempfile.gettempdir()
+SPOOL_COPY_BUFSIZE = 1024 * 1024
+# Cada proceso renueva heartbeat_at de sus importaciones activas cada
+# JOB_HEARTBEAT_SECONDS; una activa sin latido en JOB_STALE_SECONDS quedó
+# huérfana (su proceso murió) y se marca FAILED
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "120"))
+# Identifica a este proceso como dueño de sus importaciones (varios workers/réplicas por base)
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Pool de workers compartido por el proceso; las sesiones se abren con
+# session_factory (reemplazable en tests).
+executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest-job")
+session_factory = SessionLocal
+# Etapas posteriores a la ingesta en modo pipeline (reemplazable en tests)
+stage_factory = pipeline.http_stages
+
+
+def spool_upload(source: BinaryIO) -> str:
+    """Copia el archivo subido a disco por bloques (sin cargarlo en memoria) y devuelve la ruta."""
+    source.seek(0)
+    with tempfile.NamedTemporaryFile(
+        delete=False, dir=INGEST_SPOOL_DIR, prefix="import_", suffix=".csv"
+    ) as spool:
+        shutil.copyfileobj(source, spool, SPOOL_COPY_BUFSIZE)
+        return spool.name
+
+
+def create_job(file_name: Optional[str], created_by: str, loader: str) -> uuid.UUID:
+    """Registra la importación en estado PENDING y devuelve su import_id."""
+    db = session_factory()
+    try:
+        job = ImportJob(
+            import_id=uuid.uuid4(),
+            status=JOB_PENDING,
+            file_name=file_name,
+            created_by=created_by,
+            loader=loader,
+            owner=INSTANCE_ID,
+            heartbeat_at=datetime.datetime.utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        return job.import_id
+    finally:
+        db.close()
+
+
+def submit_job(
+    import_id: uuid.UUID,
+    path: str,
+    created_by: str,
+    chunk_size: int,
+    loader: str,
+    upsert: bool = False,
+    pipelined: bool = False,
+    authorization: Optional[str] = None,
+) -> Future:
+    stages = stage_factory(import_id, authorization) if pipelined else None
+    return executor.submit(run_job, import_id, path, created_by, chunk_size, loader, upsert, stages)
+
+
+def run_job(
+    import_id: uuid.UUID,
+    path: str,
+    created_by: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    loader: Optional[str] = None,
+    upsert: bool = False,
+    stages: Optional[list] = None,
+):
+    """
+    Procesa el CSV en disco. A diferencia del modo síncrono, cada bloque se
+    confirma junto con el progreso del job, para que /imports/{import_id} lo
+    vea mientras avanza. Si falla, el job queda FAILED con las filas ya
+    confirmadas en rows_inserted (identificables por import_id).
+
+    Con `stages` (modo pipeline) cada bloque confirmado pasa a las etapas
+    validate/upsert mientras se parsea el siguiente; el job termina cuando
+    todas las etapas vaciaron sus colas.
+    """
+    db = session_factory()
+    flow = pipeline.Pipeline(stages) if stages else None
+    try:
+        job = db.get(ImportJob, import_id)
+        job.status = JOB_RUNNING
+        job.started_at = job.heartbeat_at = datetime.datetime.utcnow()
+        db.commit()
+
+        def on_chunk(summary):
+            loaded = summary.rows_inserted + summary.rows_updated - job.rows_inserted - job.rows_updated
+            job.rows_parsed = summary.rows_parsed
+            job.rows_inserted = summary.rows_inserted
+            job.rows_updated = summary.rows_updated
+            job.rows_unchanged = summary.rows_unchanged
+            job.rows_rejected = summary.rows_rejected
+            job.heartbeat_at = datetime.datetime.utcnow()
+            db.commit()
+            if flow:
+                flow.submit(loaded)
+
+        if flow:
+            pipeline.running[import_id] = flow.start()
+
+        try:
+            with open(path, "rb") as source:
+                result = ingest_stream(
+                    db,
+                    source,
+                    created_by=created_by,
+                    chunk_size=chunk_size,
+                    import_id=import_id,
+                    loader=loader,
+                    on_chunk=on_chunk,
+                    upsert=upsert,
+                )
+            job.summary = json.dumps(result["summary"], default=str)
+            job.status = JOB_COMPLETED
+        except Exception as e:
+            db.rollback()
+            logger.exception("Importación %s falló", import_id)
+            job.status = JOB_FAILED
+            job.error = str(e)
+        if flow:
+            metrics = flow.close()
+            job.pipeline_metrics = json.dumps(metrics)
+            if metrics["error"] and job.status == JOB_COMPLETED:
+                job.status = JOB_FAILED
+                job.error = metrics["error"]
+        job.finished_at = datetime.datetime.utcnow()
+        db.commit()
+    finally:
+        if flow:
+            pipeline.running.pop(import_id, None)
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def heartbeat() -> int:
+    """Renueva heartbeat_at de las importaciones activas de este proceso. Devuelve cuántas."""
+    db = session_factory()
+    try:
+        result = db.execute(
+            update(ImportJob)
+            .where(ImportJob.owner == INSTANCE_ID, ImportJob.status.in_([JOB_PENDING, JOB_RUNNING]))
+            .values(heartbeat_at=datetime.datetime.utcnow())
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+def fail_interrupted_jobs(stale_after: float = JOB_STALE_SECONDS) -> int:
+    """
+    Importaciones PENDING o RUNNING de otro proceso cuyo último latido tiene
+    más de `stale_after` segundos: su dueño murió (el executor se cierra sin
+    esperar y su cola vive en memoria), así que nadie las va a terminar. Se
+    marcan FAILED para que /imports/{import_id} no las muestre en curso para
+    siempre; no se reencolan porque el CSV estaba en un archivo temporal.
+    Las de procesos vivos (otros workers o réplicas) no se tocan. Devuelve
+    cuántas se marcaron.
+    """
+    now = datetime.datetime.utcnow()
+    last_seen = func.coalesce(ImportJob.heartbeat_at, ImportJob.started_at, ImportJob.created_at)
+    db = session_factory()
+    try:
+        result = db.execute(
+            update(ImportJob)
+            .where(
+                ImportJob.status.in_([JOB_PENDING, JOB_RUNNING]),
+                or_(ImportJob.owner.is_(None), ImportJob.owner != INSTANCE_ID),
+                or_(last_seen.is_(None), last_seen < now - datetime.timedelta(seconds=stale_after)),
+            )
+            .values(
+                status=JOB_FAILED,
+                error="Importación interrumpida: el servicio se detuvo antes de terminarla",
+                finished_at=now,
+            )
+        )
+        db.commit()
+        if result.rowcount:
+            logger.warning("%s importaciones interrumpidas marcadas como FAILED", result.rowcount)
+        return result.rowcount
+    finally:
+        db.close()
+
+
+def _heartbeat_loop(stop: threading.Event):
+    while not stop.wait(JOB_HEARTBEAT_SECONDS):
+        try:
+            heartbeat()
+            fail_interrupted_jobs()
+        except Exception:
+            logger.exception("Error renovando el latido de las importaciones")
+
+
+_heartbeat_stop = threading.Event()
+
+
+def start_heartbeat() -> threading.Thread:
+    """Hilo daemon que mantiene vivo el latido y recoge importaciones huérfanas."""
+    _heartbeat_stop.clear()
+    thread = threading.Thread(target=_heartbeat_loop, args=(_heartbeat_stop,), name="ingest-job-heartbeat", daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_heartbeat():
+    _heartbeat_stop.set()
+
+
+def _pipeline_metrics(job: ImportJob) -> Optional[dict]:
+    flow = pipeline.running.get(job.import_id)
+    if flow is not None:
+        return flow.to_dict()  # en curso: métricas en vivo
+    return json.loads(job.pipeline_metrics) if job.pipeline_metrics else None
+
+
+def job_to_dict(job: ImportJob) -> dict:
+    end = job.finished_at or datetime.datetime.utcnow()
+    elapsed = (end - job.started_at).total_seconds() if job.started_at else 0.0
+    return {
+        "import_id": str(job.import_id),
+        "status": job.status,
+        "file_name": job.file_name,
+        "created_by": job.created_by,
+        "loader": job.loader,
+        "rows_parsed": job.rows_parsed,
+        "rows_inserted": job.rows_inserted,
+        "rows_updated": job.rows_updated,
+        "rows_unchanged": job.rows_unchanged,
+        "rows_rejected": job.rows_rejected,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(job.rows_parsed / elapsed, 1) if elapsed > 0 else 0.0,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "summary": json.loads(job.summary) if job.summary else None,
+        "pipeline": _pipeline_metrics(job),
+        "error": job.error,
+    }
@@ -0,0 +1,161 @@
+import base64
+import csv
+import datetime
+import decimal
+import io
+import json
+import os
+import uuid
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import select
+
+from .models import ProductStaging
+from .utils import safe_float, safe_int
+
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "2000"))
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Columnas expuestas por /staging-products, en el orden de la respuesta
+STAGING_FIELDS = [
+    "product_id", "sku", "name", "description", "category", "manufacturer",
+    "storage_type", "min_shelf_life_months", "expiration_date", "batch_number",
+    "cold_chain_required", "certifications", "commercialization_auth",
+    "country_regulations", "unit_price", "purchase_conditions",
+    "delivery_time_hours", "external_code", "import_id", "created_at",
+    "updated_at", "created_by", "validation_status", "validation_errors",
+    "validated_at", "processed",
+]
+
+
+def _to_str(value):
+    return None if value is None else str(value)
+
+
+# Conversión por columna al serializar; el resto se devuelve tal cual
+FIELD_CONVERTERS = {
+    "min_shelf_life_months": safe_int,
+    "delivery_time_hours": safe_int,
+    "unit_price": safe_float,
+    "import_id": _to_str,
+}
+
+
+def parse_fields(fields: Optional[str]) -> list:
+    """`fields=sku,name` -> ["sku", "name"]. Sin valor devuelve todas las columnas."""
+    if not fields:
+        return list(STAGING_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in STAGING_FIELDS]
+    if unknown or not requested:
+        raise ValueError(f"Campos inválidos: {unknown}. Opciones: {STAGING_FIELDS}")
+    return list(dict.fromkeys(requested))
+
+
+def encode_cursor(product_id: int) -> str:
+    """Cursor de GET /staging-products: product_id de la última fila de products_stg entregada."""
+    raw = json.dumps({"after": product_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """product_id de products_stg a partir del cual sigue la página; ValueError si el cursor no es válido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(after, int):
+        raise ValueError("Cursor inválido")
+    return after
+
+
+def staging_select(
+    fields: list,
+    validation_status: Optional[str] = None,
+    import_id: Optional[uuid.UUID] = None,
+    processed: Optional[bool] = None,
+    after: Optional[int] = None,
+):
+    """
+    SELECT de solo las columnas pedidas (más product_id como clave del
+    cursor, siempre en la última posición), filtrado y ordenado por
+    product_id para paginar por keyset.
+    """
+    table = ProductStaging.__table__
+    stmt = select(*[table.c[f] for f in fields], table.c.product_id.label("_cursor_key"))
+    if validation_status is not None:
+        stmt = stmt.where(table.c.validation_status == validation_status)
+    if import_id is not None:
+        stmt = stmt.where(table.c.import_id == import_id)
+    if processed is not None:
+        stmt = stmt.where(table.c.processed == processed)
+    if after is not None:
+        stmt = stmt.where(table.c.product_id > after)
+    return stmt.order_by(table.c.product_id)
+
+
+def row_formatter(fields: list):
+    """Devuelve una función fila (tupla) -> dict con las conversiones de FIELD_CONVERTERS."""
+    converters = [FIELD_CONVERTERS.get(f) for f in fields]
+    if not any(converters):
+        return lambda row: dict(zip(fields, row))
+
+    def format_row(row):
+        return {
+            name: (conv(value) if conv else value)
+            for name, conv, value in zip(fields, converters, row)
+        }
+    return format_row
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def iter_export(db, stmt, fields: list, fmt: str = "ndjson") -> Iterator[bytes]:
+    """
+    Recorre `stmt` con un cursor del lado del servidor (yield_per) y emite
+    un bloque de bytes NDJSON o CSV por cada lote de EXPORT_BATCH_SIZE filas.
+    La memoria usada no depende del tamaño de la tabla.
+    """
+    format_row = row_formatter(fields)
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        yield buffer.getvalue().encode()
+
+    result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    try:
+        for partition in result.partitions():
+            if fmt == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(format_row(row).values() for row in partition)
+                yield buffer.getvalue().encode()
+            else:
+                yield "".join(
+                    json.dumps(format_row(row), default=_json_default, separators=(",", ":")) + "\n"
+                    for row in partition
+                ).encode()
+    finally:
+        result.close()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Comprime en gzip de forma incremental (un miembro gzip para todo el stream)."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
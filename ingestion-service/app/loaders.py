@@ -0,0 +1,162 @@
+import os
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import ProductStaging
+
+# Backends de carga para products_stg
+LOADER_AUTO = "auto"                # COPY si el motor lo soporta, si no executemany
+LOADER_COPY = "copy"                # COPY ... FROM STDIN (PostgreSQL + psycopg3)
+LOADER_EXECUTEMANY = "executemany"  # INSERT por lotes (cualquier motor, p.ej. SQLite)
+LOADERS = (LOADER_AUTO, LOADER_COPY, LOADER_EXECUTEMANY)
+
+DEFAULT_LOADER = os.environ.get("INGEST_LOADER", LOADER_AUTO).lower()
+EXECUTEMANY_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "1000"))
+
+
+def supports_copy(db: Session) -> bool:
+    """COPY solo está disponible con PostgreSQL a través de psycopg3 (postgresql+psycopg://)."""
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg"
+
+
+def resolve_loader(db: Session, name: Optional[str] = None) -> str:
+    """
+    Resuelve el backend efectivo. `name` viene del request; si no se indica se
+    usa INGEST_LOADER. Si se pide COPY y el motor no lo soporta (SQLite), se
+    cae a executemany.
+    """
+    name = (name or DEFAULT_LOADER).lower()
+    if name not in LOADERS:
+        raise ValueError(f"Loader inválido: {name}. Opciones: {list(LOADERS)}")
+    if name in (LOADER_AUTO, LOADER_COPY):
+        return LOADER_COPY if supports_copy(db) else LOADER_EXECUTEMANY
+    return name
+
+
+def _column_defaults(columns) -> dict:
+    """Evalúa los defaults de Python de las columnas (COPY no los aplica)."""
+    values = {}
+    for col in columns:
+        default = col.default
+        if default is None:
+            continue
+        if default.is_scalar:
+            values[col.name] = default.arg
+        elif default.is_callable:
+            values[col.name] = default.arg(None)
+    return values
+
+
+def load_executemany(db: Session, records: list, batch_size: int = EXECUTEMANY_BATCH_SIZE) -> int:
+    """INSERT multi-fila por lotes de `batch_size` registros."""
+    stmt = ProductStaging.__table__.insert()
+    for start in range(0, len(records), batch_size):
+        db.execute(stmt, records[start:start + batch_size])
+    return len(records)
+
+
+def load_copy(db: Session, records: list) -> int:
+    """
+    Envía los registros con COPY products_stg (...) FROM STDIN usando la API
+    de copy de psycopg3, dentro de la transacción de la sesión.
+    """
+    if not records:
+        return 0
+    table = ProductStaging.__table__
+    provided = list(records[0].keys())
+    missing = [c for c in table.columns if c.name not in provided and not c.primary_key]
+    defaults = _column_defaults(missing)
+    columns = provided + list(defaults.keys())
+    default_values = tuple(defaults.values())
+
+    sql = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+    dbapi_conn = db.connection().connection
+    with dbapi_conn.cursor() as cursor:
+        with cursor.copy(sql) as copy:
+            for record in records:
+                copy.write_row(tuple(record[c] for c in provided) + default_values)
+    return len(records)
+
+
+# Columnas que el upsert actualiza cuando el contenido cambió
+UPSERT_RESET_VALUES = {
+    "validation_status": "PENDING",
+    "validation_errors": None,
+    "validated_at": None,
+    "processed": False,
+}
+
+
+def _dialect_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"Upsert no soportado para el motor {dialect}")
+    return insert
+
+
+def _upsert_statement(db: Session, columns):
+    """
+    INSERT ... ON CONFLICT (sku) DO UPDATE que solo toca la fila existente si
+    su content_hash es distinto; en ese caso la deja PENDING para re-validar.
+    """
+    table = ProductStaging.__table__
+    stmt = _dialect_insert(db)(table)
+    excluded = stmt.excluded
+    set_ = {col: excluded[col] for col in columns if col != "sku"}
+    set_["updated_at"] = excluded.updated_at
+    set_.update(UPSERT_RESET_VALUES)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.sku],
+        set_=set_,
+        where=table.c.content_hash.is_distinct_from(excluded.content_hash),
+    )
+
+
+def upsert_records(db: Session, records: list, batch_size: int = EXECUTEMANY_BATCH_SIZE) -> dict:
+    """
+    Upsert idempotente por SKU. Por lote se leen (sku, content_hash) de las
+    filas existentes para clasificar cada registro en nuevo / cambiado /
+    sin cambios; los sin cambios no se envían. Devuelve los conteos.
+    Los registros deben traer content_hash y SKUs únicos dentro del lote.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not records:
+        return counts
+    table = ProductStaging.__table__
+    stmt = _upsert_statement(db, list(records[0].keys()))
+
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        existing = dict(
+            db.execute(
+                select(table.c.sku, table.c.content_hash).where(table.c.sku.in_([r["sku"] for r in batch]))
+            ).all()
+        )
+        pending = []
+        for record in batch:
+            if record["sku"] not in existing:
+                counts["inserted"] += 1
+            elif existing[record["sku"]] != record["content_hash"]:
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+                continue
+            pending.append(record)
+        if pending:
+            db.execute(stmt, pending)
+    return counts
+
+
+def load_records(db: Session, records: Iterable[dict], loader: str) -> int:
+    """Carga `records` con el backend ya resuelto por resolve_loader."""
+    records = list(records)
+    if loader == LOADER_COPY:
+        return load_copy(db, records)
+    return load_executemany(db, records)
@@ -1,18 +1,42 @@
 
-from decimal import Decimal, InvalidOperation
-from datetime import date
-import math
 import os
 import uuid
-import pandas as pd
+from typing import Optional
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status, Request
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query, status, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from tempfile import NamedTemporaryFile
 
+from . import jobs
 from .database import SessionLocal, engine
-from .models import Base, ProductStaging
-from .utils import read_csv
+from .ingest import (
+    DEFAULT_CHUNK_SIZE,
+    REQUIRED_COLUMNS,
+    ImportSummary,
+    MissingColumnsError,
+    chunk_to_records,
+    ingest_stream,
+    normalize_chunk,
+    split_rejected,
+    write_records,
+)
+from .listing import (
+    EXPORT_MEDIA_TYPES,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    gzip_chunks,
+    iter_export,
+    parse_fields,
+    row_formatter,
+    staging_select,
+)
+from .loaders import LOADER_EXECUTEMANY, resolve_loader
+from .models import Base, ImportJob, add_missing_columns, add_missing_indexes
+from .utils import read_csv, safe_bool, safe_float, safe_int  # noqa: F401 (re-exportados)
 
 # =========================
 #  Auth mínima por header
@@ -80,6 +104,16 @@ app = FastAPI(title="Ingestion Service")
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+    add_missing_indexes(engine)
+    jobs.fail_interrupted_jobs()
+    jobs.start_heartbeat()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    jobs.stop_heartbeat()
+    jobs.executor.shutdown(wait=False)
 
 
 def get_db():
@@ -90,43 +124,111 @@ def get_db():
         db.close()
 
 
-def safe_float(value):
-    if value is None:
-        return None
+def _upload_csv_stream(
+    file: UploadFile, created_by: str, chunk_size: int, loader: str, upsert: bool, db: Session
+):
+    """
+    Modo streaming: lee el archivo subido (ya en disco) por bloques y carga
+    cada bloque con el backend `loader`. Todo queda en una sola transacción.
+    """
     try:
-        f = float(value)
-        if math.isnan(f) or math.isinf(f):
-            return None
-        return f
-    except (ValueError, TypeError):
-        return None
-
+        file.file.seek(0)
+        result = ingest_stream(
+            db, file.file, created_by=created_by, chunk_size=chunk_size, loader=loader, upsert=upsert
+        )
+        db.commit()
+    except MissingColumnsError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Faltan columnas en el CSV: {e.missing}")
+    except SQLAlchemyError as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al insertar los datos: {str(e)}")
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error al procesar el CSV: {str(e)}")
 
-def safe_int(value):
-    if value is None:
-        return None
-    try:
-        i = int(float(value))
-        return i
-    except (ValueError, TypeError):
-        return None
+    summary = result["summary"]
+    return {
+        "message": f"{summary['total_products']} productos ingresados",
+        "import_id": str(result["import_id"]),
+        "loader": result["loader"],
+        "rows_inserted": result["rows_inserted"],
+        "rows_updated": result["rows_updated"],
+        "rows_unchanged": result["rows_unchanged"],
+        "rows_rejected": result["rows_rejected"],
+        "summary": summary,
+    }
 
 
-def safe_bool(value):
-    if isinstance(value, bool):
-        return value
-    if isinstance(value, str):
-        return value.lower() in ["true", "1", "yes"]
-    return bool(value)
+def _upload_csv_async(
+    file: UploadFile,
+    created_by: str,
+    chunk_size: int,
+    loader: str,
+    upsert: bool,
+    pipelined: bool = False,
+    authorization: Optional[str] = None,
+):
+    """Modo asíncrono: guarda el archivo en disco, registra el job y lo encola en el pool."""
+    path = jobs.spool_upload(file.file)
+    try:
+        import_id = jobs.create_job(file.filename, created_by, loader)
+    except Exception:
+        os.remove(path)
+        raise
+    jobs.submit_job(import_id, path, created_by, chunk_size, loader, upsert, pipelined, authorization)
+    return import_id
 
 
 @app.post("/upload-csv", status_code=status.HTTP_201_CREATED)
 async def upload_csv(
+    request: Request,
     file: UploadFile = File(...),
     created_by: str = "system",
+    stream: bool = False,
+    async_job: bool = Query(False, alias="async"),  # procesa en background; consultar /imports/{import_id}
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    loader: Optional[str] = None,  # auto | copy | executemany; default INGEST_LOADER
+    upsert: bool = False,  # SKU existente: actualiza solo si el contenido cambió (re-ingesta idempotente)
+    pipeline: bool = False,  # asíncrono + validate/upsert por micro-lotes mientras se parsea
     db: Session = Depends(get_db),
     _user=Depends(require_token),  # <- exige Bearer token
 ):
+    async_job = async_job or pipeline
+    if (stream or async_job) and chunk_size <= 0:
+        raise HTTPException(status_code=400, detail="chunk_size debe ser mayor que 0")
+    try:
+        loader = LOADER_EXECUTEMANY if upsert else resolve_loader(db, loader)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if async_job:
+        try:
+            import_id = await run_in_threadpool(
+                _upload_csv_async,
+                file,
+                created_by,
+                chunk_size,
+                loader,
+                upsert,
+                pipeline,
+                request.headers.get("Authorization"),
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al encolar la importación: {str(e)}")
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={
+                "message": "Importación encolada",
+                "import_id": str(import_id),
+                "status": jobs.JOB_PENDING,
+                "status_url": f"/imports/{import_id}",
+            },
+        )
+
+    if stream:
+        return await run_in_threadpool(_upload_csv_stream, file, created_by, chunk_size, loader, upsert, db)
+
     tmp_file_path = None
     try:
         # Guardar archivo temporal con nombre único
@@ -139,43 +241,17 @@ async def upload_csv(
         df = read_csv(tmp_file_path)
 
         # Validar columnas requeridas
-        required_columns = [
-            "sku", "name", "description", "category", "manufacturer",
-            "storage_type", "min_shelf_life_months", "expiration_date",
-            "batch_number", "cold_chain_required", "certifications",
-            "commercialization_auth", "country_regulations", "unit_price",
-            "purchase_conditions", "delivery_time_hours", "external_code",
-            "import_id"
-        ]
-        missing_cols = [col for col in required_columns if col not in df.columns]
+        missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
         if missing_cols:
             raise HTTPException(status_code=400, detail=f"Faltan columnas en el CSV: {missing_cols}")
 
-        # Normalizaciones seguras
-        # Booleanos
-        if "cold_chain_required" in df.columns:
-            df["cold_chain_required"] = df["cold_chain_required"].apply(safe_bool).fillna(False)
-
-        # Fechas -> date
-        if "expiration_date" in df.columns:
-            dt = pd.to_datetime(df["expiration_date"], errors="coerce", utc=False)
-            df["expiration_date"] = dt.dt.date  # datetime.date o NaN -> None después
-
-        # Enteros (permitir NaN -> None)
-        for col in ("min_shelf_life_months", "delivery_time_hours"):
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
-
-        # Dinero -> Decimal (para DECIMAL(12,2))
-        if "unit_price" in df.columns:
-            def to_decimal(x):
-                if pd.isna(x) or x == "":
-                    return None
-                try:
-                    return Decimal(str(x))
-                except (InvalidOperation, ValueError, TypeError):
-                    return None
-            df["unit_price"] = df["unit_price"].apply(to_decimal)
+        # Normalización vectorizada (booleanos, fechas, enteros, precios en centavos)
+        normalized = normalize_chunk(df)
+        normalized["import_id"] = df["import_id"]  # utils.read_csv asigna UUID válido
+        rejected = 0
+        if upsert:
+            normalized, rejected = split_rejected(normalized, unique_sku=True)
+        records = chunk_to_records(normalized, created_by)
 
     except HTTPException:
         # No enmascarar 4xx como 500
@@ -192,29 +268,7 @@ async def upload_csv(
 
     # Insertar en la base de datos
     try:
-        for _, row in df.iterrows():
-            product = ProductStaging(
-                sku=row.get("sku"),
-                name=row.get("name"),
-                description=row.get("description"),
-                category=row.get("category"),
-                manufacturer=row.get("manufacturer"),
-                storage_type=row.get("storage_type"),
-                min_shelf_life_months=int(row["min_shelf_life_months"]) if pd.notna(row.get("min_shelf_life_months")) else None,
-                expiration_date=row.get("expiration_date") if isinstance(row.get("expiration_date"), date) else None,
-                batch_number=row.get("batch_number"),
-                cold_chain_required=bool(row.get("cold_chain_required")),
-                certifications=row.get("certifications"),
-                commercialization_auth=row.get("commercialization_auth"),
-                country_regulations=row.get("country_regulations"),
-                unit_price=row.get("unit_price"),  # Decimal o None
-                purchase_conditions=row.get("purchase_conditions"),
-                delivery_time_hours=int(row["delivery_time_hours"]) if pd.notna(row.get("delivery_time_hours")) else None,
-                external_code=row.get("external_code"),
-                import_id=row.get("import_id"),  # utils.read_csv asigna UUID válido
-                created_by=created_by,
-            )
-            db.add(product)
+        counts = write_records(db, records, loader, upsert)
         db.commit()
     except HTTPException:
         raise
@@ -222,68 +276,119 @@ async def upload_csv(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error al insertar los datos: {str(e)}")
 
-    total_products = len(df)
-    categories_count = df["category"].value_counts(dropna=False).to_dict()
-    cold_chain_count = int(df["cold_chain_required"].sum()) if "cold_chain_required" in df.columns else 0
-
-    # Promedio de unit_price con Decimal
-    decimals = df["unit_price"].dropna() if "unit_price" in df.columns else pd.Series([], dtype="object")
-    if len(decimals) > 0:
-        avg = float(sum(decimals, start=Decimal("0")) / Decimal(len(decimals)))
-        avg_unit_price = round(avg, 2)
-    else:
-        avg_unit_price = 0.0
+    summary = ImportSummary()
+    summary.update(normalized, rejected, counts)
 
-    return {
-        "message": f"{total_products} productos ingresados",
-        "summary": {
-            "total_products": total_products,
-            "categories_count": categories_count,
-            "cold_chain_required_count": cold_chain_count,
-            "avg_unit_price": avg_unit_price,
-        },
+    response = {
+        "message": f"{summary.total_products} productos ingresados",
+        "summary": summary.to_dict(),
     }
+    if upsert:
+        response.update(
+            rows_inserted=summary.rows_inserted,
+            rows_updated=summary.rows_updated,
+            rows_unchanged=summary.rows_unchanged,
+            rows_rejected=summary.rows_rejected,
+        )
+    return response
 
 
 @app.get("/staging-products")
 def list_staging_products(
-    limit: int = 100,
-    offset: int = 0,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = 0,  # compatibilidad; preferir cursor (X-Next-Cursor)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,  # p.ej. fields=sku,name,validation_status
+    validation_status: Optional[str] = None,
+    import_id: Optional[uuid.UUID] = None,
+    processed: Optional[bool] = None,
     db: Session = Depends(get_db),
     _user=Depends(require_token),  # <- exige Bearer token también
 ):
-    products = db.query(ProductStaging).offset(offset).limit(limit).all()
-    return [
-        {
-            "product_id": p.product_id,
-            "sku": p.sku,
-            "name": p.name,
-            "description": p.description,
-            "category": p.category,
-            "manufacturer": p.manufacturer,
-            "storage_type": p.storage_type,
-            "min_shelf_life_months": safe_int(p.min_shelf_life_months),
-            "expiration_date": p.expiration_date,
-            "batch_number": p.batch_number,
-            "cold_chain_required": p.cold_chain_required,
-            "certifications": p.certifications,
-            "commercialization_auth": p.commercialization_auth,
-            "country_regulations": p.country_regulations,
-            "unit_price": safe_float(p.unit_price),
-            "purchase_conditions": p.purchase_conditions,
-            "delivery_time_hours": safe_int(p.delivery_time_hours),
-            "external_code": p.external_code,
-            "import_id": str(p.import_id),
-            "created_at": p.created_at,
-            "updated_at": p.updated_at,
-            "created_by": p.created_by,
-            "validation_status": p.validation_status,
-            "validation_errors": p.validation_errors,
-            "validated_at": p.validated_at,
-            "processed": p.processed,
-        }
-        for p in products
-    ]
+    """
+    Lista products_stg por keyset sobre product_id. Si hay más filas, el
+    header X-Next-Cursor trae el cursor opaco para la página siguiente.
+    """
+    try:
+        columns = parse_fields(fields)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    stmt = staging_select(
+        columns,
+        validation_status=validation_status,
+        import_id=import_id,
+        processed=processed,
+        after=after,
+    ).limit(limit)
+    if after is None and offset:
+        stmt = stmt.offset(offset)
+
+    rows = db.execute(stmt).all()
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1][-1])
+
+    format_row = row_formatter(columns)
+    return [format_row(row) for row in rows]
+
+
+@app.get("/staging-products/export")
+def export_staging_products(
+    format: str = "ndjson",  # ndjson | csv
+    gzip: bool = False,
+    fields: Optional[str] = None,
+    validation_status: Optional[str] = None,
+    import_id: Optional[uuid.UUID] = None,
+    processed: Optional[bool] = None,
+    db: Session = Depends(get_db),
+    _user=Depends(require_token),
+):
+    """
+    Exporta products_stg completo (con los mismos filtros/proyección que el
+    listado) como NDJSON o CSV en streaming, leyendo con cursor del servidor.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Opciones: {list(EXPORT_MEDIA_TYPES)}")
+    try:
+        columns = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    stmt = staging_select(
+        columns,
+        validation_status=validation_status,
+        import_id=import_id,
+        processed=processed,
+    )
+
+    def body():
+        # El export de products_stg se lee mientras se envía la respuesta, cuando
+        # get_db ya terminó: la sesión se cierra al agotar (o cortar) el stream
+        try:
+            yield from iter_export(db, stmt, columns, format)
+        finally:
+            db.close()
+
+    headers = {"Content-Disposition": f'attachment; filename="staging-products.{format}"'}
+    content = body()
+    if gzip:
+        content = gzip_chunks(content)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(content, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+
+@app.get("/imports/{import_id}")
+def get_import(
+    import_id: uuid.UUID,
+    db: Session = Depends(get_db),
+    _user=Depends(require_token),
+):
+    job = db.get(ImportJob, import_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return jobs.job_to_dict(job)
 
 
 @app.get("/health")
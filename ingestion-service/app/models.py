@@ -1,6 +1,6 @@
 import uuid
 import datetime
-from sqlalchemy import Column, Integer, Numeric, String, Text, Boolean, DECIMAL, Date, TIMESTAMP
+from sqlalchemy import BigInteger, Column, Index, Integer, Numeric, String, Text, Boolean, DECIMAL, Date, TIMESTAMP, inspect, text
 # 👇 cambia este import obsoleto:
 # from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import declarative_base
@@ -37,6 +37,12 @@ class GUID(TypeDecorator):
 
 class ProductStaging(Base):
     __tablename__ = "products_stg"
+    # Índices para los filtros de /staging-products con orden/keyset por product_id
+    __table_args__ = (
+        Index("ix_products_stg_status_product_id", "validation_status", "product_id"),
+        Index("ix_products_stg_import_product_id", "import_id", "product_id"),
+        Index("ix_products_stg_processed_product_id", "processed", "product_id"),
+    )
 
     product_id = Column(Integer, primary_key=True, index=True)
     sku = Column(String(50), unique=True, nullable=False)
@@ -66,3 +72,66 @@ class ProductStaging(Base):
     validation_errors = Column(Text, nullable=True)
     validated_at = Column(TIMESTAMP, nullable=True)
     processed = Column(Boolean, default=False)
+    # Hash del contenido normalizado: en re-ingestas (upsert) solo se
+    # re-validan las filas cuyo contenido cambió
+    content_hash = Column(BigInteger, nullable=True)
+
+
+class ImportJob(Base):
+    """Importación asíncrona de un CSV: estado y progreso para /imports/{import_id}."""
+    __tablename__ = "import_jobs"
+
+    import_id = Column(GUID(), primary_key=True, default=uuid.uuid4)
+    status = Column(String(10), default="PENDING", nullable=False)  # PENDING | RUNNING | COMPLETED | FAILED
+    file_name = Column(String(255))
+    created_by = Column(String(50))
+    loader = Column(String(20))
+    rows_parsed = Column(Integer, default=0, nullable=False)
+    rows_inserted = Column(Integer, default=0, nullable=False)
+    rows_rejected = Column(Integer, default=0, nullable=False)
+    rows_updated = Column(Integer, default=0, nullable=False)
+    rows_unchanged = Column(Integer, default=0, nullable=False)
+    summary = Column(Text, nullable=True)  # JSON con el resumen final
+    pipeline_metrics = Column(Text, nullable=True)  # JSON con métricas por etapa (modo pipeline)
+    error = Column(Text, nullable=True)
+    # Proceso que la atiende y su último latido: otra instancia solo la
+    # marca FAILED si el latido quedó viejo (su dueño ya no existe)
+    owner = Column(String(100), nullable=True)
+    heartbeat_at = Column(TIMESTAMP, nullable=True)
+
+    created_at = Column(TIMESTAMP, default=datetime.datetime.utcnow)
+    started_at = Column(TIMESTAMP, nullable=True)
+    finished_at = Column(TIMESTAMP, nullable=True)
+
+
+def add_missing_columns(bind, tables=None):
+    """
+    create_all no altera tablas existentes: agrega (ALTER TABLE ... ADD COLUMN)
+    las columnas declaradas en los modelos que aún no existen en la base.
+    Solo sirve para columnas nullable o con default, que es el caso de las
+    columnas nuevas de products_stg/import_jobs.
+    """
+    tables = tables or Base.metadata.sorted_tables
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+
+
+def add_missing_indexes(bind, tables=None):
+    """
+    Índices de keyset de products_stg (estado / import / processed +
+    product_id) para bases creadas antes de que existieran; create_all no
+    toca tablas ya existentes.
+    """
+    tables = tables or Base.metadata.sorted_tables
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
@@ -0,0 +1,188 @@
+"""
+Pipeline de importación ingest -> validate -> upsert por micro-lotes.
+
+El job de ingesta es la etapa de origen: cada bloque del CSV confirmado en
+products_stg se encola para validación, y lo validado se encola para el
+upsert, mientras se sigue parseando el siguiente bloque. Las colas entre
+etapas son acotadas (PIPELINE_QUEUE_SIZE): si una etapa se atrasa, la
+anterior se bloquea al encolar (backpressure) en vez de acumular trabajo.
+Así el tiempo total queda acotado por la etapa más lenta y no por la suma.
+
+Una etapa que encuentra varios lotes esperando en su cola los procesa en
+una sola llamada (las llamadas a validator/upserter trabajan sobre todo lo
+pendiente de la importación, no sobre filas puntuales).
+"""
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "4"))
+PIPELINE_HTTP_TIMEOUT = float(os.environ.get("PIPELINE_HTTP_TIMEOUT", "300"))
+VALIDATOR_URL = os.environ.get("VALIDATOR_URL", "http://validator-service:8011")
+UPSERTER_URL = os.environ.get("UPSERTER_URL", "http://upserter-service:8012")
+
+SOURCE_STAGE = "ingest"
+_DONE = object()
+
+# Una etapa recibe las filas del micro-lote y devuelve las filas que procesó
+StageFn = Callable[[int], int]
+
+
+class StageMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.batches = 0
+        self.calls = 0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0  # esperando lugar en la cola siguiente (backpressure)
+        self.max_queue_depth = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "calls": self.calls,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "rows_per_second": round(self.rows_in / self.busy_seconds, 1) if self.busy_seconds > 0 else 0.0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class Pipeline:
+    """
+    Etapas encadenadas con colas acotadas, un hilo por etapa. El productor
+    (la ingesta) llama a `submit` por bloque y a `close` al terminar.
+    """
+
+    def __init__(self, stages: List[Tuple[str, StageFn]], queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self.metrics: Dict[str, StageMetrics] = {SOURCE_STAGE: StageMetrics(SOURCE_STAGE)}
+        self.metrics.update({name: StageMetrics(name) for name, _ in stages})
+        self.error: Optional[str] = None
+        self._threads = [
+            threading.Thread(target=self._run_stage, args=(i,), name=f"pipeline-{name}", daemon=True)
+            for i, (name, _) in enumerate(stages)
+        ]
+        self._started_at = None
+        self._mark = None
+
+    def start(self):
+        self._started_at = self._mark = time.perf_counter()
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _put(self, index: int, item, metrics: StageMetrics):
+        """Encola en la etapa `index`; el tiempo bloqueado cuenta como backpressure."""
+        start = time.perf_counter()
+        self.queues[index].put(item)
+        metrics.blocked_seconds += time.perf_counter() - start
+
+    def submit(self, rows: int):
+        """Entrega un bloque ya confirmado a la primera etapa (bloquea si la cola está llena)."""
+        source = self.metrics[SOURCE_STAGE]
+        source.busy_seconds += time.perf_counter() - self._mark
+        source.batches += 1
+        source.rows_in += rows
+        source.rows_out += rows
+        self._put(0, rows, source)
+        self._mark = time.perf_counter()
+
+    def close(self) -> dict:
+        """Marca fin de datos, espera a que todas las etapas vacíen sus colas y devuelve las métricas."""
+        self.queues[0].put(_DONE)
+        for thread in self._threads:
+            thread.join()
+        return self.to_dict()
+
+    def _run_stage(self, index: int):
+        name, fn = self.stages[index]
+        metrics = self.metrics[name]
+        inbox = self.queues[index]
+        outbox = index + 1 if index + 1 < len(self.stages) else None
+
+        done = False
+        while not done:
+            items = [inbox.get()]
+            metrics.max_queue_depth = max(metrics.max_queue_depth, inbox.qsize() + 1)
+            # Coalescer lo que ya esté esperando en una sola llamada
+            while items[-1] is not _DONE:
+                try:
+                    items.append(inbox.get_nowait())
+                except queue.Empty:
+                    break
+            if items[-1] is _DONE:
+                done = True
+                items.pop()
+            rows = sum(items)
+            if not items:
+                continue
+
+            metrics.batches += len(items)
+            metrics.rows_in += rows
+            processed = 0
+            if self.error is None and rows > 0:
+                start = time.perf_counter()
+                try:
+                    processed = fn(rows)
+                except Exception as e:
+                    logger.exception("Etapa %s del pipeline falló", name)
+                    self.error = f"{name}: {e}"
+                metrics.busy_seconds += time.perf_counter() - start
+                metrics.calls += 1
+            metrics.rows_out += processed
+            # Tras un error se siguen drenando las colas para no bloquear a la ingesta
+            if outbox is not None:
+                self._put(outbox, processed, metrics)
+
+        if outbox is not None:
+            self.queues[outbox].put(_DONE)
+
+    def to_dict(self) -> dict:
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "stages": {name: m.to_dict() for name, m in self.metrics.items()},
+            "error": self.error,
+        }
+
+
+# Pipelines en curso por import_id, para mostrar métricas en vivo en /imports/{import_id}
+running: Dict[uuid.UUID, Pipeline] = {}
+
+
+def http_stages(import_id: uuid.UUID, authorization: Optional[str] = None) -> List[Tuple[str, StageFn]]:
+    """
+    Etapas validate/upsert contra validator-service y upserter-service. El
+    validador se acota a la importación; el upsert incremental solo toca el
+    delta recién validado.
+    """
+    headers = {"Authorization": authorization} if authorization else {}
+
+    def _post(url: str, params: dict) -> dict:
+        response = httpx.post(url, params=params, headers=headers, timeout=PIPELINE_HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def validate(rows: int) -> int:
+        body = _post(f"{VALIDATOR_URL}/validate", {"import_id": str(import_id)})
+        return body["resumen"]["total_validados"]
+
+    def upsert(rows: int) -> int:
+        body = _post(f"{UPSERTER_URL}/products/upsert", {"mode": "incremental"})
+        return body.get("inserted", 0) + body.get("updated", 0) + body.get("unchanged", 0)
+
+    return [("validate", validate), ("upsert", upsert)]
@@ -1,10 +1,12 @@
+import math
 import pandas as pd
 import uuid
 
 def read_csv(file_path: str) -> pd.DataFrame:
   
     try:
-        df = pd.read_csv(file_path, sep=',', encoding='utf-8')
+        # Todo como texto, igual que ingest.iter_csv_chunks: "123" no pasa a 123.0
+        df = pd.read_csv(file_path, sep=',', encoding='utf-8', dtype=str)
     except Exception as e:
         raise ValueError(f"Error al leer el CSV: {str(e)}")
 
@@ -12,3 +14,32 @@ def read_csv(file_path: str) -> pd.DataFrame:
 
     return df
 
+
+def safe_float(value):
+    if value is None:
+        return None
+    try:
+        f = float(value)
+        if math.isnan(f) or math.isinf(f):
+            return None
+        return f
+    except (ValueError, TypeError):
+        return None
+
+
+def safe_int(value):
+    if value is None:
+        return None
+    try:
+        i = int(float(value))
+        return i
+    except (ValueError, TypeError):
+        return None
+
+
+def safe_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.lower() in ["true", "1", "yes"]
+    return bool(value)
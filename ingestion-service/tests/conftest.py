@@ -8,8 +8,9 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from app import jobs
 from app.main import app, get_db
-from app.models import Base
+from app.models import Base, ImportJob, ProductStaging
 
 TEST_DATABASE_URL = os.environ["DATABASE_URL"]
 
@@ -47,3 +48,13 @@ def client(db_session):
     app.dependency_overrides[get_db] = override_get_db
     return TestClient(app)
 
+@pytest.fixture
+def job_sessions(engine, monkeypatch):
+    """Los workers usan sesiones propias contra el mismo engine de pruebas."""
+    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
+    monkeypatch.setattr(jobs, "session_factory", Session)
+    yield Session
+    with Session() as db:
+        db.query(ProductStaging).filter(ProductStaging.sku.like("ASY-%")).delete(synchronize_session=False)
+        db.query(ImportJob).delete()
+        db.commit()
@@ -0,0 +1,93 @@
+import datetime
+import time
+import uuid
+
+from app import jobs
+from app.models import ImportJob, ProductStaging
+
+from tests.test_upload_csv_stream import CSV_HEADERS, _row
+
+
+def _wait_for(client, import_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        body = client.get(f"/imports/{import_id}").json()
+        if body["status"] in (jobs.JOB_COMPLETED, jobs.JOB_FAILED):
+            return body
+        time.sleep(0.05)
+    raise AssertionError("La importación no terminó a tiempo")
+
+
+def test_upload_csv_async_completes_and_reports_progress(client, job_sessions):
+    rows = "".join(_row(i).replace("STR-", "ASY-") for i in range(5))
+    rows += ",Sin sku,Desc,Cat,Man,Type,6,2025-01-01,B,false,Cert,Auth,Reg,1.00,Cond,24,EXT,\n"
+    files = {"file": ("catalogo.csv", CSV_HEADERS + rows, "text/csv")}
+
+    resp = client.post("/upload-csv?async=true&chunk_size=2", files=files)
+    assert resp.status_code == 202
+    accepted = resp.json()
+    assert accepted["status"] == jobs.JOB_PENDING
+    assert accepted["status_url"] == f"/imports/{accepted['import_id']}"
+
+    body = _wait_for(client, accepted["import_id"])
+    assert body["status"] == jobs.JOB_COMPLETED
+    assert body["file_name"] == "catalogo.csv"
+    assert body["rows_parsed"] == 6
+    assert body["rows_inserted"] == 5
+    assert body["rows_rejected"] == 1
+    assert body["rows_per_second"] >= 0
+    assert body["summary"]["total_products"] == 5
+    assert body["error"] is None
+
+    with job_sessions() as db:
+        stored = db.query(ProductStaging).filter(ProductStaging.sku.like("ASY-%")).all()
+    assert len(stored) == 5
+    assert {str(p.import_id) for p in stored} == {accepted["import_id"]}
+
+
+def test_upload_csv_async_missing_columns_fails_job(client, job_sessions):
+    files = {"file": ("bad.csv", "sku,name\nASY-X,Prod", "text/csv")}
+    resp = client.post("/upload-csv?async=true", files=files)
+    assert resp.status_code == 202
+
+    body = _wait_for(client, resp.json()["import_id"])
+    assert body["status"] == jobs.JOB_FAILED
+    assert "Faltan columnas" in body["error"]
+    assert body["summary"] is None
+
+
+def test_get_import_not_found(client):
+    resp = client.get(f"/imports/{uuid.uuid4()}")
+    assert resp.status_code == 404
+
+
+def test_only_orphaned_jobs_marked_failed(job_sessions):
+    now = datetime.datetime.utcnow()
+    viejo = now - datetime.timedelta(seconds=jobs.JOB_STALE_SECONDS + 60)
+    casos = {
+        # dueño caído: latido viejo
+        "huerfana": dict(status=jobs.JOB_RUNNING, owner="otro:1", heartbeat_at=viejo),
+        # anterior a los latidos: sin dueño, creada hace rato
+        "legado": dict(status=jobs.JOB_PENDING, created_at=viejo),
+        # otro worker/réplica vivo
+        "ajena_viva": dict(status=jobs.JOB_RUNNING, owner="otro:2", heartbeat_at=now),
+        # de este proceso: nunca se la marca a sí mismo
+        "propia": dict(status=jobs.JOB_RUNNING, owner=jobs.INSTANCE_ID, heartbeat_at=viejo),
+        "terminada": dict(status=jobs.JOB_COMPLETED, owner="otro:1", heartbeat_at=viejo),
+    }
+    ids = {nombre: uuid.uuid4() for nombre in casos}
+    with job_sessions() as db:
+        db.add_all([ImportJob(import_id=ids[nombre], created_by="t", **campos) for nombre, campos in casos.items()])
+        db.commit()
+
+    assert jobs.fail_interrupted_jobs() == 2
+    assert jobs.heartbeat() == 1
+
+    with job_sessions() as db:
+        job = {nombre: db.get(ImportJob, i) for nombre, i in ids.items()}
+        assert job["huerfana"].status == job["legado"].status == jobs.JOB_FAILED
+        assert "interrumpida" in job["huerfana"].error
+        assert job["huerfana"].finished_at is not None
+        assert job["ajena_viva"].status == job["propia"].status == jobs.JOB_RUNNING
+        assert job["propia"].heartbeat_at >= now
+        assert job["terminada"].status == jobs.JOB_COMPLETED
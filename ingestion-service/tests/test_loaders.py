@@ -0,0 +1,125 @@
+import uuid
+
+import pytest
+
+from app import loaders
+from app.models import ProductStaging
+
+from tests.test_upload_csv_stream import CSV_HEADERS, _row
+
+
+def test_resolve_loader_falls_back_to_executemany_on_sqlite(db_session):
+    assert loaders.supports_copy(db_session) is False
+    assert loaders.resolve_loader(db_session, "copy") == loaders.LOADER_EXECUTEMANY
+    assert loaders.resolve_loader(db_session, "AUTO") == loaders.LOADER_EXECUTEMANY
+    assert loaders.resolve_loader(db_session, "executemany") == loaders.LOADER_EXECUTEMANY
+
+
+def test_resolve_loader_uses_env_default(db_session, monkeypatch):
+    monkeypatch.setattr(loaders, "DEFAULT_LOADER", "executemany")
+    assert loaders.resolve_loader(db_session) == loaders.LOADER_EXECUTEMANY
+
+
+def test_resolve_loader_invalid(db_session):
+    with pytest.raises(ValueError):
+        loaders.resolve_loader(db_session, "bulk")
+
+
+def test_load_executemany_batches(db_session, monkeypatch):
+    calls = []
+    execute = db_session.execute
+
+    def spy(stmt, params=None, *args, **kwargs):
+        calls.append(len(params))
+        return execute(stmt, params, *args, **kwargs)
+
+    monkeypatch.setattr(db_session, "execute", spy)
+    records = [
+        {"sku": f"EM-{i}", "name": f"P{i}", "import_id": uuid.uuid4(), "created_by": "tester"}
+        for i in range(5)
+    ]
+    assert loaders.load_executemany(db_session, records, batch_size=2) == 5
+    assert calls == [2, 2, 1]
+
+    stored = db_session.query(ProductStaging).filter(ProductStaging.sku.like("EM-%")).all()
+    assert len(stored) == 5
+    assert all(p.validation_status == "PENDING" and p.processed is False for p in stored)
+
+
+class _FakeCopy:
+    def __init__(self, sql, rows):
+        self.sql = sql
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write_row(self, row):
+        self.rows.append(row)
+
+
+class _FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def copy(self, sql):
+        self.log["sql"] = sql
+        return _FakeCopy(sql, self.log["rows"])
+
+
+class _FakeSession:
+    def __init__(self, log):
+        self.log = log
+
+    def connection(self):
+        log = self.log
+
+        class _Conn:
+            class connection:
+                @staticmethod
+                def cursor():
+                    return _FakeCursor(log)
+
+        return _Conn()
+
+
+def test_load_copy_writes_rows_with_defaults():
+    log = {"rows": []}
+    import_id = uuid.uuid4()
+    records = [{"sku": "C-1", "name": "P1", "import_id": import_id, "created_by": "tester"}]
+
+    assert loaders.load_copy(_FakeSession(log), records) == 1
+
+    sql = log["sql"]
+    assert sql.startswith("COPY products_stg (sku, name, import_id, created_by, ")
+    assert "product_id" not in sql
+    columns = sql[sql.index("(") + 1:sql.index(")")].split(", ")
+    row = dict(zip(columns, log["rows"][0]))
+    assert row["sku"] == "C-1"
+    assert row["import_id"] == import_id
+    assert row["validation_status"] == "PENDING"
+    assert row["processed"] is False
+    assert row["cold_chain_required"] is False
+    assert row["created_at"] is not None
+
+
+def test_upload_csv_stream_reports_loader(client):
+    files = {"file": ("test.csv", CSV_HEADERS + _row(30), "text/csv")}
+    resp = client.post("/upload-csv?stream=true&loader=copy", files=files)
+    assert resp.status_code == 201
+    assert resp.json()["loader"] == "executemany"
+
+
+def test_upload_csv_stream_invalid_loader(client):
+    files = {"file": ("test.csv", CSV_HEADERS + _row(31), "text/csv")}
+    resp = client.post("/upload-csv?stream=true&loader=bulk", files=files)
+    assert resp.status_code == 400
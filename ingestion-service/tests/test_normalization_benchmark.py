@@ -0,0 +1,143 @@
+"""
+Normalización vectorizada vs. la implementación anterior por celda
+(`apply(safe_bool)`, `to_decimal` y `iterrows`).
+
+El micro-benchmark (100k filas sintéticas) no corre por defecto:
+    RUN_BENCHMARKS=1 python -m pytest tests/test_normalization_benchmark.py -s
+"""
+import io
+from decimal import Decimal
+import os
+import time
+import uuid
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+import pandas as pd
+import pytest
+
+from app.ingest import chunk_to_records, normalize_chunk, parse_price_cents
+from app.main import safe_bool
+
+from tests.test_upload_csv_stream import CSV_HEADERS
+
+BENCHMARK_ROWS = 100_000
+
+
+def _synthetic_csv(rows: int) -> str:
+    bools = ["true", "false", "yes", "no", "1", "0"]
+    prices = ["100.50", "7", "0.285", "", "abc", "12.3"]
+    lines = [CSV_HEADERS]
+    for i in range(rows):
+        lines.append(
+            f"BENCH-{i},Producto {i},Desc,Cat{i % 7},Lab,Ambiente,{i % 24},"
+            f"2026-0{1 + i % 9}-1{i % 10},L{i},{bools[i % 6]},INVIMA,AUTH-{i},CO,"
+            f"{prices[i % 6]},Contado,{i % 72},EXT-{i},\n"
+        )
+    return "".join(lines)
+
+
+def _read(csv_text: str) -> pd.DataFrame:
+    df = pd.read_csv(io.StringIO(csv_text))
+    df["import_id"] = [uuid.uuid4() for _ in range(len(df))]
+    return df
+
+
+def _legacy_records(df: pd.DataFrame, created_by: str) -> list:
+    """Copia de la normalización e inserción anteriores de upload_csv (sin ORM)."""
+    df = df.copy()
+    df["cold_chain_required"] = df["cold_chain_required"].apply(safe_bool).fillna(False)
+    df["expiration_date"] = pd.to_datetime(df["expiration_date"], errors="coerce").dt.date
+    for col in ("min_shelf_life_months", "delivery_time_hours"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+
+    def to_decimal(x):
+        if pd.isna(x) or x == "":
+            return None
+        try:
+            return Decimal(str(x))
+        except (InvalidOperation, ValueError, TypeError):
+            return None
+    df["unit_price"] = df["unit_price"].apply(to_decimal)
+
+    records = []
+    for _, row in df.iterrows():
+        records.append(dict(
+            sku=row.get("sku"),
+            name=row.get("name"),
+            cold_chain_required=bool(row.get("cold_chain_required")),
+            min_shelf_life_months=int(row["min_shelf_life_months"]) if pd.notna(row.get("min_shelf_life_months")) else None,
+            expiration_date=row.get("expiration_date") if isinstance(row.get("expiration_date"), date) else None,
+            unit_price=row.get("unit_price"),
+            delivery_time_hours=int(row["delivery_time_hours"]) if pd.notna(row.get("delivery_time_hours")) else None,
+            import_id=row.get("import_id"),
+            created_by=created_by,
+        ))
+    return records
+
+
+def _vectorized_records(df: pd.DataFrame, created_by: str) -> list:
+    normalized = normalize_chunk(df)
+    normalized["import_id"] = df["import_id"]
+    return chunk_to_records(normalized, created_by)
+
+
+def _as_cents(value):
+    if value is None:
+        return None
+    return int((Decimal(str(value)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+def test_vectorized_matches_legacy_normalization():
+    df = _read(_synthetic_csv(240))
+    legacy = _legacy_records(df, "tester")
+    vectorized = _vectorized_records(df, "tester")
+
+    assert len(legacy) == len(vectorized)
+    for old, new in zip(legacy, vectorized):
+        for key in ("sku", "name", "cold_chain_required", "min_shelf_life_months",
+                    "expiration_date", "delivery_time_hours", "import_id", "created_by"):
+            assert old[key] == new[key], key
+        assert _as_cents(old["unit_price"]) == _as_cents(new["unit_price"])
+
+
+def test_parse_price_cents_edge_cases():
+    values = pd.Series(["10", "10.5", "10.005", "-3.10", " 7.99 ", ".5", "", None, "abc", "12345678901"])
+    cents = parse_price_cents(values)
+    assert cents.tolist() == [1000, 1050, 1001, -310, 799, 50, pd.NA, pd.NA, pd.NA, pd.NA]
+
+
+def test_parse_price_cents_scientific_notation():
+    # Como el parseo anterior con Decimal: la notación científica es un precio válido
+    values = pd.Series(["1e3", "1e-05", "-2.5E2", "1.2345e2", "5e-3", "1e10", "1e", "e5", "10"])
+    cents = parse_price_cents(values)
+    assert cents.tolist() == [100000, 0, -25000, 12345, 1, pd.NA, pd.NA, pd.NA, 1000]
+
+
+def test_unit_price_float_round_trips_to_decimal():
+    # El float no es exacto, pero su forma decimal más corta sí: DECIMAL(12,2) guarda el valor original
+    values = pd.Series(["0.29", "0.1", "19.99", "1234567890.07", "-0.07"])
+    prices = (parse_price_cents(values).astype("Float64") / 100).tolist()
+    assert [Decimal(repr(p)) for p in prices] == [Decimal(v) for v in values]
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Benchmark: definir RUN_BENCHMARKS=1")
+def test_benchmark_normalization_rows_per_second():
+    df = _read(_synthetic_csv(BENCHMARK_ROWS))
+
+    start = time.perf_counter()
+    _legacy_records(df, "bench")
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _vectorized_records(df, "bench")
+    vectorized_elapsed = time.perf_counter() - start
+
+    legacy_rps = BENCHMARK_ROWS / legacy_elapsed
+    vectorized_rps = BENCHMARK_ROWS / vectorized_elapsed
+    print(
+        f"\nnormalización {BENCHMARK_ROWS} filas: "
+        f"anterior {legacy_rps:,.0f} filas/s, vectorizada {vectorized_rps:,.0f} filas/s "
+        f"({vectorized_rps / legacy_rps:.1f}x)"
+    )
+    assert vectorized_rps > legacy_rps
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from app import jobs, pipeline
+from app.pipeline import Pipeline
+
+from tests.test_imports_async import _wait_for
+from tests.test_upload_csv_stream import CSV_HEADERS, _row
+
+
+def _eventually(condition, timeout=5.0):
+    """Espera a que `condition()` se cumpla; el timeout solo corta un test colgado."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("La condición no se cumplió a tiempo")
+        time.sleep(0.001)
+
+
+def test_pipeline_overlaps_stages():
+    upsert_busy, release_upsert = threading.Event(), threading.Event()
+    validated = []
+
+    def validate(rows):
+        validated.append(rows)
+        return rows
+
+    def upsert(rows):
+        upsert_busy.set()
+        release_upsert.wait(timeout=5)
+        return rows
+
+    flow = Pipeline([("validate", validate), ("upsert", upsert)], queue_size=2).start()
+    flow.submit(10)
+    assert upsert_busy.wait(timeout=5)
+
+    # Con upsert ocupado en el primer bloque, la ingesta entrega los
+    # siguientes y validate los procesa: las etapas se solapan
+    flow.submit(10)
+    flow.submit(10)
+    _eventually(lambda: sum(validated) == 30)
+    assert flow.metrics["upsert"].rows_out == 0
+
+    release_upsert.set()
+    metrics = flow.close()
+    stages = metrics["stages"]
+    assert stages["ingest"]["rows_out"] == 30
+    assert stages["validate"]["rows_in"] == 30
+    assert stages["upsert"]["rows_out"] == 30
+    assert metrics["error"] is None
+
+
+def test_pipeline_backpressure_and_coalescing():
+    calls = []
+    release = threading.Event()
+
+    def validate(rows):
+        calls.append(rows)
+        release.wait(timeout=5)
+        return rows
+
+    flow = Pipeline([("validate", validate)], queue_size=3).start()
+    submitted = []
+    submitter = threading.Thread(target=lambda: [submitted.append(flow.submit(1)) for _ in range(10)])
+    submitter.start()
+
+    # validate retiene su primera llamada y la cola (3) se llena: la ingesta
+    # queda bloqueada en vez de acumular los 10 bloques
+    _eventually(lambda: calls and flow.queues[0].full())
+    assert submitter.is_alive()
+    assert len(submitted) <= calls[0] + 3 < 10
+
+    release.set()
+    submitter.join(timeout=5)
+    metrics = flow.close()
+
+    # Al liberarse, validate juntó los bloques en espera en menos llamadas
+    assert metrics["stages"]["ingest"]["blocked_seconds"] > 0
+    assert sum(calls) == 10
+    assert metrics["stages"]["validate"]["calls"] == len(calls) < 10
+
+
+def test_pipeline_stage_error_drains_queues():
+    def boom(rows):
+        raise RuntimeError("validator caído")
+
+    calls = []
+    flow = Pipeline([("validate", boom), ("upsert", calls.append)], queue_size=1).start()
+    submitter = threading.Thread(target=lambda: [flow.submit(1) for _ in range(5)])
+    submitter.start()
+    submitter.join(timeout=5)
+    metrics = flow.close()
+
+    assert not submitter.is_alive()
+    assert metrics["error"] == "validate: validator caído"
+    assert calls == []
+
+
+@pytest.fixture
+def fake_stages(monkeypatch):
+    seen = {}
+
+    def factory(import_id, authorization=None):
+        seen["import_id"] = import_id
+        seen["authorization"] = authorization
+        return [("validate", lambda rows: rows), ("upsert", lambda rows: rows)]
+
+    monkeypatch.setattr(jobs, "stage_factory", factory)
+    return seen
+
+
+def test_upload_csv_pipeline_mode(client, job_sessions, fake_stages):
+    rows = "".join(_row(i).replace("STR-", "ASY-") for i in range(5))
+    files = {"file": ("catalogo.csv", CSV_HEADERS + rows, "text/csv")}
+
+    resp = client.post(
+        "/upload-csv?pipeline=true&chunk_size=2", files=files, headers={"Authorization": "Bearer abc"}
+    )
+    assert resp.status_code == 202
+    import_id = resp.json()["import_id"]
+
+    body = _wait_for(client, import_id)
+    assert body["status"] == jobs.JOB_COMPLETED
+    assert str(fake_stages["import_id"]) == import_id
+    assert fake_stages["authorization"] == "Bearer abc"
+
+    stages = body["pipeline"]["stages"]
+    assert stages["ingest"]["batches"] == 3
+    assert stages["upsert"]["rows_out"] == 5
+    assert import_id not in {str(k) for k in pipeline.running}
@@ -0,0 +1,63 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app import listing
+from app.models import ProductStaging
+
+
+@pytest.fixture
+def staged(db_session, monkeypatch):
+    # Lotes pequeños para recorrer varias particiones del cursor
+    monkeypatch.setattr(listing, "EXPORT_BATCH_SIZE", 2)
+    db_session.add_all([
+        ProductStaging(
+            sku=f"EXP-{i}",
+            name=f"P{i}",
+            unit_price=5 + i,
+            validation_status="VALID" if i < 3 else "PENDING",
+            created_by="tester",
+        )
+        for i in range(5)
+    ])
+    db_session.commit()
+
+
+def test_export_ndjson_streams_all_rows(client, staged):
+    resp = client.get("/staging-products/export")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["sku"] for r in rows] == [f"EXP-{i}" for i in range(5)]
+    assert rows[0]["unit_price"] == 5.0
+    assert isinstance(rows[0]["created_at"], str)
+
+
+def test_export_csv_with_projection_and_filter(client, staged):
+    resp = client.get("/staging-products/export?format=csv&fields=sku,unit_price&validation_status=VALID")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.reader(io.StringIO(resp.text)))
+    assert rows == [["sku", "unit_price"], ["EXP-0", "5.0"], ["EXP-1", "6.0"], ["EXP-2", "7.0"]]
+
+
+def test_export_gzip_content_encoding(staged):
+    chunks = listing.gzip_chunks([b'{"a":1}\n', b'{"a":2}\n'])
+    assert gzip.decompress(b"".join(chunks)) == b'{"a":1}\n{"a":2}\n'
+
+
+def test_export_gzip_endpoint(client, staged):
+    resp = client.get("/staging-products/export?gzip=true&fields=sku")
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    # httpx descomprime de forma transparente
+    assert len(resp.text.splitlines()) == 5
+
+
+def test_export_invalid_format(client):
+    assert client.get("/staging-products/export?format=xml").status_code == 400
@@ -0,0 +1,77 @@
+import uuid
+
+import pytest
+
+from app.listing import decode_cursor, encode_cursor, parse_fields
+from app.models import ProductStaging
+
+IMPORT_A = uuid.UUID("00000000-0000-0000-0000-00000000000a")
+IMPORT_B = uuid.UUID("00000000-0000-0000-0000-00000000000b")
+
+
+@pytest.fixture
+def staged(db_session):
+    products = [
+        ProductStaging(
+            sku=f"KS-{i}",
+            name=f"P{i}",
+            unit_price=10 + i,
+            import_id=IMPORT_A if i < 3 else IMPORT_B,
+            validation_status="VALID" if i % 2 else "PENDING",
+            processed=i == 4,
+            created_by="tester",
+        )
+        for i in range(5)
+    ]
+    db_session.add_all(products)
+    db_session.commit()
+    return products
+
+
+def _all_pages(client, query):
+    items, cursor = [], None
+    while True:
+        url = f"/staging-products?{query}" + (f"&cursor={cursor}" if cursor else "")
+        resp = client.get(url)
+        assert resp.status_code == 200
+        items.extend(resp.json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+
+
+def test_keyset_pages_cover_all_rows_in_order(client, staged):
+    items = _all_pages(client, "limit=2")
+    assert [p["sku"] for p in items] == [f"KS-{i}" for i in range(5)]
+    assert items[0]["unit_price"] == 10.0
+    assert items[0]["import_id"] == str(IMPORT_A)
+
+
+def test_fields_projection(client, staged):
+    resp = client.get("/staging-products?fields=sku,unit_price&limit=1")
+    assert resp.status_code == 200
+    assert resp.json() == [{"sku": "KS-0", "unit_price": 10.0}]
+    assert "X-Next-Cursor" in resp.headers
+
+
+def test_filters(client, staged):
+    by_import = _all_pages(client, f"fields=sku&import_id={IMPORT_B}&limit=1")
+    assert [p["sku"] for p in by_import] == ["KS-3", "KS-4"]
+
+    valid = client.get("/staging-products?fields=sku&validation_status=VALID").json()
+    assert [p["sku"] for p in valid] == ["KS-1", "KS-3"]
+
+    processed = client.get("/staging-products?fields=sku&processed=true").json()
+    assert [p["sku"] for p in processed] == ["KS-4"]
+
+
+def test_invalid_fields_and_cursor(client):
+    assert client.get("/staging-products?fields=sku,password").status_code == 400
+    assert client.get("/staging-products?cursor=no-es-un-cursor").status_code == 400
+
+
+def test_cursor_roundtrip_and_parse_fields():
+    assert decode_cursor(encode_cursor(1234)) == 1234
+    assert parse_fields("sku, name,sku") == ["sku", "name"]
+    with pytest.raises(ValueError):
+        parse_fields(",")
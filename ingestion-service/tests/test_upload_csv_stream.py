@@ -0,0 +1,112 @@
+import io
+
+import pandas as pd
+
+from app.ingest import ImportSummary, iter_csv_chunks, normalize_chunk
+from app.models import ProductStaging
+from app.utils import read_csv
+
+CSV_HEADERS = (
+    "sku,name,description,category,manufacturer,storage_type,"
+    "min_shelf_life_months,expiration_date,batch_number,cold_chain_required,"
+    "certifications,commercialization_auth,country_regulations,unit_price,"
+    "purchase_conditions,delivery_time_hours,external_code,import_id\n"
+)
+
+
+def _row(i, category="Cat", cold="false", price="10.00"):
+    return (
+        f"STR-{i},Prod {i},Desc,{category},Man,Type,6,2025-01-01,B{i},{cold},"
+        f"Cert,Auth,Reg,{price},Cond,24,EXT-{i},\n"
+    )
+
+
+def test_upload_csv_stream_multiple_chunks(client, db_session):
+    rows = [
+        _row(1, cold="true", price="10.00"),
+        _row(2, cold="yes", price="20.00"),
+        _row(3, category="Otra", price=""),
+        _row(4, cold="1", price="30.00"),
+        _row(5, category="Otra", cold="no", price="abc"),
+    ]
+    files = {"file": ("test.csv", CSV_HEADERS + "".join(rows), "text/csv")}
+
+    resp = client.post("/upload-csv?stream=true&chunk_size=2", files=files)
+    assert resp.status_code == 201
+
+    body = resp.json()
+    assert body["summary"]["total_products"] == 5
+    assert body["summary"]["categories_count"] == {"Cat": 3, "Otra": 2}
+    assert body["summary"]["cold_chain_required_count"] == 3
+    assert body["summary"]["avg_unit_price"] == 20.0
+
+    stored = db_session.query(ProductStaging).filter(ProductStaging.sku.like("STR-%")).all()
+    assert len(stored) == 5
+    # Un único import_id por archivo
+    assert {str(p.import_id) for p in stored} == {body["import_id"]}
+    p3 = next(p for p in stored if p.sku == "STR-3")
+    assert p3.unit_price is None
+    assert p3.min_shelf_life_months == 6
+    assert p3.cold_chain_required is False
+
+
+def test_upload_csv_stream_missing_column(client):
+    files = {"file": ("test.csv", "sku,name\nA1,Product Test", "text/csv")}
+    resp = client.post("/upload-csv?stream=true", files=files)
+    assert resp.status_code == 400
+    assert "Faltan columnas" in resp.json()["detail"]
+
+
+def test_upload_csv_stream_duplicate_sku_rolls_back(client, db_session):
+    data = CSV_HEADERS + _row(10) + _row(11) + _row(10)
+    files = {"file": ("test.csv", data, "text/csv")}
+    resp = client.post("/upload-csv?stream=true&chunk_size=2", files=files)
+    assert resp.status_code == 500
+    assert "Error al insertar los datos" in resp.json()["detail"]
+
+
+def test_upload_csv_stream_invalid_chunk_size(client):
+    files = {"file": ("test.csv", CSV_HEADERS + _row(20), "text/csv")}
+    resp = client.post("/upload-csv?stream=true&chunk_size=0", files=files)
+    assert resp.status_code == 400
+
+
+def test_normalize_chunk_and_summary():
+    chunks = list(iter_csv_chunks(io.BytesIO((CSV_HEADERS + _row(1) + _row(2, cold="TRUE")).encode()), 1))
+    assert len(chunks) == 2
+
+    summary = ImportSummary()
+    for chunk in chunks:
+        normalized = normalize_chunk(chunk)
+        assert normalized["expiration_date"].iloc[0].isoformat() == "2025-01-01"
+        assert normalized["min_shelf_life_months"].dtype == pd.Int64Dtype()
+        summary.update(normalized)
+
+    assert summary.to_dict() == {
+        "total_products": 2,
+        "categories_count": {"Cat": 2},
+        "cold_chain_required_count": 1,
+        "avg_unit_price": 10.0,
+    }
+
+
+def test_content_hash_igual_en_ambos_modos(tmp_path, client, db_session):
+    # external_code numérico con un vacío: sin dtype=str pandas lo infiere como float ("123.0")
+    data = CSV_HEADERS + _row(30).replace("EXT-30", "123") + _row(31).replace("EXT-31", "")
+    path = tmp_path / "modos.csv"
+    path.write_text(data)
+
+    default = normalize_chunk(read_csv(str(path)))
+    stream = normalize_chunk(next(iter_csv_chunks(io.BytesIO(data.encode()))))
+    inferido = normalize_chunk(pd.read_csv(io.StringIO(data)))
+
+    assert default["external_code"].iloc[0] == stream["external_code"].iloc[0] == "123"
+    assert inferido["external_code"].iloc[0] == "123"
+    assert default["external_code"].iloc[1] is None
+    assert list(default["content_hash"]) == list(stream["content_hash"]) == list(inferido["content_hash"])
+
+    resp = client.post("/upload-csv", files={"file": ("modos.csv", data, "text/csv")})
+    assert resp.status_code == 201
+    stored = db_session.query(ProductStaging).filter(ProductStaging.sku == "STR-30").one()
+    assert stored.external_code == "123"
+    assert stored.content_hash == stream["content_hash"].iloc[0]
@@ -0,0 +1,74 @@
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, inspect
+
+from app.models import ProductStaging, add_missing_columns
+
+from tests.test_upload_csv_stream import CSV_HEADERS
+
+
+def _row(i, price="10.00", name=None):
+    return (
+        f"UPS-{i},{name or f'Prod {i}'},Desc,Cat,Man,Type,6,2025-01-01,B{i},false,"
+        f"Cert,Auth,Reg,{price},Cond,24,EXT-{i},\n"
+    )
+
+
+def _upload(client, rows, mode="stream=true&"):
+    files = {"file": ("test.csv", CSV_HEADERS + "".join(rows), "text/csv")}
+    return client.post(f"/upload-csv?{mode}upsert=true&chunk_size=2", files=files)
+
+
+def test_upsert_resend_only_revalidates_changed_rows(client, db_session):
+    first = _upload(client, [_row(1), _row(2), _row(3)])
+    assert first.status_code == 201
+    assert first.json()["rows_inserted"] == 3
+
+    # Simula que el validador y el upserter ya procesaron la primera carga
+    db_session.query(ProductStaging).filter(ProductStaging.sku.like("UPS-%")).update(
+        {"validation_status": "VALID", "processed": True}, synchronize_session=False
+    )
+    db_session.commit()
+
+    second = _upload(client, [_row(1), _row(2, price="12.50"), _row(3), _row(4)])
+    assert second.status_code == 201
+    body = second.json()
+    assert body["rows_inserted"] == 1
+    assert body["rows_updated"] == 1
+    assert body["rows_unchanged"] == 2
+    assert body["summary"]["total_products"] == 4
+
+    db_session.expire_all()
+    stored = {p.sku: p for p in db_session.query(ProductStaging).filter(ProductStaging.sku.like("UPS-%"))}
+    assert stored["UPS-1"].validation_status == "VALID" and stored["UPS-1"].processed is True
+    assert stored["UPS-2"].validation_status == "PENDING" and stored["UPS-2"].processed is False
+    assert float(stored["UPS-2"].unit_price) == 12.5
+    assert str(stored["UPS-2"].import_id) == body["import_id"]
+    assert str(stored["UPS-1"].import_id) == first.json()["import_id"]
+    assert stored["UPS-4"].validation_status == "PENDING"
+
+
+def test_upsert_default_mode_keeps_last_duplicate_in_file(client, db_session):
+    resp = _upload(client, [_row(10, name="Viejo"), _row(10, name="Nuevo")], mode="")
+    assert resp.status_code == 201
+    body = resp.json()
+    assert body["rows_inserted"] == 1
+    assert body["rows_rejected"] == 1
+
+    stored = db_session.query(ProductStaging).filter(ProductStaging.sku == "UPS-10").one()
+    assert stored.name == "Nuevo"
+    assert stored.content_hash is not None
+
+
+def test_add_missing_columns_alters_existing_table(tmp_path):
+    eng = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    legacy = MetaData()
+    Table(
+        "products_stg", legacy,
+        Column("product_id", Integer, primary_key=True),
+        Column("sku", String(50)),
+    )
+    legacy.create_all(eng)
+
+    add_missing_columns(eng, [ProductStaging.__table__])
+
+    columns = {c["name"] for c in inspect(eng).get_columns("products_stg")}
+    assert {"content_hash", "validation_status", "processed"} <= columns
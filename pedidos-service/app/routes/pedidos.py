@@ -27,6 +27,7 @@ async def crear_pedido(
     request: CrearPedidoRequest,
     usuario_id: int = Header(..., alias="usuario-id", description="ID del usuario desde el token JWT"),
     rol_usuario: str = Header(..., alias="rol-usuario", description="Rol del usuario: 'usuario_institucional' o 'admin'"),
+    authorization: Optional[str] = Header(None, description="Se reenvía al product-service al consultar inventario"),
     db: Session = Depends(get_db)
 ):
     """
@@ -62,7 +63,8 @@ async def crear_pedido(
             request=request,
             usuario_id=usuario_id,
             rol_usuario=rol_usuario,
-            db=db
+            db=db,
+            authorization=authorization
         )
         
         if exito:
@@ -249,6 +251,7 @@ async def validar_inventario_productos(
     request: CrearPedidoRequest,
     usuario_id: int = Header(..., alias="usuario-id"),
     rol_usuario: str = Header(..., alias="rol-usuario"),
+    authorization: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -257,7 +260,7 @@ async def validar_inventario_productos(
     """
     try:
         valido, validaciones, mensaje = await PedidosService.validar_pedido(
-            request, usuario_id, rol_usuario
+            request, usuario_id, rol_usuario, authorization
         )
         
         return {
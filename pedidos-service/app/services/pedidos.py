@@ -10,6 +10,7 @@ from uuid import uuid4
 from app.models.pedido import Pedido, DetallePedido, EstadoPedido
 from app.schemas.pedido import (
     CrearPedidoRequest, 
+    ProductoEnPedidoCreate,
     ValidacionInventarioResult,
     PedidoResponse,
     DetallePedidoResponse
@@ -41,95 +42,110 @@ class PedidosService:
         return f"PED-{nuevo_numero:06d}"
     
     @staticmethod
-    async def validar_inventario_producto(
-        producto_id: str, 
-        cantidad_solicitada: int
-    ) -> Tuple[bool, int, float, str]:
+    async def consultar_inventario(
+        productos: List[ProductoEnPedidoCreate],
+        authorization: Optional[str] = None
+    ) -> List[Dict]:
         """
-        Valida la disponibilidad de inventario de un producto en el product-service
-        
-        Retorna: (disponible, cantidad_disponible, precio, mensaje)
+        Consulta disponibilidad, precio y nombre de todos los productos del
+        pedido en una sola llamada (POST /api/v1/inventario:lookup del
+        product-service). `authorization` es el header Authorization del
+        cliente: se reenvía tal cual porque product-service lo exige.
+
+        Retorna un dict por producto, en el mismo orden:
+        {producto_id, disponible, cantidad_disponible, precio, nombre, mensaje}
+
+        Si un producto aparece en varias líneas se consulta una vez con la
+        suma de sus cantidades: todas esas líneas comparten el resultado.
         """
+        def error(mensaje: str) -> List[Dict]:
+            return [
+                {"producto_id": p.producto_id, "disponible": False, "cantidad_disponible": 0,
+                 "precio": 0.0, "nombre": None, "mensaje": mensaje}
+                for p in productos
+            ]
+
+        # Cantidad total por producto, en orden de primera aparición
+        totales: Dict[str, int] = {}
+        for p in productos:
+            totales[p.producto_id] = totales.get(p.producto_id, 0) + p.cantidad_solicitada
+
+        payload = {
+            "items": [{"productoId": producto_id, "cantidad": cantidad} for producto_id, cantidad in totales.items()]
+        }
+        headers = {"Authorization": authorization} if authorization else {}
         try:
             async with httpx.AsyncClient(timeout=PedidosService.REQUEST_TIMEOUT) as client:
-                url = f"{PedidosService.PRODUCT_SERVICE_URL}/api/productos/{producto_id}/inventario"
-                response = await client.get(url)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    cantidad_disponible = data.get("cantidad_disponible", 0)
-                    precio = data.get("precio", 0.0)
-                    disponible = cantidad_disponible >= cantidad_solicitada
-                    
-                    if disponible:
-                        return True, cantidad_disponible, precio, "Inventario disponible"
-                    else:
-                        return False, cantidad_disponible, precio, f"Inventario insuficiente. Disponible: {cantidad_disponible}"
-                
-                elif response.status_code == 404:
-                    return False, 0, 0.0, "Producto no encontrado"
-                else:
-                    logger.warning(f"Error al validar producto {producto_id}: {response.status_code}")
-                    return False, 0, 0.0, "Error al consultar inventario"
-                    
+                url = f"{PedidosService.PRODUCT_SERVICE_URL}/api/v1/inventario:lookup"
+                response = await client.post(url, json=payload, headers=headers)
         except httpx.TimeoutException:
-            logger.error(f"Timeout al consultar inventario para {producto_id}")
-            return False, 0, 0.0, "Timeout al consultar inventario"
+            logger.error("Timeout al consultar inventario")
+            return error("Timeout al consultar inventario")
         except Exception as e:
-            logger.error(f"Error validando inventario: {e}")
-            return False, 0, 0.0, f"Error: {str(e)}"
-    
-    @staticmethod
-    async def obtener_info_producto(producto_id: str) -> Optional[Dict]:
-        """Obtiene la información completa de un producto"""
+            logger.error(f"Error consultando inventario: {e}")
+            return error(f"Error: {str(e)}")
+
+        if response.status_code != 200:
+            logger.warning(f"Error al consultar inventario: {response.status_code}")
+            return error("Error al consultar inventario")
+
         try:
-            async with httpx.AsyncClient(timeout=PedidosService.REQUEST_TIMEOUT) as client:
-                url = f"{PedidosService.PRODUCT_SERVICE_URL}/api/productos/{producto_id}"
-                response = await client.get(url)
-                
-                if response.status_code == 200:
-                    return response.json()
-                
-                logger.warning(f"Producto {producto_id} no encontrado")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error obteniendo info de producto: {e}")
-            return None
-    
+            items = response.json()["items"]
+            por_producto = {
+                item["productoId"]: {
+                    "disponible": bool(item["disponible"]),
+                    "cantidad_disponible": item["cantidad_disponible"],
+                    "precio": item["precio"] or 0.0,
+                    "nombre": item["nombre"],
+                    "mensaje": item["mensaje"],
+                }
+                for item in items
+            }
+            if set(por_producto) != set(totales):
+                raise ValueError("la respuesta no trae todos los productos consultados")
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Respuesta de inventario inválida: {e}")
+            return error("Error al consultar inventario")
+
+        return [{"producto_id": p.producto_id, **por_producto[p.producto_id]} for p in productos]
+
+    @staticmethod
+    def _validaciones(
+        productos: List[ProductoEnPedidoCreate],
+        inventario: List[Dict]
+    ) -> Tuple[bool, List[ValidacionInventarioResult]]:
+        """Resultado de validación por producto a partir de consultar_inventario"""
+        validaciones = [
+            ValidacionInventarioResult(
+                producto_id=producto.producto_id,
+                disponible=item["disponible"],
+                cantidad_disponible=item["cantidad_disponible"],
+                cantidad_solicitada=producto.cantidad_solicitada,
+                mensaje=item["mensaje"]
+            )
+            for producto, item in zip(productos, inventario)
+        ]
+        return all(v.disponible for v in validaciones), validaciones
+
     @staticmethod
     async def validar_pedido(
         request: CrearPedidoRequest,
         usuario_id: int,
-        rol_usuario: str
+        rol_usuario: str,
+        authorization: Optional[str] = None
     ) -> Tuple[bool, List[ValidacionInventarioResult], str]:
         """
         Valida completamente un pedido verificando:
         1. Que todos los productos existan
         2. Que haya inventario suficiente para cada uno
-        
+
+        Una sola llamada al product-service para todo el pedido.
+
         Retorna: (valido, validaciones, mensaje_error)
         """
-        validaciones = []
-        todos_validos = True
-        
-        for producto in request.productos:
-            disponible, cantidad_disp, precio, mensaje = await PedidosService.validar_inventario_producto(
-                producto.producto_id,
-                producto.cantidad_solicitada
-            )
-            
-            validaciones.append(ValidacionInventarioResult(
-                producto_id=producto.producto_id,
-                disponible=disponible,
-                cantidad_disponible=cantidad_disp,
-                cantidad_solicitada=producto.cantidad_solicitada,
-                mensaje=mensaje
-            ))
-            
-            if not disponible:
-                todos_validos = False
-        
+        inventario = await PedidosService.consultar_inventario(request.productos, authorization)
+        todos_validos, validaciones = PedidosService._validaciones(request.productos, inventario)
+
         if todos_validos:
             return True, validaciones, ""
         else:
@@ -141,7 +157,8 @@ class PedidosService:
         request: CrearPedidoRequest,
         usuario_id: int,
         rol_usuario: str,
-        db: Session
+        db: Session,
+        authorization: Optional[str] = None
     ) -> Tuple[bool, Optional[PedidoResponse], str, List[ValidacionInventarioResult]]:
         """
         Crea un nuevo pedido en la base de datos
@@ -149,13 +166,13 @@ class PedidosService:
         Retorna: (exito, pedido_response, mensaje, validaciones)
         """
         try:
-            # Validar el pedido
-            valido, validaciones, error_msg = await PedidosService.validar_pedido(
-                request, usuario_id, rol_usuario
-            )
+            # Validar el pedido: una consulta de inventario (snapshot de
+            # cantidad, precio y nombre) para todos los productos
+            inventario = await PedidosService.consultar_inventario(request.productos, authorization)
+            valido, validaciones = PedidosService._validaciones(request.productos, inventario)
             
             if not valido:
-                return False, None, error_msg, validaciones
+                return False, None, "Inventario insuficiente para uno o más productos", validaciones
             
             # Generar número de pedido
             numero_pedido = PedidosService.generar_numero_pedido(db)
@@ -173,20 +190,10 @@ class PedidosService:
             monto_total = 0.0
             
             # Agregar detalles del pedido
-            for producto in request.productos:
-                # Obtener info del producto para el nombre
-                info_producto = await PedidosService.obtener_info_producto(producto.producto_id)
-                nombre_producto = info_producto.get("nombre", "Producto desconocido") if info_producto else "Producto desconocido"
-                
-                # Validar inventario nuevamente (snapshot)
-                disponible, cantidad_disp, precio, _ = await PedidosService.validar_inventario_producto(
-                    producto.producto_id,
-                    producto.cantidad_solicitada
-                )
-                
-                if not disponible:
-                    logger.error(f"Inventario insuficiente para {producto.producto_id}")
-                    raise Exception(f"Inventario insuficiente para {nombre_producto}")
+            for producto, item in zip(request.productos, inventario):
+                nombre_producto = item["nombre"] or "Producto desconocido"
+                cantidad_disp = item["cantidad_disponible"]
+                precio = item["precio"]
                 
                 subtotal = producto.cantidad_solicitada * precio
                 monto_total += subtotal
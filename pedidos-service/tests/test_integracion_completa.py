@@ -62,6 +62,33 @@ PRODUCTOS_PRUEBA = [
 ]
 
 
+def mock_consultar_inventario(productos, authorization=None):
+    """Mock de PedidosService.consultar_inventario con los productos de prueba"""
+    resultado = []
+    for solicitado in productos:
+        producto = next(
+            (p for p in PRODUCTOS_PRUEBA if p["producto_id"] == solicitado.producto_id), None
+        )
+        if producto is None:
+            resultado.append({
+                "producto_id": solicitado.producto_id, "disponible": False,
+                "cantidad_disponible": 0, "precio": 0.0, "nombre": None,
+                "mensaje": "Producto no encontrado"
+            })
+            continue
+        disponible = solicitado.cantidad_solicitada <= producto["cantidad_disponible"]
+        resultado.append({
+            "producto_id": producto["producto_id"],
+            "disponible": disponible,
+            "cantidad_disponible": producto["cantidad_disponible"],
+            "precio": producto["precio"],
+            "nombre": producto["nombre"],
+            "mensaje": "Inventario disponible" if disponible
+            else f"Inventario insuficiente. Disponible: {producto['cantidad_disponible']}"
+        })
+    return resultado
+
+
 class TestIntegracionCompleta:
     """Tests de integración completa entre servicios"""
 
@@ -117,57 +144,20 @@ class TestIntegracionCompleta:
             "productos": productos_pedido
         }
         
-        # Mock del servicio de inventario
-        def mock_validar_inventario(producto_id, cantidad):
-            """Mock que valida inventario de los productos de prueba"""
-            for producto in PRODUCTOS_PRUEBA:
-                if producto["producto_id"] == producto_id:
-                    if cantidad <= producto["cantidad_disponible"]:
-                        return (
-                            True,
-                            producto["cantidad_disponible"],
-                            producto["precio"],
-                            "Inventario disponible"
-                        )
-                    else:
-                        return (
-                            False,
-                            producto["cantidad_disponible"],
-                            producto["precio"],
-                            f"Cantidad insuficiente. Disponible: {producto['cantidad_disponible']}"
-                        )
-            return (False, 0, 0, "Producto no encontrado")
-        
-        def mock_obtener_info_producto(producto_id):
-            """Mock que obtiene información del producto"""
-            for producto in PRODUCTOS_PRUEBA:
-                if producto["producto_id"] == producto_id:
-                    return {
-                        "producto_id": producto["producto_id"],
-                        "nombre": producto["nombre"],
-                        "precio": producto["precio"],
-                        "cantidad_disponible": producto["cantidad_disponible"]
-                    }
-            return None
-        
         # Ejecutar el request con mocks
-        with patch("app.services.pedidos.PedidosService.validar_inventario_producto") as mock_validar:
-            with patch("app.services.pedidos.PedidosService.obtener_info_producto") as mock_info:
-                
-                # Configurar los mocks para que usen nuestras funciones
-                mock_validar.side_effect = lambda producto_id, cantidad: mock_validar_inventario(producto_id, cantidad)
-                mock_info.side_effect = lambda producto_id: mock_obtener_info_producto(producto_id)
-                
-                # Crear el pedido con headers correctos
-                response = client.post(
-                    "/api/v1/pedidos/",
-                    json=payload,
-                    headers={
-                        "usuario-id": str(usuario_id),
-                        "rol-usuario": "usuario_institucional"
-                    }
-                )
-        
+        with patch("app.services.pedidos.PedidosService.consultar_inventario") as mock_inventario:
+            mock_inventario.side_effect = mock_consultar_inventario
+
+            # Crear el pedido con headers correctos
+            response = client.post(
+                "/api/v1/pedidos/",
+                json=payload,
+                headers={
+                    "usuario-id": str(usuario_id),
+                    "rol-usuario": "usuario_institucional"
+                }
+            )
+
         # 4. Validar respuesta
         print(f"\nRespuesta del servidor: {response.status_code}")
         data = response.json()
@@ -222,42 +212,18 @@ class TestIntegracionCompleta:
             "productos": productos_pedido
         }
         
-        # 3. Mock de validación
-        def mock_validar_inventario(producto_id, cantidad):
-            for producto in PRODUCTOS_PRUEBA:
-                if producto["producto_id"] == producto_id:
-                    if cantidad <= producto["cantidad_disponible"]:
-                        return (True, producto["cantidad_disponible"], producto["precio"], "OK")
-                    else:
-                        return (False, producto["cantidad_disponible"], producto["precio"], "Insuficiente")
-            return (False, 0, 0, "No encontrado")
-        
-        def mock_obtener_info_producto(producto_id):
-            for producto in PRODUCTOS_PRUEBA:
-                if producto["producto_id"] == producto_id:
-                    return {
-                        "producto_id": producto["producto_id"],
-                        "nombre": producto["nombre"],
-                        "precio": producto["precio"],
-                        "cantidad_disponible": producto["cantidad_disponible"]
-                    }
-            return None
-        
-        with patch("app.services.pedidos.PedidosService.validar_inventario_producto") as mock_validar:
-            with patch("app.services.pedidos.PedidosService.obtener_info_producto") as mock_info:
-                
-                mock_validar.side_effect = lambda producto_id, cantidad: mock_validar_inventario(producto_id, cantidad)
-                mock_info.side_effect = lambda producto_id: mock_obtener_info_producto(producto_id)
-                
-                response = client.post(
-                    "/api/v1/pedidos/",
-                    json=payload,
-                    headers={
-                        "usuario-id": str(gerente_id),
-                        "rol-usuario": "admin"
-                    }
-                )
-        
+        with patch("app.services.pedidos.PedidosService.consultar_inventario") as mock_inventario:
+            mock_inventario.side_effect = mock_consultar_inventario
+
+            response = client.post(
+                "/api/v1/pedidos/",
+                json=payload,
+                headers={
+                    "usuario-id": str(gerente_id),
+                    "rol-usuario": "admin"
+                }
+            )
+
         # 4. Validar respuesta
         print(f"\n[GERENTE] Respuesta: {response.status_code}")
         data = response.json()
@@ -300,38 +266,18 @@ class TestIntegracionCompleta:
                 "productos": productos_pedido
             }
             
-            def mock_validar_inventario(producto_id, cantidad):
-                for producto in PRODUCTOS_PRUEBA:
-                    if producto["producto_id"] == producto_id:
-                        return (True, producto["cantidad_disponible"], producto["precio"], "OK")
-                return (False, 0, 0, "No encontrado")
-            
-            def mock_obtener_info_producto(producto_id):
-                for producto in PRODUCTOS_PRUEBA:
-                    if producto["producto_id"] == producto_id:
-                        return {
-                            "producto_id": producto["producto_id"],
-                            "nombre": producto["nombre"],
-                            "precio": producto["precio"],
-                            "cantidad_disponible": producto["cantidad_disponible"]
-                        }
-                return None
-            
-            with patch("app.services.pedidos.PedidosService.validar_inventario_producto") as mock_validar:
-                with patch("app.services.pedidos.PedidosService.obtener_info_producto") as mock_info:
-                    
-                    mock_validar.side_effect = lambda pid, cant: mock_validar_inventario(pid, cant)
-                    mock_info.side_effect = lambda pid: mock_obtener_info_producto(pid)
-                    
-                    client.post(
-                        "/api/v1/pedidos/",
-                        json=payload,
-                        headers={
-                            "usuario-id": str(usuario_id),
-                            "rol-usuario": "usuario_institucional"
-                        }
-                    )
-        
+            with patch("app.services.pedidos.PedidosService.consultar_inventario") as mock_inventario:
+                mock_inventario.side_effect = mock_consultar_inventario
+
+                client.post(
+                    "/api/v1/pedidos/",
+                    json=payload,
+                    headers={
+                        "usuario-id": str(usuario_id),
+                        "rol-usuario": "usuario_institucional"
+                    }
+                )
+
         # Listar pedidos del usuario
         response = client.get(
             "/api/v1/pedidos/",
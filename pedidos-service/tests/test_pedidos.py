@@ -2,6 +2,11 @@ import pytest
 from unittest.mock import patch, AsyncMock
 import json
 
+import httpx
+
+from app.schemas.pedido import ProductoEnPedidoCreate
+from app.services.pedidos import PedidosService
+
 """
 Tests para los requisitos de negocio BDD especificados:
 
@@ -49,25 +54,24 @@ class TestCrearPedidoGerente:
             ]
         }
         
-        with patch("app.services.pedidos.PedidosService.validar_inventario_producto") as mock_validar:
-            mock_validar.return_value = (
-                True,
-                producto_disponible["cantidad_disponible"],
-                producto_disponible["precio"],
-                "Inventario disponible"
-            )
+        with patch("app.services.pedidos.PedidosService.consultar_inventario") as mock_inventario:
+            mock_inventario.return_value = [{
+                "producto_id": producto_disponible["producto_id"],
+                "disponible": True,
+                "cantidad_disponible": producto_disponible["cantidad_disponible"],
+                "precio": producto_disponible["precio"],
+                "nombre": producto_disponible["nombre"],
+                "mensaje": "Inventario disponible"
+            }]
             
-            with patch("app.services.pedidos.PedidosService.obtener_info_producto") as mock_info:
-                mock_info.return_value = mock_response
-                
-                response = client.post(
-                    "/api/v1/pedidos/",
-                    json=payload,
-                    headers={
-                        "usuario_id": str(usuario_vendedor["usuario_id"]),
-                        "rol_usuario": usuario_vendedor["rol_usuario"]
-                    }
-                )
+            response = client.post(
+                "/api/v1/pedidos/",
+                json=payload,
+                headers={
+                    "usuario_id": str(usuario_vendedor["usuario_id"]),
+                    "rol_usuario": usuario_vendedor["rol_usuario"]
+                }
+            )
         
         assert response.status_code == 200
         data = response.json()
@@ -103,13 +107,15 @@ class TestCrearPedidoGerente:
             ]
         }
         
-        with patch("app.services.pedidos.PedidosService.validar_inventario_producto") as mock_validar:
-            mock_validar.return_value = (
-                False,
-                producto_stock_bajo["cantidad_disponible"],  # 5
-                producto_stock_bajo["precio"],
-                f"Inventario insuficiente. Disponible: {producto_stock_bajo['cantidad_disponible']}"
-            )
+        with patch("app.services.pedidos.PedidosService.consultar_inventario") as mock_inventario:
+            mock_inventario.return_value = [{
+                "producto_id": producto_stock_bajo["producto_id"],
+                "disponible": False,
+                "cantidad_disponible": producto_stock_bajo["cantidad_disponible"],  # 5
+                "precio": producto_stock_bajo["precio"],
+                "nombre": producto_stock_bajo["nombre"],
+                "mensaje": f"Inventario insuficiente. Disponible: {producto_stock_bajo['cantidad_disponible']}"
+            }]
             
             response = client.post(
                 "/api/v1/pedidos/",
@@ -156,28 +162,24 @@ class TestCrearPedidoClienteInstitucional:
             ]
         }
         
-        with patch("app.services.pedidos.PedidosService.validar_inventario_producto") as mock_validar:
-            mock_validar.return_value = (
-                True,
-                producto_disponible["cantidad_disponible"],
-                producto_disponible["precio"],
-                "Inventario disponible"
-            )
+        with patch("app.services.pedidos.PedidosService.consultar_inventario") as mock_inventario:
+            mock_inventario.return_value = [{
+                "producto_id": producto_disponible["producto_id"],
+                "disponible": True,
+                "cantidad_disponible": producto_disponible["cantidad_disponible"],
+                "precio": producto_disponible["precio"],
+                "nombre": producto_disponible["nombre"],
+                "mensaje": "Inventario disponible"
+            }]
             
-            with patch("app.services.pedidos.PedidosService.obtener_info_producto") as mock_info:
-                mock_info.return_value = {
-                    "producto_id": producto_disponible["producto_id"],
-                    "nombre": producto_disponible["nombre"]
+            response = client.post(
+                "/api/v1/pedidos/",
+                json=payload,
+                headers={
+                    "usuario_id": str(usuario_institucional["usuario_id"]),
+                    "rol_usuario": usuario_institucional["rol_usuario"]
                 }
-                
-                response = client.post(
-                    "/api/v1/pedidos/",
-                    json=payload,
-                    headers={
-                        "usuario_id": str(usuario_institucional["usuario_id"]),
-                        "rol_usuario": usuario_institucional["rol_usuario"]
-                    }
-                )
+            )
         
         assert response.status_code == 200
         data = response.json()
@@ -209,13 +211,15 @@ class TestCrearPedidoClienteInstitucional:
             ]
         }
         
-        with patch("app.services.pedidos.PedidosService.validar_inventario_producto") as mock_validar:
-            mock_validar.return_value = (
-                False,
-                0,  # Sin stock
-                producto_sin_stock["precio"],
-                "Producto sin disponibilidad"
-            )
+        with patch("app.services.pedidos.PedidosService.consultar_inventario") as mock_inventario:
+            mock_inventario.return_value = [{
+                "producto_id": producto_sin_stock["producto_id"],
+                "disponible": False,
+                "cantidad_disponible": 0,  # Sin stock
+                "precio": producto_sin_stock["precio"],
+                "nombre": producto_sin_stock["nombre"],
+                "mensaje": "Producto sin disponibilidad"
+            }]
             
             response = client.post(
                 "/api/v1/pedidos/",
@@ -254,13 +258,15 @@ class TestCrearPedidoClienteInstitucional:
             ]
         }
         
-        with patch("app.services.pedidos.PedidosService.validar_inventario_producto") as mock_validar:
-            mock_validar.return_value = (
-                False,
-                producto_stock_bajo["cantidad_disponible"],
-                producto_stock_bajo["precio"],
-                "Cantidad solicitada supera inventario disponible"
-            )
+        with patch("app.services.pedidos.PedidosService.consultar_inventario") as mock_inventario:
+            mock_inventario.return_value = [{
+                "producto_id": producto_stock_bajo["producto_id"],
+                "disponible": False,
+                "cantidad_disponible": producto_stock_bajo["cantidad_disponible"],
+                "precio": producto_stock_bajo["precio"],
+                "nombre": producto_stock_bajo["nombre"],
+                "mensaje": "Cantidad solicitada supera inventario disponible"
+            }]
             
             response = client.post(
                 "/api/v1/pedidos/",
@@ -406,6 +412,71 @@ class TestValidarInventario:
         assert data["valido"] == True
 
 
+class TestConsultarInventario:
+    """Consulta de inventario al product-service"""
+
+    @pytest.mark.asyncio
+    async def test_reenvia_authorization_en_una_llamada(self):
+        """Una sola llamada al lookup, con el Authorization del cliente"""
+        productos = [
+            ProductoEnPedidoCreate(producto_id="p-1", cantidad_solicitada=2),
+            ProductoEnPedidoCreate(producto_id="p-2", cantidad_solicitada=1),
+        ]
+        respuesta = httpx.Response(200, json={"items": [
+            {"productoId": "p-1", "disponible": True, "cantidad_disponible": 10,
+             "precio": 1500.0, "nombre": "Ibuprofeno", "mensaje": "Inventario disponible"},
+            {"productoId": "p-2", "disponible": False, "cantidad_disponible": 0,
+             "precio": None, "nombre": None, "mensaje": "Producto no encontrado"},
+        ]})
+
+        with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+            mock_post.return_value = respuesta
+            inventario = await PedidosService.consultar_inventario(productos, "Bearer abc")
+
+        mock_post.assert_awaited_once()
+        assert mock_post.call_args.args[0].endswith("/api/v1/inventario:lookup")
+        assert mock_post.call_args.kwargs["headers"] == {"Authorization": "Bearer abc"}
+        assert [i["disponible"] for i in inventario] == [True, False]
+        assert inventario[1]["precio"] == 0.0
+
+    @pytest.mark.asyncio
+    async def test_suma_lineas_del_mismo_producto(self):
+        """Dos líneas del mismo producto se validan contra la suma de sus cantidades"""
+        productos = [
+            ProductoEnPedidoCreate(producto_id="p-1", cantidad_solicitada=6),
+            ProductoEnPedidoCreate(producto_id="p-2", cantidad_solicitada=1),
+            ProductoEnPedidoCreate(producto_id="p-1", cantidad_solicitada=6),
+        ]
+        respuesta = httpx.Response(200, json={"items": [
+            {"productoId": "p-1", "disponible": False, "cantidad_disponible": 10,
+             "precio": 1500.0, "nombre": "Ibuprofeno", "mensaje": "Inventario insuficiente. Disponible: 10"},
+            {"productoId": "p-2", "disponible": True, "cantidad_disponible": 5,
+             "precio": 80.0, "nombre": "Vacuna", "mensaje": "Inventario disponible"},
+        ]})
+
+        with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+            mock_post.return_value = respuesta
+            inventario = await PedidosService.consultar_inventario(productos)
+
+        assert mock_post.call_args.kwargs["json"] == {"items": [
+            {"productoId": "p-1", "cantidad": 12}, {"productoId": "p-2", "cantidad": 1},
+        ]}
+        assert [i["producto_id"] for i in inventario] == ["p-1", "p-2", "p-1"]
+        assert [i["disponible"] for i in inventario] == [False, True, False]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cuerpo", [{"detail": "boom"}, {"items": [{"productoId": "p-1"}]}, {"items": []}, ["x"]])
+    async def test_respuesta_malformada_no_disponible(self, cuerpo):
+        """Un cuerpo inesperado se trata como error del servicio, no como 500"""
+        productos = [ProductoEnPedidoCreate(producto_id="p-1", cantidad_solicitada=1)]
+        with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+            mock_post.return_value = httpx.Response(200, json=cuerpo)
+            inventario = await PedidosService.consultar_inventario(productos)
+
+        assert inventario == [{"producto_id": "p-1", "disponible": False, "cantidad_disponible": 0,
+                               "precio": 0.0, "nombre": None, "mensaje": "Error al consultar inventario"}]
+
+
 class TestErrorHandling:
     """Tests para validación de errores"""
     
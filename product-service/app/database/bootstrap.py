@@ -0,0 +1,109 @@
+"""
+Arranque de product-service en segundo plano.
+
+El proceso atiende /health/live apenas sube; /health/ready responde 503
+hasta que arrancar() termina:
+1. la base existe y responde;
+2. create_all + índices faltantes + seed de categorías, bajo un advisory
+   lock (en un despliegue con varias réplicas solo una instancia a la vez
+   crea tablas o inserta categorías; las demás esperan y no encuentran
+   nada que hacer);
+3. registro de categorías cargado;
+4. pool precalentado con DB_POOL_PREWARM conexiones.
+
+Si un paso falla se reintenta todo con backoff (los pasos son idempotentes);
+mientras tanto la instancia sigue viva pero no lista.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import connection
+from app.database.redis_conn import get_redis
+from app.database.seed import seed_categories
+from app.service import categorias
+
+logger = logging.getLogger("uvicorn")
+
+BOOTSTRAP_RETRY_INITIAL_SECONDS = float(os.getenv("BOOTSTRAP_RETRY_INITIAL_SECONDS", "0.5"))
+BOOTSTRAP_RETRY_MAX_SECONDS = float(os.getenv("BOOTSTRAP_RETRY_MAX_SECONDS", "10"))
+
+
+@dataclass
+class EstadoArranque:
+    listo: bool = False
+    error: Optional[str] = None
+    intentos: int = 0
+    pasos: List[str] = field(default_factory=list)
+    duracion_segundos: Optional[float] = None
+
+
+estado = EstadoArranque()
+
+
+def _preparar(bind, redis_client) -> None:
+    if bind.dialect.name == "postgresql" and not connection.ensure_database_exists():
+        raise RuntimeError("No se pudo verificar/crear la base de datos")
+    if not connection.test_db_connection(bind):
+        raise RuntimeError("Base de datos no disponible")
+    estado.pasos.append("conexion")
+
+    with connection.advisory_lock(bind):
+        connection.init_db(bind)
+        with Session(bind=bind) as db:
+            agregadas = seed_categories(db)
+    estado.pasos.append("esquema")
+    if agregadas:
+        # Otras instancias recargan su registro de categorías
+        categorias.publicar_cambio(redis_client)
+
+    with Session(bind=bind) as db:
+        categorias.registro.cargar(db)
+    estado.pasos.append("categorias")
+
+    abiertas = connection.prewarm_pool(bind)
+    estado.pasos.append(f"pool:{abiertas}")
+
+
+def arrancar(bind=None, redis_client=None, max_intentos: Optional[int] = None) -> bool:
+    """
+    Ejecuta el arranque hasta que termine (o `max_intentos`); marca
+    estado.listo al final. Devuelve si quedó listo.
+    """
+    bind = bind or connection.engine
+    inicio = time.monotonic()
+    pausa = BOOTSTRAP_RETRY_INITIAL_SECONDS
+    while max_intentos is None or estado.intentos < max_intentos:
+        estado.intentos += 1
+        estado.pasos = []
+        try:
+            _preparar(bind, redis_client)
+        except Exception as e:
+            estado.error = str(e)
+            logger.warning(f"Arranque intento {estado.intentos} fallido ({e}); reintento en {pausa:.1f}s")
+            time.sleep(pausa)
+            pausa = min(pausa * 2, BOOTSTRAP_RETRY_MAX_SECONDS)
+            continue
+        estado.error = None
+        estado.duracion_segundos = round(time.monotonic() - inicio, 3)
+        estado.listo = True
+        logger.info(f"✅ Product service listo en {estado.duracion_segundos}s ({', '.join(estado.pasos)})")
+        return True
+    return False
+
+
+def arrancar_en_segundo_plano() -> threading.Thread:
+    """Lanza arrancar() en un hilo daemon; el servidor atiende mientras tanto."""
+    redis_client = get_redis()
+    categorias.registro.suscribir(redis_client)
+
+    thread = threading.Thread(
+        target=arrancar, kwargs={"redis_client": redis_client}, name="product-service-bootstrap", daemon=True
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,31 @@
+import os
+import threading
+
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2"))
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_redis():
+    """
+    Cliente Redis compartido (redis-py síncrono, con pool propio), creado al
+    primer uso. None si REDIS_URL no está configurado; los llamadores siguen
+    sin Redis (TTL / base de datos) en ese caso.
+    """
+    global _client
+    if not REDIS_URL:
+        return None
+    with _lock:
+        if _client is None:
+            import redis
+
+            _client = redis.Redis.from_url(
+                REDIS_URL,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+                health_check_interval=30,
+            )
+    return _client
+
@@ -22,10 +22,14 @@ SEED_CATEGORIES = [
     },
 ]
 
-def seed_categories(db: Session) -> None:
+def seed_categories(db: Session) -> int:
+    """Inserta las categorías que falten; devuelve cuántas agregó."""
+    added = 0
     for item in SEED_CATEGORIES:
         exists = db.get(CategoriaProducto, item["categoriaId"])
         if exists:
             continue
         db.add(CategoriaProducto(**item))
+        added += 1
     db.commit()
+    return added
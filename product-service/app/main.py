@@ -0,0 +1,71 @@
+# app/main.py
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from app.routes.products import router as products_router
+from app.routes.inventario import router as inventario_router
+from app.database import bootstrap
+import logging
+
+
+logger = logging.getLogger("uvicorn")
+
+app = FastAPI(
+    title="Product Service (HU-WEB-003)",
+    description="Microservicio de carga individual de productos médicos",
+    version="1.1.5"
+)
+
+# Endpoints “legacy” sin prefijo
+app.include_router(products_router)
+
+# CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["*"],
+    max_age=3600,
+)
+
+# Endpoints públicos versión v1
+app.include_router(products_router, prefix="/api/v1", tags=["products"])
+
+# Inventario (paths completos: /api/v1/inventario:lookup, /api/productos/{id}...)
+app.include_router(inventario_router)
+
+@app.on_event("startup")
+def startup_event():
+    # BD, tablas/seed (bajo advisory lock), categorías y pool en segundo plano
+    # (app/database/bootstrap.py); /health/ready indica cuándo terminó
+    logger.info("🔍 Iniciando arranque de product-service...")
+    bootstrap.arrancar_en_segundo_plano()
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "product-service"}
+
+@app.get("/health/live")
+async def liveness():
+    # El proceso atiende; no depende de la BD (no reiniciar por una BD lenta)
+    return {"status": "alive", "service": "product-service"}
+
+@app.get("/health/ready")
+async def readiness():
+    # Solo el estado del arranque en memoria: responde al instante
+    estado = bootstrap.estado
+    body = {
+        "status": "ready" if estado.listo else "starting",
+        "service": "product-service",
+        "pasos": estado.pasos,
+        "intentos": estado.intentos,
+    }
+    if not estado.listo:
+        body["error"] = estado.error
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8005, workers=1, loop="asyncio")
@@ -1,3 +1,4 @@
 from .category import CategoriaProducto
 from .product import Producto
-
+from .idempotencia import Idempotencia
+from .inventario import Inventario
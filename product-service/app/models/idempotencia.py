@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+
+from app.database.connection import Base
+
+
+class Idempotencia(Base):
+    """
+    Respaldo en base de las claves X-Idempotency-Key cuando Redis no está
+    disponible (ver app/service/idempotencia.py).
+    """
+    __tablename__ = "idempotencia"
+
+    clave = Column(String(200), primary_key=True)
+    huella = Column(String(32), nullable=False)        # hash del payload
+    estado = Column(String(1), nullable=False)          # P = en curso, D = terminada
+    status_code = Column(Integer, nullable=True)
+    respuesta = Column(LargeBinary, nullable=True)      # cuerpo JSON (orjson)
+    expira_en = Column(DateTime, nullable=False, index=True)
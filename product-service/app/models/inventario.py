@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Integer, Numeric, String
+
+from app.database.connection import Base
+
+
+class Inventario(Base):
+    """
+    Stock y precio de un producto (una fila por producto; sin fila = sin
+    stock ni precio). Tabla aparte de producto: create_all la agrega a bases
+    existentes sin migrar producto.
+    """
+    __tablename__ = "inventario"
+
+    productoId = Column(String, ForeignKey("producto.productoId", ondelete="CASCADE"), primary_key=True)
+    cantidad_disponible = Column(Integer, nullable=False, default=0)
+    precio = Column(Numeric(12, 2), nullable=True)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        CheckConstraint("cantidad_disponible >= 0", name="ck_inventario_cantidad_no_negativa"),
+        CheckConstraint("precio IS NULL OR precio >= 0", name="ck_inventario_precio_no_negativo"),
+    )
+
+
+# ---------------------------
+# Pydantic Schemas
+# ---------------------------
+class InventarioLookupItem(BaseModel):
+    productoId: str = Field(..., min_length=1, max_length=50)
+    cantidad: int = Field(1, ge=1)
+
+
+class InventarioLookupRequest(BaseModel):
+    items: List[InventarioLookupItem] = Field(..., min_length=1)
+
+
+class InventarioUpdate(BaseModel):
+    cantidad_disponible: int = Field(..., ge=0)
+    precio: Optional[float] = Field(None, ge=0)
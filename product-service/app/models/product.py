@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
-from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, DDL, Index, event, inspect
 from sqlalchemy.orm import relationship
 
 from pydantic import BaseModel
@@ -27,6 +27,8 @@ class Producto(Base):
     formaFarmaceutica = Column(String, nullable=True)
     requierePrescripcion = Column(Boolean, default=False)
     registroSanitario = Column(String, nullable=True)
+    # GTIN/EAN; solo lo informa el alta masiva (POST /api/v1/productos:batch)
+    codigoBarras = Column(String(18), nullable=True)
 
     # estado como texto para tests ("activo"/"inactivo")
     estado_producto = Column(String, default="activo")
@@ -37,6 +39,58 @@ class Producto(Base):
     # relación hacia CategoriaProducto (la clase está en category.py)
     categoria = relationship("CategoriaProducto", backref="productos")
 
+    # Keyset de listar_productos: (columna de orden, productoId).
+    # Índices de búsqueda (solo PostgreSQL; en SQLite se usa el índice en
+    # memoria de app/service/search.py): GIN pg_trgm sobre nombre/descripcion
+    # para los ILIKE '%palabra%'
+    __table_args__ = (
+        Index("ix_producto_nombre_id", "nombre", "productoId"),
+        Index("ix_producto_actualizado_id", "actualizado_en", "productoId"),
+        Index(
+            "ix_producto_nombre_trgm", "nombre",
+            postgresql_using="gin", postgresql_ops={"nombre": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_producto_descripcion_trgm", "descripcion",
+            postgresql_using="gin", postgresql_ops={"descripcion": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+# Los índices GIN de trigramas requieren la extensión pg_trgm
+event.listen(
+    Producto.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+def add_missing_columns(bind) -> None:
+    """
+    Agrega a una tabla producto ya existente las columnas nuevas del modelo
+    (create_all no las agrega). Solo columnas opcionales, sin valor por defecto.
+    """
+    existentes = {col["name"] for col in inspect(bind).get_columns(Producto.__tablename__)}
+    faltantes = [col for col in Producto.__table__.columns if col.name not in existentes]
+    if not faltantes:
+        return
+    preparer = bind.dialect.identifier_preparer
+    with bind.begin() as conn:
+        for col in faltantes:
+            conn.execute(DDL(
+                f"ALTER TABLE {preparer.format_table(Producto.__table__)} "
+                f"ADD COLUMN {preparer.format_column(col)} {col.type.compile(dialect=bind.dialect)}"
+            ))
+
+
+def add_missing_indexes(bind) -> None:
+    """Crea los índices de producto que falten en una tabla ya existente."""
+    if bind.dialect.name == "postgresql":
+        with bind.begin() as conn:
+            conn.execute(DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    for index in Producto.__table__.indexes:
+        index.create(bind, checkfirst=True)
+
 
 # ---------------------------
 # Pydantic Schemas usados por los tests y el service
@@ -50,6 +104,12 @@ class ProductoCreate(BaseModel):
     registroSanitario: Optional[str] = None
 
 
+class ProductoLoteItem(ProductoCreate):
+    # Ítem de POST /api/v1/productos:batch: el código de barras se valida
+    # (GTIN mod-10) junto con el lote y se guarda en producto.codigoBarras
+    codigoBarras: Optional[str] = Field(None, max_length=18)
+
+
 class ProductoOut(BaseModel):
     productoId: str
     nombre: str
@@ -62,7 +122,11 @@ class ProductoOut(BaseModel):
 
 
 class ProductosResponse(BaseModel):
-    total: int
+    # null con total=ninguno
+    total: Optional[int] = None
     items: List[ProductoOut]
     page: int
     page_size: int
+    # cursor para pedir la página siguiente (null en la última)
+    next_cursor: Optional[str] = None
+    total_aproximado: bool = False
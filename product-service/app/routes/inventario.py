@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+
+from app.database.connection import get_db
+from app.models.inventario import InventarioLookupRequest, InventarioUpdate
+from app.service import inventario
+from app.service.product_service import ProductoService
+from app.service.rbac import require_auth_token, require_role_admincompras_header
+
+# Rutas con path completo (se incluye sin prefijo): las de /api/productos son
+# las que consume pedidos-service. Las consultas exponen stock y precio: piden
+# Authorization (pedidos-service reenvía el del cliente)
+router = APIRouter(tags=["inventario"])
+
+
+# ---------------------------
+# API v1: POST /api/v1/inventario:lookup
+# Disponibilidad y precio de muchos productos en una consulta
+# (pedidos-service valida un pedido completo con una sola llamada).
+# ---------------------------
+@router.post("/api/v1/inventario:lookup", dependencies=[Depends(require_auth_token)])
+def lookup_inventario(
+    payload: InventarioLookupRequest,
+    db: Session = Depends(get_db),
+):
+    if len(payload.items) > inventario.INVENTORY_LOOKUP_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"La consulta supera el máximo de {inventario.INVENTORY_LOOKUP_MAX_ITEMS} productos",
+        )
+    items = inventario.disponibilidad(db, [item.model_dump() for item in payload.items])
+    return ORJSONResponse(content={"items": items})
+
+
+# ---------------------------
+# PUT /api/v1/productos/{producto_id}/inventario
+# Fija stock y precio (Administrador de Compras)
+# ---------------------------
+@router.put(
+    "/api/v1/productos/{producto_id}/inventario",
+    dependencies=[Depends(require_role_admincompras_header)],
+)
+def actualizar_inventario(
+    producto_id: str,
+    payload: InventarioUpdate,
+    db: Session = Depends(get_db),
+):
+    item = inventario.actualizar(db, producto_id, payload.cantidad_disponible, payload.precio)
+    if item is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado")
+    return ORJSONResponse(content=item)
+
+
+# ---------------------------
+# GET /api/productos/{producto_id}/inventario  (pedidos-service)
+# ---------------------------
+@router.get("/api/productos/{producto_id}/inventario", dependencies=[Depends(require_auth_token)])
+def obtener_inventario(producto_id: str, db: Session = Depends(get_db)):
+    item = inventario.consultar(db, [producto_id]).get(producto_id)
+    if item is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado")
+    return ORJSONResponse(content={
+        "producto_id": producto_id,
+        "cantidad_disponible": item["cantidad_disponible"],
+        "precio": item["precio"],
+    })
+
+
+# ---------------------------
+# GET /api/productos/{producto_id}  (pedidos-service)
+# ---------------------------
+@router.get("/api/productos/{producto_id}", dependencies=[Depends(require_auth_token)])
+def obtener_producto(producto_id: str, db: Session = Depends(get_db)):
+    item = ProductoService.obtener_producto(db, producto_id)
+    if item is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Producto no encontrado")
+    return ORJSONResponse(content=item)
@@ -1,13 +1,18 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from fastapi.responses import JSONResponse
+import orjson
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
 from app.database.connection import get_db
+from app.database.redis_conn import get_redis
 from app.models.product import ProductoCreate, ProductosResponse, ProductoOut
-from app.service.product_service import ProductoService
+from app.service import categorias
+from app.service.idempotencia import ejecutar_idempotente
+from app.service.pagination import TOTAL_EXACTO
+from app.service.product_service import BATCH_MAX_ITEMS, ProductoService
 from app.service.rbac import (
     require_auth_token,
     require_role_admincompras_header,
@@ -16,7 +21,8 @@ from app.service.rbac import (
 
 router = APIRouter()
 
-# Para tests de idempotencia: lo monkeypatchean con FakeRedis
+# Cliente Redis de idempotencia; None usa get_redis() (REDIS_URL).
+# Los tests lo monkeypatchean con FakeRedis.
 redis_client = None
 
 
@@ -31,21 +37,31 @@ def listar_productos_legacy(
     db: Session = Depends(get_db),
     q: Optional[str] = Query(None, max_length=100),
     categoriaId: Optional[str] = Query(None),
-    sort: Optional[str] = Query("nombre"),
+    # nombre | actualizado_en | relevancia (default con q: relevancia; sin q: nombre)
+    sort: Optional[str] = Query(None),
     order: Optional[str] = Query("asc", pattern="^(asc|desc)$"),
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
+    # next_cursor de la página anterior (keyset; reemplaza a page)
+    cursor: Optional[str] = Query(None, max_length=500),
+    total: str = Query(TOTAL_EXACTO, pattern="^(exacto|aproximado|ninguno)$"),
 ):
-    return ProductoService.listar_productos(
-        db=db,
-        q=q,
-        categoria_id=categoriaId,
-        estado=None,
-        sort=sort,
-        order=order,
-        page=page,
-        page_size=page_size,
-    )
+    try:
+        resp = ProductoService.listar_productos(
+            db=db,
+            q=q,
+            categoria_id=categoriaId,
+            estado=None,
+            sort=sort,
+            order=order,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            total_mode=total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return ORJSONResponse(content=resp)
 
 
 # ---------------------------
@@ -63,40 +79,73 @@ def crear_producto(
     payload: ProductoCreate,
     db: Session = Depends(get_db),
 ):
-    idem_key = request.headers.get("X-Idempotency-Key")
-    cache_key = f"idem:{idem_key}" if idem_key else None
-
-    if idem_key and redis_client is not None:
-        cached = redis_client.get(cache_key)
-        if cached:
-            return JSONResponse(status_code=status.HTTP_201_CREATED, content=cached)
+    data = payload.model_dump()
 
-    try:
-        entity, _requiereCadenaFrio = ProductoService.crear_producto(db, payload.model_dump())
-    except ValueError as e:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    def crear() -> Tuple[int, bytes]:
+        try:
+            entity, _requiereCadenaFrio = ProductoService.crear_producto(db, data)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+        resp = ProductoOut(
+            productoId=str(getattr(entity, "productoId", "")),
+            nombre=entity.nombre,
+            categoria=categorias.registro.nombres(db).get(entity.categoriaId, entity.categoriaId),
+            formaFarmaceutica=entity.formaFarmaceutica,
+            requierePrescripcion=entity.requierePrescripcion,
+            registroSanitario=getattr(entity, "registroSanitario", None),
+            estado_producto=getattr(entity, "estado_producto", "activo"),
+            actualizado_en=getattr(entity, "actualizado_en", None),
+        )
+        return status.HTTP_201_CREATED, orjson.dumps(resp.model_dump())
 
-    resp = ProductoOut(
-        productoId=str(getattr(entity, "productoId", "")),
-        nombre=entity.nombre,
-        categoria=entity.categoria.nombre if getattr(entity, "categoria", None) else entity.categoriaId,
-        formaFarmaceutica=entity.formaFarmaceutica,
-        requierePrescripcion=entity.requierePrescripcion,
-        registroSanitario=getattr(entity, "registroSanitario", None),
-        estado_producto=getattr(entity, "estado_producto", "activo"),
-        actualizado_en=getattr(entity, "actualizado_en", None),
-    )
+    idem_key = request.headers.get("X-Idempotency-Key")
+    if idem_key:
+        # redis_client: override de tests; si no, el cliente de REDIS_URL (o la base)
+        client = redis_client if redis_client is not None else get_redis()
+        status_code, body = ejecutar_idempotente(idem_key, data, crear, db, client)
+    else:
+        status_code, body = crear()
+    return Response(content=body, status_code=status_code, media_type="application/json")
 
-    if cache_key and redis_client is not None:
-        redis_client.setex(cache_key, 600, resp.model_dump())
 
-    return resp
+# ---------------------------
+# API v1: POST /api/v1/productos:batch
+# Alta masiva (p. ej. el catálogo de un laboratorio nuevo) en una solicitud.
+# Cada ítem se valida por separado: los válidos se crean y los demás se
+# reportan en resultados. 201 si se crearon todos, 207 si solo algunos,
+# 422 si ninguno.
+# ---------------------------
+@router.post(
+    "/productos:batch",
+    dependencies=[Depends(require_role_admincompras_header)],
+)
+def crear_productos_lote(
+    items: List[Dict[str, Any]] = Body(...),
+    db: Session = Depends(get_db),
+):
+    if not items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El lote está vacío")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El lote supera el máximo de {BATCH_MAX_ITEMS} productos",
+        )
+
+    resp = ProductoService.crear_productos_lote(db, items)
+    if not resp["rechazados"]:
+        status_code = status.HTTP_201_CREATED
+    elif resp["creados"]:
+        status_code = status.HTTP_207_MULTI_STATUS
+    else:
+        status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    return ORJSONResponse(content=resp, status_code=status_code)
 
 
 # ---------------------------
 # API v1: GET /api/v1/productos
-# NO exige token (los tests overridean el RBAC). Se normaliza productoId a str y
-# se responde con JSONResponse para evitar validación de Pydantic sobre UUID.
+# NO exige token (los tests overridean el RBAC). Se responde con ORJSONResponse:
+# productoId (UUID o str) y fechas se serializan sin validación de Pydantic.
 # ---------------------------
 @router.get("/api/v1/productos", response_model=ProductosResponse)
 def listar_productos_v1(
@@ -105,10 +154,14 @@ def listar_productos_v1(
     q: Optional[str] = Query(None, max_length=100),
     categoriaId: Optional[str] = Query(None),
     estado_producto: Optional[str] = Query(None, pattern="^(activo|inactivo)$"),
-    sort: Optional[str] = Query("nombre"),
+    # nombre | actualizado_en | relevancia (default con q: relevancia; sin q: nombre)
+    sort: Optional[str] = Query(None),
     order: Optional[str] = Query("asc", pattern="^(asc|desc)$"),
     page: int = Query(1, ge=1),
     page_size: int = Query(25, ge=1, le=100),
+    # next_cursor de la página anterior (keyset; reemplaza a page)
+    cursor: Optional[str] = Query(None, max_length=500),
+    total: str = Query(TOTAL_EXACTO, pattern="^(exacto|aproximado|ninguno)$"),
 ):
     if categoriaId:
         try:
@@ -116,43 +169,21 @@ def listar_productos_v1(
         except Exception:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="categoriaId inválido")
 
-    resp = ProductoService.listar_productos(
-        db=db,
-        q=q,
-        categoria_id=categoriaId,
-        estado=estado_producto,
-        sort=sort,
-        order=order,
-        page=page,
-        page_size=page_size,
-    )
-
-    # Normalización a dict + productoId como str
-    def normalize_dict(d: dict) -> dict:
-        out = dict(d)
-        items = out.get("items", [])
-        norm_items = []
-        for it in items:
-            it = dict(it)
-            pid = it.get("productoId")
-            if pid is not None and not isinstance(pid, str):
-                it["productoId"] = str(pid)
-            norm_items.append(it)
-        out["items"] = norm_items
-        return out
-
-    if isinstance(resp, ProductosResponse):
-        data = resp.model_dump()
-        data = normalize_dict(data)
-        return JSONResponse(content=data)
-
-    if isinstance(resp, dict):
-        data = normalize_dict(resp)
-        return JSONResponse(content=data)
-
-    # Último recurso: intentar convertir y normalizar
     try:
-        data = normalize_dict(resp)  # por si viene como BaseModel compatible
-        return JSONResponse(content=data)
-    except Exception:
-        return resp
+        resp = ProductoService.listar_productos(
+            db=db,
+            q=q,
+            categoria_id=categoriaId,
+            estado=estado_producto,
+            sort=sort,
+            order=order,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            total_mode=total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # orjson serializa UUID/datetime directo a bytes (sin pasar por ProductoOut)
+    return ORJSONResponse(content=resp)
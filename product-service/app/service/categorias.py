@@ -0,0 +1,144 @@
+"""
+Registro en memoria de categorías de producto.
+
+categoria_producto es una tabla pequeña que casi no cambia (la llena
+seed_categories), así que se carga completa y se sirve desde memoria a la
+validación de crear_producto y a la serialización de listados.
+
+Se recarga:
+- al vencer CATEGORY_CACHE_TTL_SECONDS (siempre, con o sin Redis);
+- al recibir un aviso en el canal Redis CATEGORY_CHANNEL (otra instancia
+  cambió categorías); si la suscripción se cae se invalida al reconectar,
+  por si se perdieron avisos;
+- ante un categoriaId desconocido, como máximo una vez cada
+  CATEGORY_MISS_RELOAD_SECONDS (categoría recién creada en otra instancia).
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.category import CategoriaProducto
+
+logger = logging.getLogger("uvicorn")
+
+CATEGORY_CACHE_TTL_SECONDS = float(os.getenv("CATEGORY_CACHE_TTL_SECONDS", "300"))
+CATEGORY_MISS_RELOAD_SECONDS = float(os.getenv("CATEGORY_MISS_RELOAD_SECONDS", "1"))
+CATEGORY_CHANNEL = "product-service:categorias"
+# Espera antes de volver a suscribirse si se cae la conexión a Redis
+CATEGORY_PUBSUB_RETRY_SECONDS = float(os.getenv("CATEGORY_PUBSUB_RETRY_SECONDS", "5"))
+
+
+@dataclass(frozen=True)
+class Categoria:
+    categoriaId: str
+    nombre: str
+    requiereCadenaFrio: bool
+    requiereRegistroSanitario: bool
+
+
+class _Snapshot:
+    def __init__(self, categorias: Dict[str, Categoria]):
+        self.categorias = categorias
+        self.nombres = {cid: c.nombre for cid, c in categorias.items()}
+        self.cargado_en = time.monotonic()
+
+
+class RegistroCategorias:
+    def __init__(self):
+        # Una copia por base (URL del engine): los tests usan varias
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def cargar(self, db: Session) -> _Snapshot:
+        tabla = CategoriaProducto.__table__
+        categorias = {
+            row.categoriaId: Categoria(
+                categoriaId=row.categoriaId,
+                nombre=row.nombre,
+                requiereCadenaFrio=bool(row.requiereCadenaFrio),
+                requiereRegistroSanitario=bool(row.requiereRegistroSanitario),
+            )
+            for row in db.execute(select(tabla))
+        }
+        snapshot = _Snapshot(categorias)
+        with self._lock:
+            self._snapshots[str(db.get_bind().url)] = snapshot
+        return snapshot
+
+    def _vigente(self, db: Session) -> _Snapshot:
+        with self._lock:
+            snapshot = self._snapshots.get(str(db.get_bind().url))
+        if snapshot is None or time.monotonic() - snapshot.cargado_en >= CATEGORY_CACHE_TTL_SECONDS:
+            snapshot = self.cargar(db)
+        return snapshot
+
+    def obtener(self, db: Session, categoria_id: str) -> Optional[Categoria]:
+        snapshot = self._vigente(db)
+        categoria = snapshot.categorias.get(categoria_id)
+        if categoria is None and time.monotonic() - snapshot.cargado_en >= CATEGORY_MISS_RELOAD_SECONDS:
+            categoria = self.cargar(db).categorias.get(categoria_id)
+        return categoria
+
+    def nombres(self, db: Session) -> Dict[str, str]:
+        """{categoriaId: nombre}; no modificar (es compartido)."""
+        return self._vigente(db).nombres
+
+    def invalidar(self):
+        with self._lock:
+            self._snapshots.clear()
+
+    # ---------------------------
+    # Avisos entre instancias (Redis pub/sub)
+    # ---------------------------
+    def suscribir(self, redis_client) -> Optional[threading.Thread]:
+        """Hilo daemon que invalida el registro con cada aviso de CATEGORY_CHANNEL."""
+        if redis_client is None:
+            return None
+        thread = threading.Thread(target=self._escuchar, args=(redis_client,), name="categorias-pubsub", daemon=True)
+        thread.start()
+        return thread
+
+    def _escuchar(self, redis_client):
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CATEGORY_CHANNEL)
+                # Pudieron perderse avisos mientras no había suscripción
+                self.invalidar()
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.invalidar()
+            except Exception as e:
+                logger.warning(
+                    f"Suscripción de categorías caída ({e}); reintento en {CATEGORY_PUBSUB_RETRY_SECONDS:g}s"
+                )
+            finally:
+                # Libera la conexión de la suscripción caída antes de abrir otra
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(CATEGORY_PUBSUB_RETRY_SECONDS)
+
+
+registro = RegistroCategorias()
+
+
+def publicar_cambio(redis_client) -> None:
+    """Avisa a todas las instancias que recarguen categorías (sin Redis rige el TTL)."""
+    registro.invalidar()
+    if redis_client is None:
+        return
+    try:
+        redis_client.publish(CATEGORY_CHANNEL, "changed")
+    except Exception as e:
+        logger.warning(f"No se pudo publicar el cambio de categorías: {e}")
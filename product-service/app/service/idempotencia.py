@@ -0,0 +1,229 @@
+"""
+Idempotencia de POST /productos (header X-Idempotency-Key).
+
+La primera solicitud con una clave la reserva de forma atómica con un
+marcador "en curso" (Redis `SET NX EX`); solo esa solicitud crea el
+producto y luego reemplaza el marcador por la respuesta. Los reintentos
+concurrentes con la misma clave no repiten el trabajo: esperan (long-poll
+con backoff, hasta IDEMPOTENCY_WAIT_SECONDS) la respuesta de la primera y
+la devuelven tal cual. Si la primera falla, la reserva se libera y el
+siguiente reintento la toma.
+
+Valores guardados (bytes compactos):
+    P|<huella>                       en curso
+    D|<huella>|<status>|<cuerpo>     terminada (cuerpo JSON de orjson)
+
+La huella es un hash del payload: reutilizar la clave con otro payload
+responde 409.
+
+Si Redis no está configurado o falla, se usa la tabla `idempotencia` de la
+base con la misma semántica (INSERT de la reserva sobre la PK).
+"""
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+from redis.exceptions import RedisError
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.idempotencia import Idempotencia
+
+logger = logging.getLogger("uvicorn")
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+# Vida del marcador "en curso": si la instancia muere, la clave se libera sola
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "30"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+POLL_INITIAL_SECONDS = 0.02
+POLL_MAX_SECONDS = 0.5
+
+EN_CURSO = b"P"
+TERMINADA = b"D"
+
+
+@dataclass
+class Registro:
+    estado: bytes
+    huella: str
+    status_code: Optional[int] = None
+    cuerpo: Optional[bytes] = None
+
+
+def huella(payload: dict) -> str:
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()[:32]
+
+
+# ---------------------------
+# Almacenes
+# ---------------------------
+class StoreNoDisponible(Exception):
+    pass
+
+
+class RedisStore:
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _clave(clave: str) -> str:
+        return f"idem:{clave}"
+
+    @staticmethod
+    def _decodificar(raw: bytes) -> Registro:
+        if isinstance(raw, str):
+            raw = raw.encode()
+        partes = raw.split(b"|", 3)
+        if partes[0] == TERMINADA:
+            return Registro(TERMINADA, partes[1].decode(), int(partes[2]), partes[3])
+        return Registro(EN_CURSO, partes[1].decode())
+
+    def _llamar(self, metodo: str, *args, **kwargs):
+        # Solo fallas de Redis (conexión, timeout, respuesta) pasan a la base;
+        # un error de programación se propaga tal cual
+        try:
+            return getattr(self.client, metodo)(*args, **kwargs)
+        except RedisError as e:
+            raise StoreNoDisponible(str(e)) from e
+
+    def reservar(self, clave: str, huella_: str) -> Optional[Registro]:
+        """None si la reserva es nuestra; si no, el registro existente."""
+        valor = EN_CURSO + b"|" + huella_.encode()
+        if self._llamar("set", self._clave(clave), valor, nx=True, ex=IDEMPOTENCY_LOCK_SECONDS):
+            return None
+        return self.leer(clave) or Registro(b"", huella_)  # vencida entre SET y GET: reintentar
+
+    def leer(self, clave: str) -> Optional[Registro]:
+        raw = self._llamar("get", self._clave(clave))
+        return self._decodificar(raw) if raw else None
+
+    def completar(self, clave: str, huella_: str, status_code: int, cuerpo: bytes):
+        valor = b"|".join([TERMINADA, huella_.encode(), str(status_code).encode(), cuerpo])
+        self._llamar("set", self._clave(clave), valor, ex=IDEMPOTENCY_TTL_SECONDS)
+
+    def liberar(self, clave: str):
+        self._llamar("delete", self._clave(clave))
+
+
+class DatabaseStore:
+    """Misma semántica sobre la tabla idempotencia, en transacciones propias."""
+
+    def __init__(self, bind):
+        self.bind = bind
+
+    def reservar(self, clave: str, huella_: str) -> Optional[Registro]:
+        ahora = datetime.utcnow()
+        with Session(bind=self.bind) as s:
+            s.execute(delete(Idempotencia).where(Idempotencia.clave == clave, Idempotencia.expira_en < ahora))
+            s.add(Idempotencia(
+                clave=clave, huella=huella_, estado=EN_CURSO.decode(),
+                expira_en=ahora + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+            ))
+            try:
+                s.commit()
+                return None
+            except IntegrityError:
+                s.rollback()
+        return self.leer(clave) or Registro(b"", huella_)
+
+    def leer(self, clave: str) -> Optional[Registro]:
+        with Session(bind=self.bind) as s:
+            row = s.execute(
+                select(Idempotencia).where(Idempotencia.clave == clave, Idempotencia.expira_en >= datetime.utcnow())
+            ).scalar_one_or_none()
+            if row is None:
+                return None
+            return Registro(row.estado.encode(), row.huella, row.status_code, row.respuesta)
+
+    def completar(self, clave: str, huella_: str, status_code: int, cuerpo: bytes):
+        with Session(bind=self.bind) as s:
+            s.execute(
+                update(Idempotencia).where(Idempotencia.clave == clave).values(
+                    estado=TERMINADA.decode(), huella=huella_, status_code=status_code, respuesta=cuerpo,
+                    expira_en=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+                )
+            )
+            s.commit()
+
+    def liberar(self, clave: str):
+        with Session(bind=self.bind) as s:
+            s.execute(delete(Idempotencia).where(Idempotencia.clave == clave))
+            s.commit()
+
+
+# ---------------------------
+# Ejecución idempotente
+# ---------------------------
+def _esperar(store, clave: str, huella_: str) -> Optional[Registro]:
+    """Long-poll hasta que la solicitud en curso termine; None si la reserva se liberó."""
+    limite = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    pausa = POLL_INITIAL_SECONDS
+    while time.monotonic() < limite:
+        time.sleep(pausa)
+        pausa = min(pausa * 2, POLL_MAX_SECONDS)
+        registro = store.leer(clave)
+        if registro is None or registro.estado == TERMINADA:
+            return registro
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Hay una solicitud en curso con la misma X-Idempotency-Key; reintente más tarde",
+    )
+
+
+def _ejecutar(store, clave: str, huella_: str, fn: Callable[[], Tuple[int, bytes]]) -> Tuple[int, bytes]:
+    for _ in range(3):
+        registro = store.reservar(clave, huella_)
+        if registro is None:
+            try:
+                status_code, cuerpo = fn()
+            except BaseException:
+                try:
+                    store.liberar(clave)
+                except StoreNoDisponible:
+                    pass  # el marcador vence solo (IDEMPOTENCY_LOCK_SECONDS)
+                raise
+            try:
+                store.completar(clave, huella_, status_code, cuerpo)
+            except StoreNoDisponible as e:
+                # El producto ya se creó: se responde igual, sin guardar la respuesta
+                logger.warning(f"No se pudo guardar la respuesta idempotente de {clave}: {e}")
+            return status_code, cuerpo
+
+        if registro.estado and registro.huella != huella_:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="X-Idempotency-Key ya usada con otro payload",
+            )
+        if registro.estado == EN_CURSO:
+            registro = _esperar(store, clave, huella_)
+        if registro is not None and registro.estado == TERMINADA:
+            return registro.status_code, registro.cuerpo
+        # Reserva liberada (la primera falló) o vencida: volver a intentar tomarla
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No se pudo reservar la X-Idempotency-Key")
+
+
+def ejecutar_idempotente(
+    clave: str,
+    payload: dict,
+    fn: Callable[[], Tuple[int, bytes]],
+    db: Session,
+    redis_client=None,
+) -> Tuple[int, bytes]:
+    """
+    Ejecuta `fn` (que devuelve (status, cuerpo JSON)) una sola vez por
+    `clave`. Usa Redis si hay cliente y responde; si no, la base de `db`.
+    """
+    huella_ = huella(payload)
+    if redis_client is not None:
+        try:
+            return _ejecutar(RedisStore(redis_client), clave, huella_, fn)
+        except StoreNoDisponible as e:
+            logger.warning(f"Redis no disponible para idempotencia ({e}); usando la base")
+    return _ejecutar(DatabaseStore(db.get_bind()), clave, huella_, fn)
@@ -0,0 +1,113 @@
+"""
+Inventario (stock y precio) de productos.
+
+consultar() resuelve muchos productoId en una sola consulta por PK
+(`productoId = ANY(:ids)` en PostgreSQL, `IN (...)` en SQLite) con LEFT JOIN
+a inventario: pedidos-service valida un pedido completo con un solo
+POST /api/v1/inventario:lookup en vez de dos GET por producto.
+"""
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import String, any_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from app.models.inventario import Inventario
+from app.models.product import Producto
+
+# Máximo de productos por POST /inventario:lookup
+INVENTORY_LOOKUP_MAX_ITEMS = int(os.getenv("INVENTORY_LOOKUP_MAX_ITEMS", "1000"))
+
+
+def _filtro_ids(db: Session, ids: List[str]):
+    if db.get_bind().dialect.name == "postgresql":
+        # Un solo parámetro array: misma sentencia preparada para cualquier N
+        return Producto.productoId == any_(bindparam("ids", ids, type_=ARRAY(String)))
+    return Producto.productoId.in_(ids)
+
+
+def consultar(db: Session, producto_ids: Iterable[str]) -> Dict[str, dict]:
+    """
+    {productoId: {productoId, nombre, estado_producto, cantidad_disponible,
+    precio}} de los productos existentes; los ids que no existen no aparecen.
+    Sin fila de inventario: cantidad_disponible 0 y precio None.
+    """
+    ids = list(dict.fromkeys(producto_ids))
+    if not ids:
+        return {}
+    stmt = (
+        select(
+            Producto.productoId,
+            Producto.nombre,
+            func.coalesce(Producto.estado_producto, "activo").label("estado_producto"),
+            func.coalesce(Inventario.cantidad_disponible, 0).label("cantidad_disponible"),
+            Inventario.precio,
+        )
+        .select_from(Producto)
+        .outerjoin(Inventario, Inventario.productoId == Producto.productoId)
+        .where(_filtro_ids(db, ids))
+    )
+    resultado = {}
+    for row in db.execute(stmt):
+        item = row._asdict()
+        # Numeric -> float (pedidos-service guarda precio como Float)
+        item["precio"] = float(item["precio"]) if item["precio"] is not None else None
+        resultado[item["productoId"]] = item
+    return resultado
+
+
+def disponibilidad(db: Session, items: List[dict]) -> List[dict]:
+    """
+    Resultado por ítem ({productoId, cantidad}), en el orden recibido:
+    disponible si el producto existe, está activo, tiene precio y alcanza el
+    stock para la cantidad pedida.
+    """
+    inventario = consultar(db, (item["productoId"] for item in items))
+    resultados = []
+    for item in items:
+        cantidad = item.get("cantidad", 1)
+        encontrado = inventario.get(item["productoId"])
+        if encontrado is None:
+            resultados.append({
+                "productoId": item["productoId"], "encontrado": False, "disponible": False,
+                "cantidad_solicitada": cantidad, "cantidad_disponible": 0, "precio": None,
+                "nombre": None, "mensaje": "Producto no encontrado",
+            })
+            continue
+
+        if encontrado["estado_producto"] != "activo":
+            mensaje = "Producto inactivo"
+        elif encontrado["precio"] is None:
+            mensaje = "Producto sin precio"
+        elif encontrado["cantidad_disponible"] < cantidad:
+            mensaje = f"Inventario insuficiente. Disponible: {encontrado['cantidad_disponible']}"
+        else:
+            mensaje = "Inventario disponible"
+        resultados.append({
+            "productoId": item["productoId"],
+            "encontrado": True,
+            "disponible": mensaje == "Inventario disponible",
+            "cantidad_solicitada": cantidad,
+            "cantidad_disponible": encontrado["cantidad_disponible"],
+            "precio": encontrado["precio"],
+            "nombre": encontrado["nombre"],
+            "mensaje": mensaje,
+        })
+    return resultados
+
+
+def actualizar(db: Session, producto_id: str, cantidad_disponible: int, precio: Optional[float]) -> Optional[dict]:
+    """Fija stock y precio de un producto; None si el producto no existe."""
+    if db.get(Producto, producto_id) is None:
+        return None
+    fila = db.get(Inventario, producto_id)
+    if fila is None:
+        fila = Inventario(productoId=producto_id)
+        db.add(fila)
+    fila.cantidad_disponible = cantidad_disponible
+    fila.precio = precio
+    fila.actualizado_en = datetime.utcnow()
+    db.commit()
+    return consultar(db, [producto_id])[producto_id]
@@ -0,0 +1,131 @@
+"""
+Paginación por keyset y totales de listar_productos.
+
+El cursor (base64url opaco) guarda el orden usado y la última fila entregada
+(valor de la columna de orden + productoId). La página siguiente se pide
+con `(col, productoId) > (valor, id)` (o `<` en orden descendente) sobre los
+índices compuestos (nombre, productoId) / (actualizado_en, productoId), así
+el costo no depende del número de página como con OFFSET.
+
+actualizado_en admite NULL: esas filas van después de todas las fechas
+(NULLS LAST en asc, NULLS FIRST en desc, el orden por defecto de PostgreSQL
+y del índice) y dentro de ese grupo el cursor sigue solo por productoId.
+
+Totales (`total=`):
+- exacto: count(*) del conjunto filtrado (comportamiento original)
+- aproximado: sin filtros, pg_class.reltuples en PostgreSQL o un conteo
+  cacheado COUNT_CACHE_TTL_SECONDS; con filtros se cuenta exacto
+- ninguno: no se calcula (total = null), para scroll infinito
+"""
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import and_, asc, desc, func, or_, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.product import Producto
+
+TOTAL_EXACTO = "exacto"
+TOTAL_APROXIMADO = "aproximado"
+TOTAL_NINGUNO = "ninguno"
+TOTAL_MODES = (TOTAL_EXACTO, TOTAL_APROXIMADO, TOTAL_NINGUNO)
+
+COUNT_CACHE_TTL_SECONDS = float(os.environ.get("COUNT_CACHE_TTL_SECONDS", "30"))
+
+# Columnas por las que se puede paginar con cursor
+SORT_COLUMNS = {"nombre": Producto.nombre, "actualizado_en": Producto.actualizado_en}
+
+
+def encode_cursor(sort: str, order: str, valor, producto_id: str) -> str:
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    raw = json.dumps({"s": sort, "o": order, "v": valor, "id": producto_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple[object, str]:
+    """(valor, productoId) del cursor; debe corresponder al mismo sort/order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        valor, producto_id = data["v"], data["id"]
+        if data["s"] != sort or data["o"] != order or not isinstance(producto_id, str):
+            raise ValueError
+        if sort == "actualizado_en":
+            # null: la última fila entregada no tenía actualizado_en
+            valor = datetime.fromisoformat(valor) if valor is not None else None
+        elif not isinstance(valor, str):
+            raise ValueError
+    except Exception:
+        raise ValueError("Cursor inválido")
+    return valor, producto_id
+
+
+def orden(sort: str, order: str) -> List:
+    """ORDER BY del listado paginable: columna de orden (NULL al final del asc) y productoId."""
+    if order == "asc":
+        return [asc(SORT_COLUMNS[sort]).nulls_last(), asc(Producto.productoId)]
+    return [desc(SORT_COLUMNS[sort]).nulls_first(), desc(Producto.productoId)]
+
+
+def despues_de(sort: str, order: str, valor, producto_id: str):
+    """Condición keyset: filas posteriores a (valor, productoId) en el orden dado."""
+    columna = SORT_COLUMNS[sort]
+    if valor is None:
+        # Dentro del grupo NULL solo desempata productoId; en desc siguen las fechas
+        sin_valor = columna.is_(None)
+        if order == "asc":
+            return and_(sin_valor, Producto.productoId > producto_id)
+        return or_(and_(sin_valor, Producto.productoId < producto_id), columna.isnot(None))
+
+    clave = tuple_(columna, Producto.productoId)
+    despues = tuple_(valor, producto_id)
+    if order == "asc":
+        if columna.expression.nullable:
+            # Las filas sin valor van al final del orden ascendente
+            return or_(clave > despues, columna.is_(None))
+        return clave > despues
+    return clave < despues
+
+
+# ---------------------------
+# Totales
+# ---------------------------
+_conteos: Dict[str, Tuple[float, int]] = {}
+_lock = threading.Lock()
+
+
+def _conteo_cacheado(db: Session) -> int:
+    clave = str(db.get_bind().url)
+    ahora = time.monotonic()
+    with _lock:
+        cacheado = _conteos.get(clave)
+    if cacheado and cacheado[0] > ahora:
+        return cacheado[1]
+    total = db.execute(select(func.count()).select_from(Producto)).scalar()
+    with _lock:
+        _conteos[clave] = (ahora + COUNT_CACHE_TTL_SECONDS, total)
+    return total
+
+
+def total_aproximado(db: Session) -> int:
+    """Filas de producto según las estadísticas del planner o el conteo cacheado."""
+    if db.get_bind().dialect.name == "postgresql":
+        estimado = db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:tabla AS regclass)"),
+            {"tabla": Producto.__tablename__},
+        ).scalar()
+        # -1 (o 0) si la tabla nunca fue analizada
+        if estimado and estimado > 0:
+            return int(estimado)
+    return _conteo_cacheado(db)
+
+
+def invalidar():
+    with _lock:
+        _conteos.clear()
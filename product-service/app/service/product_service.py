@@ -1,11 +1,32 @@
+import os
+from datetime import datetime
 from typing import List, Optional, Tuple
 
-from sqlalchemy import asc, desc, func, or_
+from pydantic import ValidationError
+from sqlalchemy import asc, func, insert, select
 from sqlalchemy.orm import Session
 from uuid import uuid4
 
-from app.models.product import Producto, ProductoCreate, ProductoOut, ProductosResponse
 from app.models.category import CategoriaProducto
+from app.models.product import Producto, ProductoLoteItem
+from app.service import categorias, pagination, search
+from app.service.validators import validate_ean_many, validate_rs_many
+
+# Máximo de ítems por POST /productos:batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+
+# Columnas de ProductoOut, en su orden
+LIST_COLUMNS = (
+    Producto.productoId,
+    Producto.nombre,
+    # categoriaId; se reemplaza por el nombre desde el registro de categorías
+    Producto.categoriaId.label("categoria"),
+    Producto.formaFarmaceutica,
+    Producto.requierePrescripcion,
+    Producto.registroSanitario,
+    func.coalesce(Producto.estado_producto, "activo").label("estado_producto"),
+    Producto.actualizado_en,
+)
 
 
 class ProductoService:
@@ -19,8 +40,8 @@ class ProductoService:
 
     @staticmethod
     def crear_producto(db: Session, data: dict) -> Tuple[Producto, bool]:
-        # Validar categoría
-        categoria: CategoriaProducto = db.query(CategoriaProducto).get(data["categoriaId"])
+        # Validar categoría (registro en memoria, sin ida a la base)
+        categoria = categorias.registro.obtener(db, data["categoriaId"])
         if not categoria:
             raise ValueError("categoriaId inexistente")
 
@@ -38,8 +59,97 @@ class ProductoService:
         db.commit()
         db.refresh(entity)
 
-        requiereCadenaFrio = False
-        return entity, requiereCadenaFrio
+        return entity, categoria.requiereCadenaFrio
+
+    @staticmethod
+    def _validar_item(raw) -> Tuple[Optional[dict], List[str]]:
+        """(data, errores) del esquema de un ítem del lote; data es None si no valida."""
+        try:
+            return ProductoLoteItem.model_validate(raw).model_dump(), []
+        except ValidationError as e:
+            errores = [
+                f"{'.'.join(str(p) for p in err['loc']) or 'item'}: {err['msg']}" for err in e.errors()
+            ]
+            return None, errores
+
+    @staticmethod
+    def crear_productos_lote(db: Session, items: List[dict]) -> dict:
+        """
+        Alta masiva: valida todos los ítems antes de escribir (esquema,
+        codigoBarras, registroSanitario y categorías en una sola consulta) e
+        inserta los válidos en un solo INSERT multi-fila, en una transacción.
+
+        Devuelve {creados, rechazados, resultados}; resultados va en el orden
+        de `items`, con productoId (creado) o errores (rechazado) por ítem.
+        """
+        validados = [ProductoService._validar_item(raw) for raw in items]
+
+        # Códigos de barras y registros sanitarios presentes, validados en bloque
+        datos = [data for data, _ in validados if data is not None]
+        eans = [data["codigoBarras"] for data in datos if data.get("codigoBarras")]
+        registros = [data["registroSanitario"] for data in datos if data.get("registroSanitario")]
+        eans_validos = dict(zip(eans, validate_ean_many(eans).tolist()))
+        registros_validos = dict(zip(registros, validate_rs_many(registros).tolist()))
+
+        # Existencia de categorías: una consulta con los ids distintos del lote
+        ids = {data["categoriaId"] for data, _ in validados if data is not None}
+        existentes = set()
+        if ids:
+            existentes = set(db.scalars(
+                select(CategoriaProducto.categoriaId).where(CategoriaProducto.categoriaId.in_(ids))
+            ))
+
+        ahora = datetime.utcnow()
+        resultados, filas = [], []
+        for indice, (data, errores) in enumerate(validados):
+            if data is not None:
+                if data.get("codigoBarras") and not eans_validos[data["codigoBarras"]]:
+                    errores.append("codigoBarras inválido")
+                if data.get("registroSanitario") and not registros_validos[data["registroSanitario"]]:
+                    errores.append("registroSanitario inválido")
+                if data["categoriaId"] not in existentes:
+                    errores.append("categoriaId inexistente")
+            if errores:
+                resultados.append({"indice": indice, "estado": "rechazado", "errores": errores})
+                continue
+            producto_id = str(uuid4())
+            filas.append({
+                "productoId": producto_id,
+                "nombre": data["nombre"],
+                "descripcion": data.get("descripcion"),
+                "categoriaId": data["categoriaId"],
+                "formaFarmaceutica": data.get("formaFarmaceutica"),
+                "requierePrescripcion": data.get("requierePrescripcion", False),
+                "registroSanitario": data.get("registroSanitario"),
+                "codigoBarras": data.get("codigoBarras"),
+                "estado_producto": "activo",
+                "actualizado_en": ahora,
+            })
+            resultados.append({"indice": indice, "estado": "creado", "productoId": producto_id})
+
+        if filas:
+            # Con RETURNING, SQLAlchemy agrupa el executemany en INSERT ... VALUES
+            # multi-fila (insertmanyvalues) también en psycopg 3 y SQLite
+            tabla = Producto.__table__
+            db.execute(insert(tabla).returning(tabla.c.productoId), filas).all()
+            db.commit()
+
+        return {
+            "creados": len(filas),
+            "rechazados": len(resultados) - len(filas),
+            "resultados": resultados,
+        }
+
+    @staticmethod
+    def obtener_producto(db: Session, producto_id: str) -> Optional[dict]:
+        """Producto con la forma de ProductoOut (más producto_id); None si no existe."""
+        row = db.query(*LIST_COLUMNS).filter(Producto.productoId == producto_id).first()
+        if row is None:
+            return None
+        item = row._asdict()
+        item["categoria"] = categorias.registro.nombres(db).get(item["categoria"], item["categoria"])
+        item["producto_id"] = item["productoId"]
+        return item
 
     @staticmethod
     def _normalize_pagination(page: int, page_size: int):
@@ -54,89 +164,89 @@ class ProductoService:
         q: Optional[str],
         categoria_id: Optional[str],
         estado: Optional[str],
-        sort: str,
+        sort: Optional[str],
         order: str,
         page: int,
         page_size: int,
-    ) -> ProductosResponse:
-
+        cursor: Optional[str] = None,
+        total_mode: str = pagination.TOTAL_EXACTO,
+    ) -> dict:
+        """
+        Lista paginada de productos. Con `cursor` (next_cursor de la página
+        anterior) pagina por keyset e ignora `page`; `total_mode` elige cómo
+        se calcula `total` (ver app/service/pagination.py).
+
+        Devuelve un dict con la forma de ProductosResponse: una sola consulta
+        con las columnas de ProductoOut (sin cargar entidades ORM) y el nombre
+        de la categoría desde el registro en memoria; las rutas lo serializan
+        directo con orjson.
+        """
         page, page_size, offset = ProductoService._normalize_pagination(page, page_size)
+        order = "desc" if order == "desc" else "asc"
+        sort_attr = "actualizado_en" if sort == "actualizado_en" else "nombre"
+        despues = pagination.decode_cursor(cursor, sort_attr, order) if cursor else None
 
-        qry = db.query(Producto)
-
-        if q:
-            term = f"%{q.lower()}%"
-            condiciones = [func.lower(Producto.nombre).like(term)]
-            if hasattr(Producto, "codigoBarras"):
-                condiciones.append(Producto.codigoBarras.startswith(q))
-            qry = qry.filter(or_(*condiciones))
+        qry = db.query(Producto.productoId).select_from(Producto)
 
         if categoria_id:
-            if hasattr(Producto, "categoriaId"):
-                qry = qry.filter(Producto.categoriaId == categoria_id)
-            else:
-                qry = qry.filter(getattr(Producto, "categoria_id") == categoria_id)
+            qry = qry.filter(Producto.categoriaId == categoria_id)
 
         if estado:
-            campo_estado = "estado_producto" if hasattr(Producto, "estado_producto") else (
-                "estado" if hasattr(Producto, "estado") else None
-            )
-            if campo_estado:
-                col = getattr(Producto, campo_estado)
-                if "VARCHAR" in str(col.type) or "TEXT" in str(col.type):
-                    qry = qry.filter(func.lower(col) == estado.lower())
-                else:
-                    qry = qry.filter(col == estado)
-
-        total = qry.count()
-
-        sort_attr = "actualizado_en" if sort == "actualizado_en" else "nombre"
-        if not hasattr(Producto, sort_attr):
-            if sort_attr == "actualizado_en":
-                if hasattr(Producto, "updatedAt"):
-                    sort_attr = "updatedAt"
-                elif hasattr(Producto, "createdAt"):
-                    sort_attr = "createdAt"
-                else:
-                    sort_attr = "nombre"
-        sort_col = getattr(Producto, sort_attr)
-        sort_fn = asc if order == "asc" else desc
-
-        rows: List[Producto] = qry.order_by(sort_fn(sort_col)).offset(offset).limit(page_size).all()
-
-        items: List[ProductoOut] = []
-        for r in rows:
-            if hasattr(r, "categoria") and getattr(r, "categoria") is not None and hasattr(r.categoria, "nombre"):
-                categoria_nombre = r.categoria.nombre
-            else:
-                categoria_nombre = str(getattr(r, "categoriaId", getattr(r, "categoria_id", "")))
-
-            estado_val = getattr(r, "estado_producto", getattr(r, "estado", ""))
-            if hasattr(estado_val, "value"):
-                estado_val = estado_val.value
-            if isinstance(estado_val, bool):
-                estado_val = "activo" if estado_val else "inactivo"
-
-            actualizado_en = getattr(r, "actualizado_en", None) or getattr(r, "updatedAt", None) or getattr(r, "createdAt", None)
-
-            pid = getattr(r, "productoId", None) or getattr(r, "id", None) or getattr(r, "uuid", None)
-
-            items.append(
-                ProductoOut(
-                    productoId=str(pid) if pid is not None else "",
-                    nombre=r.nombre,
-                    categoria=categoria_nombre,
-                    formaFarmaceutica=getattr(r, "formaFarmaceutica", getattr(r, "forma_farmaceutica", "")),
-                    requierePrescripcion=getattr(r, "requierePrescripcion", getattr(r, "requiere_prescripcion", False)),
-                    registroSanitario=getattr(r, "registroSanitario", getattr(r, "registro_sanitario", None)),
-                    estado_producto=estado_val or "activo",
-                    actualizado_en=actualizado_en,
-                )
-            )
-
-        return ProductosResponse(
-            total=total,
-            items=items,
-            page=page,
-            page_size=page_size,
-        )
+            qry = qry.filter(func.lower(Producto.estado_producto) == estado.lower())
+
+        # Búsqueda por subcadena en nombre/descripción (app/service/search.py)
+        filtros = qry
+        qry, orden_relevancia = search.aplicar_busqueda(db, qry, q)
+
+        # Totales: exacto (count), aproximado sin filtros (estadísticas/cache) o ninguno
+        filtrado = bool(search.tokenizar(q) or categoria_id or estado)
+        total_es_aproximado = False
+        if total_mode == pagination.TOTAL_NINGUNO:
+            total = None
+        elif total_mode == pagination.TOTAL_APROXIMADO and not filtrado:
+            total, total_es_aproximado = pagination.total_aproximado(db), True
+        else:
+            # count(*) directo sobre producto, sin subconsulta
+            total = search.contar(db, filtros, q)
+
+        qry = qry.with_entities(*LIST_COLUMNS)
+
+        # Con búsqueda y sin sort explícito (o sort=relevancia) se ordena por
+        # relevancia; ese orden se pagina con page (conjunto acotado por q)
+        por_relevancia = bool(orden_relevancia) and sort in (None, "relevancia")
+        if por_relevancia:
+            if despues:
+                raise ValueError("cursor no disponible con orden por relevancia; use page")
+            orden = [*orden_relevancia, asc(Producto.nombre), asc(Producto.productoId)]
+        else:
+            # productoId desempata: el orden es total y sirve de clave del cursor
+            orden = pagination.orden(sort_attr, order)
+            if despues:
+                qry = qry.filter(pagination.despues_de(sort_attr, order, *despues))
+                offset = 0
+
+        # Una fila extra indica si hay página siguiente
+        rows = qry.order_by(*orden).offset(offset).limit(page_size + 1).all()
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            if not por_relevancia:
+                last = rows[-1]
+                next_cursor = pagination.encode_cursor(sort_attr, order, getattr(last, sort_attr), last.productoId)
+
+        # Nombre de categoría desde memoria (categoriaId si no está registrada)
+        nombres = categorias.registro.nombres(db)
+        items = []
+        for row in rows:
+            item = row._asdict()
+            item["categoria"] = nombres.get(item["categoria"], item["categoria"])
+            items.append(item)
+
+        return {
+            "total": total,
+            "items": items,
+            "page": page,
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "total_aproximado": total_es_aproximado,
+        }
@@ -0,0 +1,198 @@
+"""
+Búsqueda de productos por nombre y descripción (listar_productos, parámetro q).
+
+Conserva la semántica de subcadena del `q` original (LIKE '%q%' sin
+distinguir mayúsculas), extendida a varias palabras y a la descripción: el
+término se parte en palabras y cada una debe aparecer en el nombre o en la
+descripción. "minofén 500" encuentra "Acetaminofén 500mg".
+
+Relevancia (menor es mejor), luego nombre:
+  0 - el nombre empieza por el término
+  1 - todas las palabras están en el nombre
+  2 - alguna palabra solo está en la descripción
+
+- PostgreSQL: ILIKE '%palabra%' sobre nombre/descripcion, que resuelven los
+  índices GIN pg_trgm (palabras de 3 letras o más; las más cortas no tienen
+  trigramas y recorren la tabla como el LIKE original). Dentro de cada nivel
+  desempata la similitud de trigramas con el nombre.
+- SQLite (tests/desarrollo): índice invertido en memoria de palabras del
+  catálogo, reconstruido cuando cambia la firma de la tabla
+  (count + max(actualizado_en)).
+"""
+import heapq
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, false, func, or_, select
+from sqlalchemy.orm import Query, Session
+
+from app.models.product import Producto
+
+# Tope de productos que filtra el índice en memoria por consulta (solo
+# SQLite): los ids viajan como parámetros del IN y SQLite limita la
+# cantidad de parámetros. `total` no depende de este tope.
+SEARCH_FALLBACK_MAX_RESULTS = int(os.environ.get("SEARCH_FALLBACK_MAX_RESULTS", "5000"))
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenizar(texto: Optional[str]) -> List[str]:
+    """Palabras en minúsculas; descarta signos."""
+    return _WORD.findall((texto or "").lower())
+
+
+# ---------------------------
+# PostgreSQL
+# ---------------------------
+def _escapar_like(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _contiene(col, token: str):
+    return col.ilike(f"%{_escapar_like(token)}%", escape="\\")
+
+
+def _busqueda_sql(qry: Query, tokens: List[str]):
+    termino = " ".join(tokens)
+    qry = qry.filter(and_(*[or_(_contiene(Producto.nombre, t), _contiene(Producto.descripcion, t)) for t in tokens]))
+
+    nivel = case(
+        (func.lower(Producto.nombre).startswith(termino, autoescape=True), 0),
+        (and_(*[_contiene(Producto.nombre, t) for t in tokens]), 1),
+        else_=2,
+    )
+    return qry, [nivel.asc(), func.similarity(Producto.nombre, termino).desc()]
+
+
+# ---------------------------
+# Índice en memoria (SQLite)
+# ---------------------------
+class _Palabras:
+    """Vocabulario -> ids; una palabra buscada coincide con las que la contienen."""
+
+    def __init__(self, por_palabra: Dict[str, set]):
+        self.palabras = list(por_palabra)
+        self.ids = [por_palabra[p] for p in self.palabras]
+
+    def contienen(self, token: str) -> set:
+        out = set()
+        for palabra, ids in zip(self.palabras, self.ids):
+            if token in palabra:
+                out |= ids
+        return out
+
+
+class IndiceBusqueda:
+    def __init__(self, filas, firma=None):
+        self.firma = firma
+        self.nombres: Dict[str, str] = {}
+        por_nombre: Dict[str, set] = {}
+        por_descripcion: Dict[str, set] = {}
+        for producto_id, nombre, descripcion in filas:
+            self.nombres[producto_id] = (nombre or "").lower()
+            for palabra in tokenizar(nombre):
+                por_nombre.setdefault(palabra, set()).add(producto_id)
+            for palabra in tokenizar(descripcion):
+                por_descripcion.setdefault(palabra, set()).add(producto_id)
+        self.en_nombre = _Palabras(por_nombre)
+        self.en_descripcion = _Palabras(por_descripcion)
+
+    def buscar(self, tokens: List[str], limite: Optional[int] = None) -> Dict[str, int]:
+        """
+        {productoId: nivel de relevancia} de los productos que coinciden (los
+        `limite` más relevantes si se indica). Las palabras buscadas son \\w+,
+        así que aparecer en el texto equivale a estar dentro de una de sus palabras.
+        """
+        termino = " ".join(tokens)
+        coinciden = todas_en_nombre = None
+        for token in tokens:
+            en_nombre = self.en_nombre.contienen(token)
+            ids = en_nombre | self.en_descripcion.contienen(token)
+            coinciden = ids if coinciden is None else coinciden & ids
+            todas_en_nombre = en_nombre if todas_en_nombre is None else todas_en_nombre & en_nombre
+
+        niveles = {}
+        for pid in coinciden:
+            if self.nombres[pid].startswith(termino):
+                niveles[pid] = 0
+            else:
+                niveles[pid] = 1 if pid in todas_en_nombre else 2
+        return self._recortar(niveles, limite)
+
+    def _recortar(self, niveles: Dict[str, int], limite: Optional[int]) -> Dict[str, int]:
+        if limite is None or len(niveles) <= limite:
+            return niveles
+        mejores = heapq.nsmallest(limite, niveles, key=lambda pid: (niveles[pid], self.nombres[pid], pid))
+        return {pid: niveles[pid] for pid in mejores}
+
+
+_indices: Dict[str, IndiceBusqueda] = {}
+_lock = threading.Lock()
+
+
+def _firma(db: Session):
+    return tuple(db.execute(select(func.count(), func.max(Producto.actualizado_en)).select_from(Producto)).one())
+
+
+def indice_en_memoria(db: Session) -> IndiceBusqueda:
+    """Índice del catálogo de esta base; se reconstruye si la tabla cambió."""
+    clave = str(db.get_bind().url)
+    firma = _firma(db)
+    with _lock:
+        indice = _indices.get(clave)
+        if indice is None or indice.firma != firma:
+            filas = db.execute(select(Producto.productoId, Producto.nombre, Producto.descripcion))
+            indice = _indices[clave] = IndiceBusqueda(filas, firma)
+    return indice
+
+
+def invalidar():
+    with _lock:
+        _indices.clear()
+
+
+def _busqueda_en_memoria(db: Session, qry: Query, tokens: List[str]):
+    niveles = indice_en_memoria(db).buscar(tokens, limite=SEARCH_FALLBACK_MAX_RESULTS)
+    if not niveles:
+        return qry.filter(false()), []
+
+    por_nivel: Dict[int, List[str]] = {}
+    for pid, n in niveles.items():
+        por_nivel.setdefault(n, []).append(pid)
+    nivel = case(
+        *[(Producto.productoId.in_(ids), n) for n, ids in sorted(por_nivel.items())],
+        else_=2,
+    )
+    return qry.filter(Producto.productoId.in_(list(niveles))), [nivel.asc()]
+
+
+def aplicar_busqueda(db: Session, qry: Query, q: Optional[str]) -> Tuple[Query, list]:
+    """
+    Filtra `qry` por el término `q` y devuelve (consulta, orden por relevancia).
+    Sin palabras buscables (q vacío o solo signos) la consulta queda igual.
+    """
+    tokens = tokenizar(q)
+    if not tokens:
+        return qry, []
+    if db.get_bind().dialect.name == "postgresql":
+        return _busqueda_sql(qry, tokens)
+    return _busqueda_en_memoria(db, qry, tokens)
+
+
+def contar(db: Session, qry: Query, q: Optional[str]) -> int:
+    """
+    count(*) de `qry` filtrada por `q`. En SQLite cuenta todas las
+    coincidencias del índice en memoria (en bloques de
+    SEARCH_FALLBACK_MAX_RESULTS ids), no solo las que entran en la página.
+    """
+    tokens = tokenizar(q)
+    if not tokens or db.get_bind().dialect.name == "postgresql":
+        return aplicar_busqueda(db, qry, q)[0].with_entities(func.count()).scalar()
+
+    ids = list(indice_en_memoria(db).buscar(tokens))
+    return sum(
+        qry.filter(Producto.productoId.in_(ids[i:i + SEARCH_FALLBACK_MAX_RESULTS])).with_entities(func.count()).scalar()
+        for i in range(0, len(ids), SEARCH_FALLBACK_MAX_RESULTS)
+    )
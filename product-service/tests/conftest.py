@@ -10,8 +10,9 @@ from sqlalchemy.orm import sessionmaker
 
 # Importa tu app FastAPI real
 from app.main import app as fastapi_app
-from app.database.connection import EntitiesBase, get_db
+from app.database.connection import Base, EntitiesBase, get_db
 from app.database.seed import seed_categories
+from app.service import categorias, pagination, search
 
 
 import sqlite3
@@ -55,6 +56,47 @@ def override_get_db(db_session, monkeypatch):
         finally:
             pass
     monkeypatch.setattr("app.database.connection.get_db", _override)
+    # Las rutas resuelven get_db por Depends: el override va en la app
+    fastapi_app.dependency_overrides[get_db] = _override
+    yield
+    fastapi_app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def seed():
+    """Datos de `db` además de las categorías: cada módulo lo redefine con su función seed(session)."""
+    return None
+
+
+@pytest.fixture
+def db(request, tmp_path, seed):
+    """
+    Sesión sobre una base SQLite propia del test: esquema creado, categorías
+    sembradas, datos del `seed` del módulo y cachés en memoria vacías.
+    Un test usa otros datos con @pytest.mark.parametrize("db", [fn], indirect=True).
+    """
+    engine = create_engine(f"sqlite:///{tmp_path}/product.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    seed_categories(session)
+    poblar = getattr(request, "param", seed)
+    if poblar is not None:
+        poblar(session)
+        session.commit()
+    categorias.registro.invalidar()
+    search.invalidar()
+    pagination.invalidar()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def db_client(db):
+    """TestClient cuyas rutas usan la sesión `db`."""
+    fastapi_app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(fastapi_app)
+    fastapi_app.dependency_overrides.pop(get_db, None)
 
 
 @pytest.fixture(name="client")
@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from starlette.testclient import TestClient
+
+from app.database import bootstrap, connection
+from app.database.seed import SEED_CATEGORIES
+from app.main import app
+from app.models.category import CategoriaProducto
+from app.service import categorias
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def estado_limpio(monkeypatch):
+    monkeypatch.setattr(bootstrap, "estado", bootstrap.EstadoArranque())
+    monkeypatch.setattr(bootstrap, "BOOTSTRAP_RETRY_INITIAL_SECONDS", 0)
+    categorias.registro.invalidar()
+
+
+def test_engine_kwargs_por_motor():
+    sqlite = connection.engine_kwargs("sqlite:///./x.db")
+    assert sqlite["connect_args"] == {"check_same_thread": False}
+    assert "pool_size" not in sqlite
+
+    pg = connection.engine_kwargs("postgresql+psycopg://u:p@h:5432/db")
+    assert pg["poolclass"] is QueuePool
+    assert pg["pool_size"] == connection.DB_POOL_SIZE
+    assert pg["connect_args"] == {"connect_timeout": connection.DB_CONNECT_TIMEOUT}
+
+
+def test_arranque_crea_esquema_y_queda_listo(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/arranque.db", connect_args={"check_same_thread": False})
+    assert bootstrap.arrancar(bind=engine, max_intentos=1)
+
+    assert bootstrap.estado.listo and bootstrap.estado.error is None
+    assert bootstrap.estado.pasos[:3] == ["conexion", "esquema", "categorias"]
+    assert {"producto", "categoria_producto", "idempotencia"} <= set(inspect(engine).get_table_names())
+    with Session(bind=engine) as db:
+        assert db.query(CategoriaProducto).count() == len(SEED_CATEGORIES)
+        assert categorias.registro.obtener(db, "CAT-VAC-001") is not None
+
+    # Segundo arranque (otra réplica): idempotente
+    assert bootstrap.arrancar(bind=engine, max_intentos=2)
+    with Session(bind=engine) as db:
+        assert db.query(CategoriaProducto).count() == len(SEED_CATEGORIES)
+    engine.dispose()
+
+
+def test_arranque_agrega_columnas_nuevas_a_tabla_existente(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/previa.db", connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE producto ("productoId" VARCHAR PRIMARY KEY, nombre VARCHAR NOT NULL, '
+            'descripcion VARCHAR, "categoriaId" VARCHAR NOT NULL, "formaFarmaceutica" VARCHAR, '
+            '"requierePrescripcion" BOOLEAN, "registroSanitario" VARCHAR, estado_producto VARCHAR, '
+            'actualizado_en DATETIME)'
+        ))
+    connection.init_db(engine)
+    assert "codigoBarras" in {col["name"] for col in inspect(engine).get_columns("producto")}
+    connection.init_db(engine)  # idempotente
+    engine.dispose()
+
+
+def test_arranque_sin_bd_no_queda_listo(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/no-existe/arranque.db")
+    assert not bootstrap.arrancar(bind=engine, max_intentos=2)
+    assert not bootstrap.estado.listo
+    assert bootstrap.estado.intentos == 2
+    assert "BD" in bootstrap.estado.error or "datos" in bootstrap.estado.error
+
+
+def test_prewarm_abre_conexiones_distintas(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db", poolclass=QueuePool, pool_size=4, max_overflow=0,
+        connect_args={"check_same_thread": False},
+    )
+    assert connection.prewarm_pool(engine, n=10) == 4
+    assert engine.pool.checkedin() == 4
+    assert connection.prewarm_pool(engine, n=0) == 0
+    engine.dispose()
+
+
+def test_advisory_lock_no_bloquea_fuera_de_postgres(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/lock.db")
+    with connection.advisory_lock(engine):
+        with connection.advisory_lock(engine):
+            pass
+    engine.dispose()
+
+
+def test_health_live_y_ready():
+    assert client.get("/health/live").status_code == 200
+
+    r = client.get("/health/ready")
+    assert r.status_code == 503
+    assert r.json()["status"] == "starting"
+
+    bootstrap.estado.listo = True
+    r = client.get("/health/ready")
+    assert r.status_code == 200
+    assert r.json()["status"] == "ready"
@@ -0,0 +1,137 @@
+"""
+Búsqueda de productos (app/service/search.py).
+
+El benchmark del índice en memoria no corre por defecto:
+    RUN_BENCHMARKS=1 python -m pytest tests/test_busqueda.py -s
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+from sqlalchemy.schema import CreateIndex
+
+from app.models.product import Producto
+from app.service import search
+from app.service.product_service import ProductoService
+
+BENCHMARK_ROWS = 200_000
+
+
+def _poblar(session):
+    base = datetime(2026, 1, 1)
+    productos = [
+        ("Acetaminofén 500mg", "Caja x 16 tabletas"),
+        ("Ibuprofeno 400mg", "Analgésico antiinflamatorio"),
+        ("Jarabe para la tos", "Con acetaminofén y dextrometorfano"),
+        ("Vacuna influenza", "Suspensión inyectable"),
+        ("Acetaminofén pediátrico gotas", "Frasco 30 ml"),
+    ]
+    session.add_all([
+        Producto(productoId=str(uuid4()), nombre=n, descripcion=d, categoriaId="CAT-ANL-001",
+                 formaFarmaceutica="Tableta", actualizado_en=base + timedelta(minutes=i))
+        for i, (n, d) in enumerate(productos)
+    ])
+
+
+@pytest.fixture
+def seed():
+    return _poblar
+
+
+def _buscar(db, q, **kwargs):
+    params = dict(q=q, categoria_id=None, estado=None, sort=None, order="asc", page=1, page_size=25)
+    params.update(kwargs)
+    return ProductoService.listar_productos(db, **params)
+
+
+def test_busqueda_por_subcadena_ordenada_por_relevancia(db):
+    resp = _buscar(db, "acet")
+    # nombre empieza por el término > solo en la descripción
+    assert [p["nombre"] for p in resp["items"]] == [
+        "Acetaminofén 500mg",
+        "Acetaminofén pediátrico gotas",
+        "Jarabe para la tos",
+    ]
+    assert resp["total"] == 3
+
+
+def test_busqueda_varias_palabras_y_mayusculas(db):
+    assert [p["nombre"] for p in _buscar(db, "ACETAMINOFÉN got")["items"]] == ["Acetaminofén pediátrico gotas"]
+    # todas las palabras en el nombre (nivel 1) antes que con ayuda de la descripción (nivel 2)
+    assert [p["nombre"] for p in _buscar(db, "tos acetam")["items"]] == ["Jarabe para la tos"]
+    # subcadena, como el LIKE '%q%' original
+    assert [p["nombre"] for p in _buscar(db, "profeno")["items"]] == ["Ibuprofeno 400mg"]
+    assert [p["nombre"] for p in _buscar(db, "minofén 500")["items"]] == ["Acetaminofén 500mg"]
+
+
+def test_busqueda_termino_corto(db):
+    assert [p["nombre"] for p in _buscar(db, "ib")["items"]] == ["Ibuprofeno 400mg"]
+    # "ta" en el nombre (acetaminofén) antes que solo en la descripción (dextrometorfano, inyectable)
+    assert [p["nombre"] for p in _buscar(db, "ta")["items"]] == [
+        "Acetaminofén 500mg", "Acetaminofén pediátrico gotas", "Jarabe para la tos", "Vacuna influenza",
+    ]
+
+
+def test_total_no_depende_del_tope_del_indice(db, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_FALLBACK_MAX_RESULTS", 2)
+    resp = _buscar(db, "acet", page_size=1)
+    assert resp["total"] == 3
+    assert _buscar(db, "acet", categoria_id="CAT-OTR-001")["total"] == 0
+
+
+def test_busqueda_respeta_sort_explicito(db):
+    resp = _buscar(db, "acet", sort="nombre", order="desc")
+    assert [p["nombre"] for p in resp["items"]][0] == "Jarabe para la tos"
+
+
+def test_indice_en_memoria_se_reconstruye_al_cambiar_catalogo(db):
+    assert _buscar(db, "amoxi")["total"] == 0
+    db.add(Producto(productoId=str(uuid4()), nombre="Amoxicilina 500mg", descripcion="Cápsulas",
+                    categoriaId="CAT-ANL-001", formaFarmaceutica="Cápsula"))
+    db.commit()
+    assert _buscar(db, "amoxi")["total"] == 1
+
+
+def test_busqueda_sin_palabras_no_filtra(db):
+    assert _buscar(db, "%%")["total"] == 5
+
+
+def test_busqueda_postgres_usa_ilike_e_indices_trgm():
+    qry, orden = search._busqueda_sql(Query(Producto), ["acet", "a_b"])
+    compilado = qry.statement.compile(dialect=postgresql.dialect())
+    sql = str(compilado)
+    assert "producto.nombre ILIKE %(nombre_1)s ESCAPE" in sql
+    assert "producto.descripcion ILIKE" in sql
+    assert compilado.params["nombre_1"] == "%acet%"
+    assert "%a\\_b%" in compilado.params.values()
+    assert len(orden) == 2
+
+    ddl = {ix.name: str(CreateIndex(ix).compile(dialect=postgresql.dialect())) for ix in Producto.__table__.indexes}
+    assert "USING gin (nombre gin_trgm_ops)" in ddl["ix_producto_nombre_trgm"]
+    assert "USING gin (descripcion gin_trgm_ops)" in ddl["ix_producto_descripcion_trgm"]
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Benchmark: definir RUN_BENCHMARKS=1")
+def test_benchmark_indice_en_memoria():
+    palabras = ["acetaminofén", "ibuprofeno", "amoxicilina", "loratadina", "omeprazol", "vacuna", "jarabe"]
+    filas = [
+        (str(i), f"{palabras[i % 7]} {i % 1000}mg lote {i}", f"{palabras[(i * 3) % 7]} presentación {i % 50}")
+        for i in range(BENCHMARK_ROWS)
+    ]
+    start = time.perf_counter()
+    indice = search.IndiceBusqueda(filas)
+    construccion = time.perf_counter() - start
+
+    tiempos = []
+    for termino in ["a", "ac", "ace", "acet 5", "omep", "lote 99", "vacuna 12mg", "jar pres"] * 5:
+        start = time.perf_counter()
+        indice.buscar(search.tokenizar(termino), limite=search.SEARCH_FALLBACK_MAX_RESULTS)
+        tiempos.append(time.perf_counter() - start)
+    tiempos.sort()
+    p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+    print(f"\níndice en memoria de {BENCHMARK_ROWS} productos: construcción {construccion:.2f}s, "
+          f"búsqueda p50 {tiempos[len(tiempos) // 2] * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms")
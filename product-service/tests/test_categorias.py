@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.models.category import CategoriaProducto
+from app.service import categorias
+from app.service.product_service import ProductoService
+
+
+@pytest.fixture
+def consultas(db):
+    """SELECTs a categoria_producto emitidos durante el test."""
+    sentencias = []
+
+    def listener(conn, cursor, statement, *args):
+        if "categoria_producto" in statement:
+            sentencias.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    yield sentencias
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+def test_registro_sirve_desde_memoria(db, consultas):
+    vacunas = categorias.registro.obtener(db, "CAT-VAC-001")
+    assert vacunas.nombre == "Vacunas" and vacunas.requiereCadenaFrio
+    assert categorias.registro.nombres(db)["CAT-ANL-001"] == "Analgésicos"
+    categorias.registro.obtener(db, "CAT-OTR-001")
+    assert len(consultas) == 1
+
+
+def test_registro_recarga_al_vencer_ttl(db, consultas, monkeypatch):
+    categorias.registro.nombres(db)
+    monkeypatch.setattr(categorias, "CATEGORY_CACHE_TTL_SECONDS", 0)
+    categorias.registro.nombres(db)
+    assert len(consultas) == 2
+
+
+def test_categoria_nueva_se_encuentra_tras_recarga_por_miss(db, monkeypatch):
+    monkeypatch.setattr(categorias, "CATEGORY_MISS_RELOAD_SECONDS", 0)
+    categorias.registro.nombres(db)
+    db.add(CategoriaProducto(categoriaId="CAT-NEW-001", nombre="Nueva"))
+    db.commit()
+    assert categorias.registro.obtener(db, "CAT-NEW-001").nombre == "Nueva"
+    assert categorias.registro.obtener(db, "NO-EXISTE") is None
+
+
+def test_crear_producto_no_consulta_categorias(db, consultas):
+    categorias.registro.nombres(db)
+    data = {"nombre": "Vacuna X", "descripcion": "d", "categoriaId": "CAT-VAC-001", "formaFarmaceutica": "Vial"}
+    entity, requiere_cadena_frio = ProductoService.crear_producto(db, data)
+    assert requiere_cadena_frio is True
+    assert len(consultas) == 1  # solo la carga inicial
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.cerrado = False
+        redis.pubsubs.append(self)
+
+    def subscribe(self, channel):
+        self.redis.subscribed.set()
+
+    def close(self):
+        self.cerrado = True
+
+    def get_message(self, timeout=None):
+        if self.redis.caidas:
+            self.redis.caidas -= 1
+            raise ConnectionError("Connection reset by peer")
+        try:
+            return {"type": "message", "data": self.redis.mensajes.pop(0)}
+        except IndexError:
+            time.sleep(0.01)
+            return None
+
+
+class FakeRedis:
+    def __init__(self):
+        self.mensajes = []
+        self.subscribed = threading.Event()
+        self.pubsubs = []
+        self.caidas = 0
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return FakePubSub(self)
+
+    def publish(self, channel, message):
+        assert channel == categorias.CATEGORY_CHANNEL
+        self.mensajes.append(message)
+
+
+def test_aviso_por_pubsub_invalida_el_registro(db):
+    fake = FakeRedis()
+    categorias.registro.suscribir(fake)
+    assert fake.subscribed.wait(2)
+
+    categorias.registro.cargar(db)
+    categorias.publicar_cambio(fake)  # como lo haría otra instancia tras el seed
+    categorias.registro.cargar(db)
+    deadline = time.monotonic() + 2
+    while fake.mensajes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert categorias.registro._snapshots == {}
+
+
+def test_reconexion_cierra_la_suscripcion_anterior(monkeypatch):
+    monkeypatch.setattr(categorias, "CATEGORY_PUBSUB_RETRY_SECONDS", 0)
+    fake = FakeRedis()
+    fake.caidas = 2
+    categorias.registro.suscribir(fake)
+
+    deadline = time.monotonic() + 2
+    while len(fake.pubsubs) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Cada caída cierra su pubsub; solo queda abierta la suscripción vigente
+    assert [p.cerrado for p in fake.pubsubs[:3]] == [True, True, False]
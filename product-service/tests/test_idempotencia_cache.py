@@ -40,7 +40,11 @@ def test_idempotencia_cache_hit(monkeypatch):
     class FakeRedis:
         def __init__(self): self.data = {}
         def get(self, k): return self.data.get(k)
-        def set(self, k, v, ex=None): self.data[k] = v
+        def set(self, k, v, nx=False, ex=None):
+            if nx and k in self.data:
+                return None
+            self.data[k] = v
+            return True
         def setex(self, k, ttl, v): self.data[k] = v  # <- necesario para la ruta
 
     import app.routes.products as routes
@@ -62,6 +66,8 @@ def test_idempotencia_cache_hit(monkeypatch):
     assert r1.status_code == 201
     assert r2.status_code == 201
     assert calls["n"] == 1  # la segunda debe salir del cache
+    # La respuesta quedó guardada en Redis (no en el respaldo de la base)
+    assert fake_r.data["idem:k1"].startswith(b"D|")
 
 def test_error_400_en_creacion(monkeypatch):
     create_path = descubrir_endpoint_creacion()
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.service import idempotencia
+from app.service.idempotencia import ejecutar_idempotente
+
+PAYLOAD = {"nombre": "Vacuna", "categoriaId": "CAT-VAC-001"}
+
+
+class FakeRedis:
+    """SET NX EX / GET / DELETE atómicos con un lock, como un Redis de un solo hilo."""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def get(self, key):
+        with self.lock:
+            return self.data.get(key)
+
+    def delete(self, key):
+        with self.lock:
+            return int(self.data.pop(key, None) is not None)
+
+
+class RedisCaido:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise RedisConnectionError("Connection refused")
+        return fail
+
+
+def _contador(pausa=0.0):
+    llamadas = []
+
+    def fn():
+        llamadas.append(1)
+        time.sleep(pausa)
+        return 201, b'{"productoId":"%d"}' % len(llamadas)
+    return fn, llamadas
+
+
+@pytest.mark.parametrize("redis_client", [FakeRedis(), RedisCaido()], ids=["redis", "fallback-db"])
+def test_reintento_devuelve_la_primera_respuesta(db, redis_client):
+    fn, llamadas = _contador()
+    primera = ejecutar_idempotente("k-seq", PAYLOAD, fn, db, redis_client)
+    segunda = ejecutar_idempotente("k-seq", PAYLOAD, fn, db, redis_client)
+    assert primera == segunda == (201, b'{"productoId":"1"}')
+    assert len(llamadas) == 1
+
+
+@pytest.mark.parametrize("redis_client", [FakeRedis(), RedisCaido()], ids=["redis", "fallback-db"])
+def test_concurrentes_esperan_a_la_primera(db, redis_client):
+    fn, llamadas = _contador(pausa=0.2)
+    resultados = []
+
+    def solicitud():
+        resultados.append(ejecutar_idempotente("k-conc", PAYLOAD, fn, db, redis_client))
+
+    hilos = [threading.Thread(target=solicitud) for _ in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert len(llamadas) == 1
+    assert resultados == [(201, b'{"productoId":"1"}')] * 4
+
+
+def test_misma_clave_otro_payload_409(db):
+    redis = FakeRedis()
+    fn, _ = _contador()
+    ejecutar_idempotente("k-409", PAYLOAD, fn, db, redis)
+    with pytest.raises(HTTPException) as exc:
+        ejecutar_idempotente("k-409", {**PAYLOAD, "nombre": "Otra"}, fn, db, redis)
+    assert exc.value.status_code == 409
+
+
+def test_falla_libera_la_reserva(db):
+    redis = FakeRedis()
+
+    def falla():
+        raise HTTPException(status_code=400, detail="categoriaId inexistente")
+
+    with pytest.raises(HTTPException):
+        ejecutar_idempotente("k-err", PAYLOAD, falla, db, redis)
+    fn, llamadas = _contador()
+    assert ejecutar_idempotente("k-err", PAYLOAD, fn, db, redis)[0] == 201
+    assert len(llamadas) == 1
+
+
+def test_error_de_programacion_no_cae_a_la_base(db):
+    class RedisRoto(FakeRedis):
+        def set(self, key, value, ex=None):  # sin nx: TypeError
+            return super().set(key, value, ex=ex)
+
+    fn, llamadas = _contador()
+    with pytest.raises(TypeError):
+        ejecutar_idempotente("k-bug", PAYLOAD, fn, db, RedisRoto())
+    assert not llamadas
+
+
+def test_espera_acotada_responde_409(db, monkeypatch):
+    monkeypatch.setattr(idempotencia, "IDEMPOTENCY_WAIT_SECONDS", 0.1)
+    redis = FakeRedis()
+    redis.set("idem:k-colgada", b"P|" + idempotencia.huella(PAYLOAD).encode(), nx=True)
+    fn, llamadas = _contador()
+    with pytest.raises(HTTPException) as exc:
+        ejecutar_idempotente("k-colgada", PAYLOAD, fn, db, redis)
+    assert exc.value.status_code == 409
+    assert not llamadas
+
+
+def test_endpoint_no_duplica_productos(client, monkeypatch):
+    import app.routes.products as routes
+    from app.service import product_service
+
+    monkeypatch.setattr(routes, "redis_client", FakeRedis())
+    creados = []
+    original = product_service.ProductoService.crear_producto
+
+    def contar(db, data):
+        creados.append(data)
+        return original(db, data)
+    monkeypatch.setattr(product_service.ProductoService, "crear_producto", staticmethod(contar))
+
+    headers = {"X-User-Role": "Administrador de Compras", "X-Idempotency-Key": "k-endpoint"}
+    payload = {"nombre": "Ibuprofeno 400", "descripcion": "Caja", "categoriaId": "CAT-ANL-001",
+               "formaFarmaceutica": "Tableta", "requierePrescripcion": False}
+    r1 = client.post("/productos", json=payload, headers=headers)
+    r2 = client.post("/productos", json=payload, headers=headers)
+    assert r1.status_code == r2.status_code == 201
+    assert r1.content == r2.content
+    assert len(creados) == 1
@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql
+
+from app.models.inventario import Inventario
+from app.models.product import Producto
+from app.service import inventario
+
+HEADERS = {"X-User-Role": "Administrador de Compras"}
+TOKEN = {"Authorization": "Bearer t"}
+
+
+def _poblar(session):
+    session.add_all([
+        Producto(productoId="p-1", nombre="Ibuprofeno 400", categoriaId="CAT-ANL-001", estado_producto="activo"),
+        Producto(productoId="p-2", nombre="Vacuna X", categoriaId="CAT-VAC-001", estado_producto="activo"),
+        Producto(productoId="p-3", nombre="Sin stock", categoriaId="CAT-OTR-001", estado_producto="activo"),
+        Producto(productoId="p-4", nombre="Retirado", categoriaId="CAT-OTR-001", estado_producto="inactivo"),
+    ])
+    session.add_all([
+        Inventario(productoId="p-1", cantidad_disponible=100, precio=1500.5),
+        Inventario(productoId="p-2", cantidad_disponible=3, precio=80000),
+        Inventario(productoId="p-4", cantidad_disponible=50, precio=10),
+    ])
+
+
+@pytest.fixture
+def seed():
+    return _poblar
+
+
+@pytest.fixture
+def inv_client(db_client):
+    db_client.headers.update(TOKEN)
+    return db_client
+
+
+def test_lookup_una_consulta(inv_client, db):
+    sentencias = []
+
+    def listener(conn, cursor, statement, *args):
+        sentencias.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        r = inv_client.post("/api/v1/inventario:lookup", json={"items": [
+            {"productoId": "p-1", "cantidad": 10},
+            {"productoId": "p-2", "cantidad": 5},
+            {"productoId": "p-3"},
+            {"productoId": "p-4", "cantidad": 1},
+            {"productoId": "no-existe"},
+            {"productoId": "p-1", "cantidad": 100},
+        ]})
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert r.status_code == 200
+    items = r.json()["items"]
+    assert [i["productoId"] for i in items] == ["p-1", "p-2", "p-3", "p-4", "no-existe", "p-1"]
+    assert [i["disponible"] for i in items] == [True, False, False, False, False, True]
+    assert items[0]["precio"] == 1500.5 and items[0]["cantidad_disponible"] == 100
+    assert items[0]["nombre"] == "Ibuprofeno 400"
+    assert items[1]["mensaje"] == "Inventario insuficiente. Disponible: 3"
+    assert items[2]["mensaje"] == "Producto sin precio" and items[2]["cantidad_disponible"] == 0
+    assert items[3]["mensaje"] == "Producto inactivo"
+    assert items[4]["encontrado"] is False
+    assert len([s for s in sentencias if s.lstrip().upper().startswith("SELECT")]) == 1
+
+
+def test_lookup_limites(inv_client, monkeypatch):
+    assert inv_client.post("/api/v1/inventario:lookup", json={"items": []}).status_code == 422
+    assert inv_client.post("/api/v1/inventario:lookup", json={"items": [{"productoId": "p-1", "cantidad": 0}]}).status_code == 422
+    monkeypatch.setattr(inventario, "INVENTORY_LOOKUP_MAX_ITEMS", 1)
+    r = inv_client.post("/api/v1/inventario:lookup", json={"items": [{"productoId": "p-1"}, {"productoId": "p-2"}]})
+    assert r.status_code == 400
+
+
+def test_lookup_postgres_usa_any():
+    class FakeBind:
+        class dialect:
+            name = "postgresql"
+
+    class FakeDb:
+        def get_bind(self):
+            return FakeBind()
+
+    stmt = select(Producto.productoId).where(inventario._filtro_ids(FakeDb(), ["a", "b"]))
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert '"productoId" = ANY (' in sql
+
+
+def test_endpoints_de_pedidos_service(inv_client):
+    r = inv_client.get("/api/productos/p-1/inventario")
+    assert r.status_code == 200
+    assert r.json() == {"producto_id": "p-1", "cantidad_disponible": 100, "precio": 1500.5}
+    assert inv_client.get("/api/productos/no-existe/inventario").status_code == 404
+
+    r = inv_client.get("/api/productos/p-2")
+    assert r.status_code == 200
+    assert r.json()["nombre"] == "Vacuna X" and r.json()["categoria"] == "Vacunas"
+    assert inv_client.get("/api/productos/no-existe").status_code == 404
+
+
+def test_consultas_requieren_token(db_client):
+    assert db_client.post("/api/v1/inventario:lookup", json={"items": [{"productoId": "p-1"}]}).status_code == 401
+    assert db_client.get("/api/productos/p-1/inventario").status_code == 401
+    assert db_client.get("/api/productos/p-1").status_code == 401
+
+
+def test_actualizar_inventario(inv_client):
+    r = inv_client.put("/api/v1/productos/p-3/inventario", json={"cantidad_disponible": 7, "precio": 99.9}, headers=HEADERS)
+    assert r.status_code == 200
+    assert r.json()["cantidad_disponible"] == 7 and r.json()["precio"] == 99.9
+
+    r = inv_client.put("/api/v1/productos/p-1/inventario", json={"cantidad_disponible": 0}, headers=HEADERS)
+    assert r.json()["cantidad_disponible"] == 0 and r.json()["precio"] is None
+
+    assert inv_client.put("/api/v1/productos/no-existe/inventario", json={"cantidad_disponible": 1}, headers=HEADERS).status_code == 404
+    assert inv_client.put("/api/v1/productos/p-3/inventario", json={"cantidad_disponible": -1}, headers=HEADERS).status_code == 422
+    # Token sin el rol de compras
+    assert inv_client.put("/api/v1/productos/p-3/inventario", json={"cantidad_disponible": 1}).status_code == 403
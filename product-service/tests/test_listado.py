@@ -0,0 +1,121 @@
+"""
+Listado de productos: una consulta de columnas, nombres de categoría desde
+el registro en memoria y serialización directa con orjson, contra el camino
+anterior (entidades ORM + categoria lazy por fila + ProductoOut).
+
+El benchmark no corre por defecto:
+    RUN_BENCHMARKS=1 python -m pytest tests/test_listado.py -s
+"""
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from sqlalchemy import asc, event
+
+from app.database.seed import SEED_CATEGORIES
+from app.main import app
+from app.models.product import Producto, ProductoOut, ProductosResponse
+from app.service.product_service import ProductoService
+from app.service.rbac import require_role_admincompras
+
+BENCHMARK_ROWS = 100_000
+BENCHMARK_PAGES = 200
+
+
+def _poblar(session, n):
+    base = datetime(2026, 1, 1)
+    categorias = [c["categoriaId"] for c in SEED_CATEGORIES]
+    session.bulk_insert_mappings(Producto, [
+        {
+            "productoId": f"p-{i:07d}", "nombre": f"Producto {i % 997:03d}", "descripcion": "desc",
+            "categoriaId": categorias[i % len(categorias)], "formaFarmaceutica": "Tableta",
+            "requierePrescripcion": bool(i % 2), "registroSanitario": f"INVIMA2020-M-{i:06d}",
+            "estado_producto": "activo", "actualizado_en": base + timedelta(seconds=i),
+        }
+        for i in range(n)
+    ])
+    session.commit()
+
+
+@pytest.fixture
+def seed():
+    return lambda session: _poblar(session, 30)
+
+
+def _legacy_page(db, page, page_size):
+    """Camino anterior: entidades ORM, r.categoria lazy por fila y ProductoOut."""
+    qry = db.query(Producto)
+    total = qry.count()
+    rows = qry.order_by(asc(Producto.nombre), asc(Producto.productoId)).offset((page - 1) * page_size).limit(page_size).all()
+    items = [
+        ProductoOut(
+            productoId=r.productoId, nombre=r.nombre, categoria=r.categoria.nombre,
+            formaFarmaceutica=r.formaFarmaceutica, requierePrescripcion=r.requierePrescripcion,
+            registroSanitario=r.registroSanitario, estado_producto=r.estado_producto,
+            actualizado_en=r.actualizado_en,
+        )
+        for r in rows
+    ]
+    return ProductosResponse(total=total, items=items, page=page, page_size=page_size).model_dump_json()
+
+
+def _page(db, page, page_size):
+    return orjson.dumps(ProductoService.listar_productos(
+        db, q=None, categoria_id=None, estado=None, sort="nombre", order="asc", page=page, page_size=page_size,
+    ))
+
+
+def test_listado_igual_al_camino_orm(db):
+    for page in (1, 2):
+        nuevo = json.loads(_page(db, page, 25))
+        anterior = json.loads(_legacy_page(db, page, 25))
+        # next_cursor no existía en el camino anterior; el resto coincide campo a campo
+        assert nuevo.pop("next_cursor") is not None or page == 2
+        anterior.pop("next_cursor")
+        assert nuevo == anterior
+
+
+def test_listado_sin_consultas_por_fila(db):
+    _page(db, 1, 25)  # carga el registro de categorías
+    sentencias = []
+    listener = lambda *args: sentencias.append(args[2])  # noqa: E731
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        _page(db, 1, 25)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    # count(*) + la página; los nombres de categoría salen del registro en memoria
+    assert len(sentencias) == 2
+    assert not any("categoria_producto" in sql for sql in sentencias)
+
+
+def test_endpoint_v1_serializa_fechas(db_client):
+    app.dependency_overrides[require_role_admincompras] = lambda: None
+    resp = db_client.get("/api/v1/productos?page_size=2&sort=actualizado_en")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["total"] == 30
+    assert body["items"][0]["actualizado_en"] == "2026-01-01T00:00:00"
+    assert body["items"][0]["categoria"] == "Analgésicos"
+    assert body["next_cursor"]
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Benchmark: definir RUN_BENCHMARKS=1")
+@pytest.mark.parametrize("db", [lambda session: _poblar(session, BENCHMARK_ROWS)], indirect=True)
+def test_benchmark_listado(db):
+    resultados = {}
+    for nombre, fn in (("orm + ProductoOut", _legacy_page), ("columnas + orjson", _page)):
+        tiempos = []
+        for i in range(BENCHMARK_PAGES):
+            db.expire_all()  # sin identity map caliente entre páginas
+            start = time.perf_counter()
+            fn(db, 1 + i % 20, 100)
+            tiempos.append(time.perf_counter() - start)
+        tiempos.sort()
+        resultados[nombre] = (tiempos[len(tiempos) // 2], tiempos[int(len(tiempos) * 0.95) - 1])
+    print(f"\npágina de 100 sobre {BENCHMARK_ROWS} productos (SQLite):")
+    for nombre, (p50, p95) in resultados.items():
+        print(f"  {nombre:18} p50 {p50 * 1000:6.1f} ms  p95 {p95 * 1000:6.1f} ms")
@@ -0,0 +1,125 @@
+"""
+Alta masiva POST /api/v1/productos:batch: validación de todo el lote antes de
+escribir, categorías en una consulta e INSERT multi-fila de los válidos.
+
+El benchmark (5k productos: un lote contra 5k POST /productos) no corre por defecto:
+    RUN_BENCHMARKS=1 python -m pytest tests/test_lote.py -s
+"""
+import os
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app.models.product import Producto, ProductoCreate, ProductoLoteItem
+from app.routes import products as routes
+
+HEADERS = {"X-User-Role": "Administrador de Compras"}
+BENCHMARK_ITEMS = 5000
+
+
+def _item(i, **extra):
+    return {
+        "nombre": f"Producto {i}", "descripcion": "Caja x 10", "categoriaId": "CAT-ANL-001",
+        "formaFarmaceutica": "Tableta", "requierePrescripcion": False,
+        "registroSanitario": f"INVIMA2020-M-{i:06d}", "codigoBarras": "7701234567897", **extra,
+    }
+
+
+@pytest.fixture
+def sentencias(db):
+    registradas = []
+
+    def listener(conn, cursor, statement, *args):
+        registradas.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    yield registradas
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+
+def test_lote_valido_un_insert(db_client, db, sentencias):
+    items = [_item(i) for i in range(50)]
+    r = db_client.post("/api/v1/productos:batch", json=items, headers=HEADERS)
+
+    assert r.status_code == 201
+    body = r.json()
+    assert body["creados"] == 50 and body["rechazados"] == 0
+    assert [res["indice"] for res in body["resultados"]] == list(range(50))
+    assert db.query(Producto).count() == 50
+
+    inserts = [s for s in sentencias if s.lstrip().upper().startswith("INSERT INTO PRODUCTO")]
+    categorias_sql = [s for s in sentencias if "categoria_producto" in s]
+    assert len(inserts) == 1
+    assert len(categorias_sql) == 1
+
+
+def test_lote_reporta_errores_por_item(db_client, db):
+    items = [
+        _item(0),
+        _item(1, codigoBarras="7701234567890"),  # dígito de control incorrecto
+        _item(2, registroSanitario="123"),
+        _item(3, categoriaId="NO-EXISTE"),
+        {"nombre": "Sin categoría"},
+        _item(5, codigoBarras=None, registroSanitario=None),
+    ]
+    r = db_client.post("/api/v1/productos:batch", json=items, headers=HEADERS)
+
+    assert r.status_code == 207
+    body = r.json()
+    assert body["creados"] == 2 and body["rechazados"] == 4
+    res = body["resultados"]
+    assert [x["estado"] for x in res] == ["creado", "rechazado", "rechazado", "rechazado", "rechazado", "creado"]
+    assert res[1]["errores"] == ["codigoBarras inválido"]
+    assert res[2]["errores"] == ["registroSanitario inválido"]
+    assert res[3]["errores"] == ["categoriaId inexistente"]
+    assert any(e.startswith("categoriaId") for e in res[4]["errores"])
+
+    creados = {p.productoId: p.codigoBarras for p in db.query(Producto).all()}
+    assert creados == {res[0]["productoId"]: "7701234567897", res[5]["productoId"]: None}
+
+
+def test_lote_sin_validos_422(db_client, db):
+    r = db_client.post("/api/v1/productos:batch", json=[_item(0, categoriaId="NO-EXISTE")], headers=HEADERS)
+    assert r.status_code == 422
+    assert r.json()["creados"] == 0
+    assert db.query(Producto).count() == 0
+
+
+def test_lote_vacio_o_excedido_400(db_client, monkeypatch):
+    assert db_client.post("/api/v1/productos:batch", json=[], headers=HEADERS).status_code == 400
+    monkeypatch.setattr(routes, "BATCH_MAX_ITEMS", 2)
+    r = db_client.post("/api/v1/productos:batch", json=[_item(i) for i in range(3)], headers=HEADERS)
+    assert r.status_code == 400
+
+
+def test_lote_requiere_rol(db_client):
+    assert db_client.post("/api/v1/productos:batch", json=[_item(0)]).status_code == 401
+    r = db_client.post("/api/v1/productos:batch", json=[_item(0)],
+                         headers={"Authorization": "Bearer x", "X-User-Role": "Vendedor"})
+    assert r.status_code == 403
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Benchmark: definir RUN_BENCHMARKS=1")
+def test_benchmark_lote(db_client, db):
+    items = [_item(i, codigoBarras=None) for i in range(BENCHMARK_ITEMS)]
+
+    start = time.perf_counter()
+    for item in items:
+        assert db_client.post("/productos", json=item, headers=HEADERS).status_code == 201
+    uno_a_uno = time.perf_counter() - start
+
+    start = time.perf_counter()
+    r = db_client.post("/api/v1/productos:batch", json=items, headers=HEADERS)
+    lote = time.perf_counter() - start
+    assert r.status_code == 201
+
+    print(f"\n{BENCHMARK_ITEMS} productos (SQLite):")
+    print(f"  POST /productos x{BENCHMARK_ITEMS:<6} {uno_a_uno:7.2f} s")
+    print(f"  POST /productos:batch      {lote:7.2f} s")
+
+
+def test_codigo_barras_solo_en_lote():
+    # El alta individual mantiene su contrato: codigoBarras no forma parte de ProductoCreate
+    assert "codigoBarras" not in ProductoCreate.model_fields
+    assert "codigoBarras" in ProductoLoteItem.model_fields
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import inspect
+
+from app.models.product import Producto
+from app.service import pagination
+from app.service.product_service import ProductoService
+
+
+def _poblar(session):
+    base = datetime(2026, 1, 1)
+    # Nombres repetidos para probar el desempate por productoId
+    session.add_all([
+        Producto(productoId=f"p-{i:02d}", nombre=f"Producto {i // 2:02d}", descripcion="desc",
+                 categoriaId="CAT-ANL-001" if i % 3 else "CAT-VAC-001", formaFarmaceutica="Tableta",
+                 actualizado_en=base + timedelta(minutes=i % 5))
+        for i in range(11)
+    ])
+
+
+@pytest.fixture
+def seed():
+    return _poblar
+
+
+def _listar(db, **kwargs):
+    params = dict(q=None, categoria_id=None, estado=None, sort="nombre", order="asc", page=1, page_size=4)
+    params.update(kwargs)
+    return ProductoService.listar_productos(db, **params)
+
+
+def _recorrer(db, **kwargs):
+    ids, cursor = [], None
+    while True:
+        resp = _listar(db, cursor=cursor, **kwargs)
+        ids += [p["productoId"] for p in resp["items"]]
+        cursor = resp["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("sort", ["nombre", "actualizado_en"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_recorre_igual_que_offset(db, sort, order):
+    por_offset = []
+    for page in range(1, 4):
+        por_offset += [p["productoId"] for p in _listar(db, sort=sort, order=order, page=page)["items"]]
+    assert len(por_offset) == 11
+
+    assert _recorrer(db, sort=sort, order=order) == por_offset
+
+
+def _poblar_con_nulos(session):
+    _poblar(session)
+    # Filas sin actualizado_en (p. ej. cargadas por fuera del ORM)
+    session.add_all([
+        Producto(productoId=f"n-{i}", nombre=f"Sin fecha {i}", descripcion="desc", categoriaId="CAT-ANL-001",
+                 formaFarmaceutica="Tableta", actualizado_en=None)
+        for i in range(5)
+    ])
+
+
+@pytest.mark.parametrize("db", [_poblar_con_nulos], indirect=True)
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_keyset_actualizado_en_nulo(db, order):
+    por_offset = []
+    for page in range(1, 5):
+        por_offset += [p["productoId"] for p in _listar(db, sort="actualizado_en", order=order, page=page)["items"]]
+    assert len(por_offset) == 16
+    # Sin fecha: al final en asc, al principio en desc
+    nulos = [f"n-{i}" for i in range(5)]
+    assert (por_offset[-5:] if order == "asc" else por_offset[:5]) == (nulos if order == "asc" else nulos[::-1])
+
+    assert _recorrer(db, sort="actualizado_en", order=order) == por_offset
+
+
+def test_keyset_con_filtro(db):
+    ids = _recorrer(db, categoria_id="CAT-VAC-001")
+    assert ids == ["p-00", "p-03", "p-06", "p-09"]
+
+
+def test_cursor_invalido_o_de_otro_orden(db):
+    cursor = _listar(db)["next_cursor"]
+    with pytest.raises(ValueError):
+        _listar(db, sort="actualizado_en", cursor=cursor)
+    with pytest.raises(ValueError):
+        _listar(db, cursor="no-es-un-cursor")
+
+
+def test_totales(db):
+    assert _listar(db)["total"] == 11
+    assert _listar(db, total_mode=pagination.TOTAL_NINGUNO)["total"] is None
+
+    resp = _listar(db, total_mode=pagination.TOTAL_APROXIMADO)
+    assert (resp["total"], resp["total_aproximado"]) == (11, True)
+    # Con filtros el total es exacto
+    resp = _listar(db, categoria_id="CAT-VAC-001", total_mode=pagination.TOTAL_APROXIMADO)
+    assert (resp["total"], resp["total_aproximado"]) == (4, False)
+
+
+def test_conteo_aproximado_cacheado(db, monkeypatch):
+    monkeypatch.setattr(pagination, "COUNT_CACHE_TTL_SECONDS", 60)
+    assert pagination.total_aproximado(db) == 11
+    db.add(Producto(productoId="p-99", nombre="Nuevo", categoriaId="CAT-OTR-001"))
+    db.commit()
+    assert pagination.total_aproximado(db) == 11
+    pagination.invalidar()
+    assert pagination.total_aproximado(db) == 12
+
+
+def test_indices_compuestos_de_keyset(db):
+    names = {ix["name"] for ix in inspect(db.connection()).get_indexes("producto")}
+    assert {"ix_producto_nombre_id", "ix_producto_actualizado_id"} <= names
+
+
+def test_endpoint_cursor_invalido_400(client):
+    headers = {"Authorization": "Bearer x", "X-User-Role": "Administrador de Compras"}
+    assert client.get("/productos?cursor=xyz", headers=headers).status_code == 400
@@ -1,6 +1,17 @@
 # tests/test_validators.py
+import os
+import random
+import string
+import time
+
+import numpy as np
 import pytest
-from app.service.validators import validate_ean, validate_registro_sanitario
+from app.service.validators import (
+    validate_ean,
+    validate_ean_many,
+    validate_registro_sanitario,
+    validate_rs_many,
+)
 
 def test_validate_ean_ok():
     # EAN-13 válido (check digit correcto para "770123456789")
@@ -22,3 +33,86 @@ def test_validate_registro_sanitario_ok():
 ])
 def test_validate_registro_sanitario_bad(bad):
     assert validate_registro_sanitario(bad) is False
+
+
+# ---------------------------
+# Validación por lotes: mismos resultados que las funciones escalares.
+# El benchmark no corre por defecto:
+#     RUN_BENCHMARKS=1 python -m pytest tests/test_validators.py -s
+# ---------------------------
+def _gtin(rng, largo):
+    cuerpo = [rng.randrange(10) for _ in range(largo - 1)]
+    total = sum(d * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(cuerpo)))
+    return "".join(map(str, cuerpo)) + str((10 - total % 10) % 10)
+
+
+def _ean_aleatorio(rng):
+    tipo = rng.randrange(8)
+    if tipo < 3:
+        return _gtin(rng, rng.choice((8, 12, 13, 14)))
+    if tipo == 3:
+        # válido con un dígito alterado
+        code = _gtin(rng, rng.choice((8, 12, 13, 14)))
+        i = rng.randrange(len(code))
+        return code[:i] + str((int(code[i]) + rng.randrange(1, 10)) % 10) + code[i + 1:]
+    if tipo == 4:
+        return "".join(rng.choice(string.digits) for _ in range(rng.randrange(0, 17)))
+    if tipo == 5:
+        return "".join(rng.choice(string.digits + "ab -") for _ in range(rng.randrange(1, 15)))
+    if tipo == 6:
+        # dígitos no ASCII (\d los acepta)
+        return "".join(rng.choice("0123456789٠١٢٣٤٥٦٧٨٩") for _ in range(13))
+    return rng.choice([None, "", " 7701234567897", "7701234567897 "])
+
+
+def _rs_aleatorio(rng):
+    prefijo = "".join(rng.choice(string.ascii_letters) for _ in range(rng.randrange(2, 12)))
+    numero = "".join(rng.choice(string.digits) for _ in range(rng.randrange(0, 8)))
+    sufijo = "".join(rng.choice(string.ascii_uppercase + string.digits + "-_ ") for _ in range(rng.randrange(0, 6)))
+    sep = rng.choice(["", " ", "  ", "\t"])
+    return rng.choice([prefijo + sep + numero + sufijo, f"  {prefijo}{numero} ", None, "", "ÑANDÚ 2025"])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_validate_ean_many_igual_a_escalar(seed):
+    rng = random.Random(seed)
+    codes = [_ean_aleatorio(rng) for _ in range(2000)]
+    mask = validate_ean_many(codes)
+    assert mask.dtype == np.bool_
+    assert mask.tolist() == [validate_ean(c) for c in codes]
+    assert mask.any() and not mask.all()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_validate_rs_many_igual_a_escalar(seed):
+    rng = random.Random(seed)
+    codes = [_rs_aleatorio(rng) for _ in range(2000)]
+    mask = validate_rs_many(codes)
+    assert mask.dtype == np.bool_
+    assert mask.tolist() == [validate_registro_sanitario(c) for c in codes]
+    assert mask.any() and not mask.all()
+
+
+def test_lotes_vacios():
+    assert validate_ean_many([]).shape == (0,)
+    assert validate_rs_many(iter([])).shape == (0,)
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Benchmark: definir RUN_BENCHMARKS=1")
+def test_benchmark_validacion_lotes():
+    rng = random.Random(0)
+    n = 500_000
+    eans = [_gtin(rng, 13) for _ in range(n)]
+    registros = [f"INVIMA {2000 + i % 25}M-{i:06d}-R1" for i in range(n)]
+    casos = (
+        ("EAN escalar", lambda: [validate_ean(c) for c in eans]),
+        ("EAN lote", lambda: validate_ean_many(eans)),
+        ("RS escalar", lambda: [validate_registro_sanitario(c) for c in registros]),
+        ("RS lote", lambda: validate_rs_many(registros)),
+    )
+    print(f"\n{n} códigos:")
+    for nombre, fn in casos:
+        start = time.perf_counter()
+        fn()
+        segundos = time.perf_counter() - start
+        print(f"  {nombre:12} {segundos:6.3f} s  {n / segundos / 1e6:5.2f} M códigos/s")
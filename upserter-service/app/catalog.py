@@ -0,0 +1,58 @@
+"""
+Versión del catálogo `products`.
+
+Cada upsert que inserta o actualiza filas incrementa el contador en la
+misma transacción. Los lectores de /products usan una copia en memoria
+(válida CATALOG_VERSION_TTL_SECONDS) para armar el ETag sin consultar la
+base; el proceso que hace el upsert la invalida de inmediato.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .models import CatalogVersion, ensure_row
+
+CATALOG_NAME = "products"
+CATALOG_VERSION_TTL_SECONDS = float(os.environ.get("CATALOG_VERSION_TTL_SECONDS", "2"))
+
+
+def bump_catalog_version(db: Session):
+    """Incrementa la versión del catálogo (sin commit)."""
+    table = CatalogVersion.__table__
+    ensure_row(db, CatalogVersion, name=CATALOG_NAME, version=0)
+    # El UPDATE bloquea la fila: los upserts concurrentes se serializan aquí
+    db.execute(update(table).where(table.c.name == CATALOG_NAME).values(version=table.c.version + 1))
+
+
+def read_catalog_version(db: Session) -> int:
+    table = CatalogVersion.__table__
+    return db.execute(select(table.c.version).where(table.c.name == CATALOG_NAME)).scalar() or 0
+
+
+class CatalogVersionCache:
+    def __init__(self, ttl: float = CATALOG_VERSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = None
+        self._loaded_at = 0.0
+
+    def get(self, db: Session) -> int:
+        """Versión en memoria si está vigente; si no, la lee de la base."""
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._version
+        version = read_catalog_version(db)
+        with self._lock:
+            self._version = version
+            self._loaded_at = time.monotonic()
+        return version
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+
+catalog_version = CatalogVersionCache()
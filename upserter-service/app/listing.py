@@ -0,0 +1,81 @@
+import base64
+import hashlib
+import json
+from typing import Optional
+
+from sqlalchemy import select
+
+from .models import Products
+
+MAX_PAGE_SIZE = 1000
+
+# Columnas expuestas por /products, en el orden de la respuesta (mismas que ProductOut)
+PRODUCT_FIELDS = [
+    "product_id", "sku", "name", "description", "category", "manufacturer",
+    "storage_type", "expiration_date", "batch_number", "unit_price", "created_at",
+]
+
+
+def parse_fields(fields: Optional[str]) -> list:
+    """`fields=sku,name` -> ["sku", "name"]. Sin valor devuelve todas las columnas."""
+    if not fields:
+        return list(PRODUCT_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in PRODUCT_FIELDS]
+    if unknown or not requested:
+        raise ValueError(f"Campos inválidos: {unknown}. Opciones: {PRODUCT_FIELDS}")
+    return list(dict.fromkeys(requested))
+
+
+def encode_cursor(product_id: int) -> str:
+    """Cursor de GET /products: product_id del último producto del catálogo entregado."""
+    raw = json.dumps({"after": product_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """product_id de products desde el que continúa el catálogo; ValueError si el cursor no es válido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(after, int):
+        raise ValueError("Cursor inválido")
+    return after
+
+
+def products_select(fields: list, after: Optional[int] = None):
+    """
+    SELECT de solo las columnas pedidas (más product_id como clave del
+    cursor, siempre en la última posición), ordenado por product_id.
+    """
+    table = Products.__table__
+    stmt = select(*[table.c[f] for f in fields], table.c.product_id.label("_cursor_key"))
+    if after is not None:
+        stmt = stmt.where(table.c.product_id > after)
+    return stmt.order_by(table.c.product_id)
+
+
+def format_product(fields: list, row) -> dict:
+    product = dict(zip(fields, row))
+    if product.get("unit_price") is not None:
+        product["unit_price"] = float(product["unit_price"])
+    return product
+
+
+def make_etag(version: int, query: str) -> str:
+    """ETag de una página: versión del catálogo + parámetros de la consulta."""
+    digest = hashlib.sha1(query.encode()).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match puede traer varias etiquetas, débiles (W/). `*` solo tiene
+    sentido en escrituras condicionales: en un GET no produce 304.
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in tags)
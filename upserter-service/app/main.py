@@ -1,11 +1,21 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from urllib.parse import urlencode
+from .catalog import catalog_version
 from .database import SessionLocal, engine
-from .models import Base, ProductStaging, Products
-from typing import List, Optional
-from pydantic import BaseModel
-from pydantic import ConfigDict
+from .listing import (
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    etag_matches,
+    format_product,
+    make_etag,
+    parse_fields,
+    products_select,
+)
+from .models import Base, ProductStaging, add_missing_indexes
+from .upserter import UPSERT_BATCH_SIZE, UPSERT_MODE_BATCH, UPSERT_MODES, upsert_valid_products
+from typing import Optional
 from datetime import datetime
 import os
 
@@ -73,6 +83,8 @@ app = FastAPI(title="Products Upserter Service")
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    # products_stg suele existir ya (la crea ingestion): agrega el índice parcial
+    add_missing_indexes(engine, [ProductStaging.__table__])
 
 # Dependencia de sesión
 def get_db():
@@ -82,79 +94,75 @@ def get_db():
     finally:
         db.close()
 
-# Schemas Pydantic
-class ProductOut(BaseModel):
-    product_id: int
-    sku: str
-    name: str
-    description: Optional[str] = None
-    category: Optional[str] = None
-    manufacturer: Optional[str] = None
-    storage_type: Optional[str] = None
-    # En el modelo es Date; Pydantic lo serializa sin problema
-    expiration_date: Optional[datetime] = None
-    batch_number: Optional[str] = None
-    unit_price: Optional[float] = None
-    created_at: datetime
-
-    # Pydantic v2
-    model_config = ConfigDict(from_attributes=True)
-
 # Healthcheck
 @app.get("/health")
 def health():
     return {"status": "UP", "timestamp": datetime.utcnow()}
 
 # Listar productos finales
-@app.get("/products", response_model=List[ProductOut])
+@app.get("/products")
 def list_products(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,  # p.ej. fields=sku,name,unit_price
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     _user=Depends(require_token),  # exige Bearer token
 ):
-    products = db.execute(select(Products)).scalars().all()
-    return products
-
-# Upserter: inserta productos validados en tabla final
+    """
+    Lista products por keyset sobre product_id (header X-Next-Cursor para la
+    página siguiente) con proyección de columnas. El ETag depende de la
+    versión del catálogo y de los parámetros: si el cliente ya tiene esa
+    versión se responde 304 sin consultar la base.
+
+    La versión se cachea por proceso durante CATALOG_VERSION_TTL_SECONDS
+    (2 s por defecto). El proceso que hace el upsert la invalida de
+    inmediato, pero con varios workers o réplicas los demás siguen sirviendo
+    el ETag anterior (y 304) hasta que vence ese TTL.
+    """
+    try:
+        columns = parse_fields(fields)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    etag = make_etag(catalog_version.get(db), urlencode(sorted(request.query_params.multi_items())))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    rows = db.execute(products_select(columns, after=after).limit(limit)).all()
+    response.headers["ETag"] = etag
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1][-1])
+    return [format_product(columns, row) for row in rows]
+
+# Upserter: inserta/actualiza productos validados en tabla final
 @app.post("/products/upsert")
 def upsert_products(
+    mode: str = Query(UPSERT_MODE_BATCH),  # batch | sql | incremental
+    batch_size: int = Query(UPSERT_BATCH_SIZE, ge=1, le=3000),
     db: Session = Depends(get_db),
     _user=Depends(require_token),  # exige Bearer token
 ):
-    # Buscar registros validados y no procesados
-    stg_products = db.execute(
-        select(ProductStaging).where(
-            ProductStaging.validation_status == "VALID",
-            ProductStaging.processed == False
-        )
-    ).scalars().all()
-
-    if not stg_products:
-        return {"message": "No hay productos para insertar"}
-
-    inserted_count = 0
-    for p in stg_products:
-        # Insertar en tabla final
-        new_product = Products(
-            sku=p.sku,
-            name=p.name,
-            description=p.description,
-            category=p.category,
-            manufacturer=p.manufacturer,
-            storage_type=p.storage_type,
-            expiration_date=p.expiration_date,
-            batch_number=p.batch_number,
-            unit_price=float(p.unit_price) if p.unit_price is not None else None
-        )
-        db.add(new_product)
-
-        # Marcar como procesado en staging
-        p.processed = True
-        p.updated_at = datetime.utcnow()
-
-        inserted_count += 1
-
-    db.commit()
-    return {"message": f"{inserted_count} productos insertados correctamente"}
+    if mode not in UPSERT_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo inválido: {mode}. Use uno de {', '.join(UPSERT_MODES)}")
+
+    counts = upsert_valid_products(db, mode=mode, batch_size=batch_size)
+    if counts["inserted"] or counts["updated"]:
+        # La próxima lectura de /products toma la versión nueva de la base
+        catalog_version.invalidate()
+    if not any(counts.values()):
+        return {"message": "No hay productos para insertar", **counts}
+
+    return {
+        "message": (
+            f"{counts['inserted']} productos insertados correctamente, "
+            f"{counts['updated']} actualizados, {counts['unchanged']} sin cambios"
+        ),
+        **counts,
+    }
 
 # Handler para Lambda con Mangum (opcional)
 try:
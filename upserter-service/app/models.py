@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, Numeric, String, Text, Boolean, Date, DECIMAL, DateTime, func
+from sqlalchemy import Column, Integer, Numeric, String, Text, Boolean, Date, DECIMAL, DateTime, Index, func, literal_column
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.dialects.postgresql import UUID
 
 Base = declarative_base()
@@ -35,6 +36,59 @@ class ProductStaging(Base):
     processed = Column(Boolean, default=False) 
 
 
+def pending_upsert_filter():
+    """
+    VALID y no procesados. Con literales (no parámetros) para que SQLite y
+    Postgres puedan usar el índice parcial ix_products_stg_pending_upsert.
+    """
+    return (ProductStaging.validation_status == literal_column("'VALID'")) & ProductStaging.processed.is_(False)
+
+
+# Índice parcial: solo contiene las filas pendientes de upsert, así el
+# upserter lee el delta sin recorrer el histórico de products_stg
+Index(
+    "ix_products_stg_pending_upsert",
+    ProductStaging.validated_at,
+    ProductStaging.product_id,
+    postgresql_where=pending_upsert_filter(),
+    sqlite_where=pending_upsert_filter(),
+)
+
+
+def dialect_insert(bind):
+    """insert() con ON CONFLICT del motor de `bind` (Postgres o SQLite)."""
+    if bind.dialect.name == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
+
+
+def ensure_row(db, model, **values):
+    """
+    Crea la fila si no existe (INSERT ... ON CONFLICT DO NOTHING, en SQLite
+    INSERT OR IGNORE): dos procesos que arrancan a la vez no chocan por la PK.
+    No hace commit.
+    """
+    db.execute(dialect_insert(db.get_bind())(model.__table__).values(**values).on_conflict_do_nothing())
+
+
+class UpsertWatermark(Base):
+    """Marca de agua del upsert incremental: último validated_at ya pasado a products."""
+    __tablename__ = "upsert_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    last_validated_at = Column(DateTime)
+    last_product_id = Column(Integer)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class CatalogVersion(Base):
+    """Contador de versión del catálogo; lo incrementa cada upsert con cambios."""
+    __tablename__ = "catalog_versions"
+
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
 class Products(Base):
     __tablename__ = "products"
 
@@ -49,3 +103,15 @@ class Products(Base):
     batch_number = Column(String(50))
     unit_price = Column(DECIMAL(12,2))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+def add_missing_indexes(bind, tables=None):
+    """
+    Índice parcial de pendientes de upsert sobre products_stg, que crea
+    ingestion-service: aquí la tabla casi siempre existe ya y create_all no
+    le agrega índices.
+    """
+    tables = tables or Base.metadata.sorted_tables
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
@@ -1,39 +1,205 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.dialects.postgresql import insert
+"""
+Motor de upsert products_stg -> products.
+
+Tres modos, todos con `INSERT ... ON CONFLICT (sku) DO UPDATE` y marcando
+las filas de staging como procesadas en la misma transacción:
+
+- "batch": lee los VALID no procesados por keyset y envía un INSERT
+  multi-fila por lote de `batch_size` (una transacción por lote).
+- "sql": un único `INSERT INTO products SELECT ... FROM products_stg`
+  ejecutado dentro de la base, sin traer filas a Python.
+- "incremental": como "batch", pero lee las filas pendientes en orden de
+  validated_at desde el índice parcial (solo contiene pendientes, así no
+  recorre el histórico) y registra en upsert_watermarks hasta dónde llegó;
+  pensado para correr cada pocos segundos.
+
+Las filas cuyo contenido no cambió no se reescriben (cláusula WHERE del
+DO UPDATE), así se distingue insertados / actualizados / sin cambios. Si
+hubo cambios se incrementa la versión del catálogo en la misma transacción.
+"""
 from datetime import datetime
-from .models import ProductsStg, Products
-
-def upsert_valid_products(db: Session, processed_by="upserter_service"):
-
-    products_to_insert = db.query(ProductsStg).filter(
-        ProductsStg.validation_status == "VALID",
-        ProductsStg.processed_at.is_(None)
-    ).all()
-
-    if not products_to_insert:
-        return {"message": "No hay productos nuevos para insertar."}
-
-    for prod_stg in products_to_insert:
-        stmt = insert(Products).values(
-            sku=prod_stg.sku,
-            name=prod_stg.name,
-            description=prod_stg.description,
-            category=prod_stg.category,
-            manufacturer=prod_stg.manufacturer,
-            storage_type=prod_stg.storage_type,
-            expiration_date=prod_stg.expiration_date,
-            batch_number=prod_stg.batch_number,
-            unit_price=prod_stg.unit_price,
-            created_at=datetime.utcnow()
-        ).on_conflict_do_nothing(
-            index_elements=['sku']  # evita duplicados
+import os
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from .catalog import bump_catalog_version
+from .models import ProductStaging, Products, UpsertWatermark, dialect_insert, ensure_row, pending_upsert_filter
+
+UPSERT_MODE_BATCH = "batch"
+UPSERT_MODE_SQL = "sql"
+UPSERT_MODE_INCREMENTAL = "incremental"
+UPSERT_MODES = (UPSERT_MODE_BATCH, UPSERT_MODE_SQL, UPSERT_MODE_INCREMENTAL)
+
+# Filas por INSERT multi-fila (9 columnas por fila: 1000 filas = 9000 parámetros;
+# el endpoint acepta hasta 3000 por el límite de ~32k parámetros de SQLite)
+UPSERT_BATCH_SIZE = int(os.environ.get("UPSERT_BATCH_SIZE", "1000"))
+WATERMARK_NAME = "products"
+
+# Columnas que se copian de staging al catálogo final
+PRODUCT_COLUMNS = [
+    "sku", "name", "description", "category", "manufacturer",
+    "storage_type", "expiration_date", "batch_number", "unit_price",
+]
+# Columnas que se actualizan cuando el SKU ya existe
+UPDATE_COLUMNS = [c for c in PRODUCT_COLUMNS if c != "sku"]
+
+
+def _on_conflict_update(stmt):
+    """DO UPDATE solo si alguna columna cambió; las filas iguales no cuentan en rowcount."""
+    products = Products.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=["sku"],
+        set_={c: stmt.excluded[c] for c in UPDATE_COLUMNS},
+        where=or_(*[products.c[c].is_distinct_from(stmt.excluded[c]) for c in UPDATE_COLUMNS]),
+    )
+
+
+def _mark_processed(db: Session, *criteria, now: datetime):
+    stg = ProductStaging.__table__
+    db.execute(update(stg).where(*criteria).values(processed=True, updated_at=now))
+
+
+def _add_counts(counts: dict, batch: dict):
+    for key, value in batch.items():
+        counts[key] += value
+
+
+def _upsert_rows(db: Session, rows) -> dict:
+    """
+    INSERT multi-fila ON CONFLICT de `rows` (product_id + PRODUCT_COLUMNS) y
+    UPDATE processed de sus filas de staging. No hace commit.
+    """
+    stg = ProductStaging.__table__
+    products = Products.__table__
+    values = [{c: getattr(row, c) for c in PRODUCT_COLUMNS} for row in rows]
+    existing = db.execute(
+        select(func.count()).select_from(products).where(products.c.sku.in_([v["sku"] for v in values]))
+    ).scalar()
+
+    # executemany + RETURNING: SQLAlchemy lo envía como INSERT multi-fila
+    # (insertmanyvalues) con el SQL compilado en caché; RETURNING solo trae
+    # las filas insertadas o actualizadas (las sin cambios no pasan el WHERE)
+    stmt = _on_conflict_update(dialect_insert(db.get_bind())(products)).returning(products.c.product_id)
+    affected = len(db.execute(stmt, values).all())
+    if affected:
+        bump_catalog_version(db)
+    _mark_processed(db, stg.c.product_id.in_([row.product_id for row in rows]), now=datetime.utcnow())
+
+    inserted = len(rows) - existing
+    return {"inserted": inserted, "updated": affected - inserted, "unchanged": existing - (affected - inserted)}
+
+
+def _upsert_batches(db: Session, batch_size: int):
+    stg = ProductStaging.__table__
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    last_id = None
+
+    while True:
+        stmt = (
+            select(stg.c.product_id, *[stg.c[c] for c in PRODUCT_COLUMNS])
+            .where(pending_upsert_filter())
+            .order_by(stg.c.product_id)
+            .limit(batch_size)
         )
-        db.execute(stmt)
+        if last_id is not None:
+            stmt = stmt.where(stg.c.product_id > last_id)
+        rows = db.execute(stmt).all()
+        if not rows:
+            break
+
+        _add_counts(counts, _upsert_rows(db, rows))
+        db.commit()
+        last_id = rows[-1].product_id
+
+    return counts
+
+
+def get_watermark(db: Session) -> UpsertWatermark:
+    """Fila de la marca de agua, creada si falta y bloqueada (FOR UPDATE) hasta el commit."""
+    ensure_row(db, UpsertWatermark, name=WATERMARK_NAME)
+    return (
+        db.query(UpsertWatermark)
+        .filter(UpsertWatermark.name == WATERMARK_NAME)
+        .with_for_update()
+        .one()
+    )
+
+
+def _upsert_incremental(db: Session, batch_size: int):
+    """
+    Solo el delta: filas pendientes en orden (validated_at, product_id) sobre
+    el índice parcial, que ya se limita a las pendientes. No se filtra por
+    validated_at >= marca de agua: validated_at es la hora en que el
+    validador empezó su chunk, no la de su commit, y una transacción que
+    confirme tarde quedaría detrás de la marca para siempre. La marca de
+    agua registra el último validated_at pasado a products y avanza en la
+    misma transacción que cada lote.
+    """
+    stg = ProductStaging.__table__
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
 
-        # Marcamos staging como procesado
-        prod_stg.processed_at = datetime.utcnow()
-        prod_stg.processed_by = processed_by
+    while True:
+        watermark = get_watermark(db)
+        rows = db.execute(
+            select(stg.c.product_id, stg.c.validated_at, *[stg.c[c] for c in PRODUCT_COLUMNS])
+            .where(pending_upsert_filter())
+            .order_by(stg.c.validated_at, stg.c.product_id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        _add_counts(counts, _upsert_rows(db, rows))
+        validated = [row for row in rows if row.validated_at is not None]
+        last = max(validated, key=lambda row: (row.validated_at, row.product_id), default=None)
+        if last is not None and (watermark.last_validated_at is None or last.validated_at > watermark.last_validated_at):
+            watermark.last_validated_at = last.validated_at
+            watermark.last_product_id = last.product_id
+        db.commit()
 
     db.commit()
-    return {"message": f"UPSERT completado: {len(products_to_insert)} productos procesados."}
+    return counts
+
+
+def _upsert_insert_select(db: Session):
+    stg = ProductStaging.__table__
+    products = Products.__table__
+    insert = dialect_insert(db.get_bind())
+
+    # Acota el conjunto al product_id máximo al inicio (filas nuevas quedan para la próxima corrida)
+    high = db.execute(select(func.max(stg.c.product_id)).where(pending_upsert_filter())).scalar()
+    if high is None:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+    pending = (pending_upsert_filter(), stg.c.product_id <= high)
+
+    total, existing = db.execute(
+        select(func.count(), func.count(products.c.sku))
+        .select_from(stg.outerjoin(products, products.c.sku == stg.c.sku))
+        .where(*pending)
+    ).one()
+
+    source = select(*[stg.c[c] for c in PRODUCT_COLUMNS]).where(*pending)
+    affected = db.execute(_on_conflict_update(insert(products).from_select(PRODUCT_COLUMNS, source))).rowcount
+    if affected:
+        bump_catalog_version(db)
+    _mark_processed(db, *pending, now=datetime.utcnow())
+    db.commit()
+
+    inserted = total - existing
+    return {"inserted": inserted, "updated": affected - inserted, "unchanged": existing - (affected - inserted)}
+
 
+def upsert_valid_products(db: Session, mode: str = UPSERT_MODE_BATCH, batch_size: int = UPSERT_BATCH_SIZE) -> dict:
+    """
+    Pasa los productos VALID no procesados de products_stg a products
+    (insertando SKUs nuevos y actualizando los existentes) y los marca
+    processed. Devuelve {"inserted", "updated", "unchanged"}.
+    """
+    if mode not in UPSERT_MODES:
+        raise ValueError(f"Modo inválido: {mode}. Use uno de {', '.join(UPSERT_MODES)}")
+    if mode == UPSERT_MODE_SQL:
+        return _upsert_insert_select(db)
+    if mode == UPSERT_MODE_INCREMENTAL:
+        return _upsert_incremental(db, batch_size)
+    return _upsert_batches(db, batch_size)
@@ -0,0 +1,69 @@
+import pytest
+
+from app.catalog import catalog_version, read_catalog_version
+from app.models import Products
+
+from tests.test_products_upsert import make_staging
+
+
+@pytest.fixture(autouse=True)
+def fresh_catalog_version():
+    # La versión en memoria es global del proceso
+    catalog_version.invalidate()
+    yield
+    catalog_version.invalidate()
+
+
+@pytest.fixture
+def products(db_session):
+    db_session.add_all([Products(sku=f"CAT-{i}", name=f"P{i}", unit_price=i + 0.5) for i in range(5)])
+    db_session.commit()
+
+
+def test_products_keyset_pagination_and_projection(client, products):
+    r1 = client.get("/products?limit=3&fields=sku,unit_price")
+    assert r1.status_code == 200
+    assert r1.json() == [{"sku": f"CAT-{i}", "unit_price": i + 0.5} for i in range(3)]
+
+    r2 = client.get(f"/products?limit=3&fields=sku&cursor={r1.headers['X-Next-Cursor']}")
+    assert r2.json() == [{"sku": "CAT-3"}, {"sku": "CAT-4"}]
+    assert "X-Next-Cursor" not in r2.headers
+
+
+def test_products_invalid_fields_and_cursor(client):
+    assert client.get("/products?fields=precio").status_code == 400
+    assert client.get("/products?cursor=xyz").status_code == 400
+
+
+def test_products_etag_304_without_database(client, db_session, products, monkeypatch):
+    r1 = client.get("/products?limit=2")
+    etag = r1.headers["ETag"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("no debe consultar la base")
+
+    monkeypatch.setattr(db_session, "execute", fail)
+    r2 = client.get("/products?limit=2", headers={"If-None-Match": etag})
+    assert r2.status_code == 304
+    assert r2.headers["ETag"] == etag
+
+    # Otra página/proyección tiene otro ETag
+    monkeypatch.undo()
+    assert client.get("/products?limit=3", headers={"If-None-Match": etag}).status_code == 200
+    # `*` no aplica a lecturas: se devuelve el cuerpo
+    assert client.get("/products?limit=2", headers={"If-None-Match": "*"}).status_code == 200
+
+
+def test_upsert_bumps_catalog_version(client, db_session):
+    etag = client.get("/products").headers["ETag"]
+    version = read_catalog_version(db_session)
+
+    db_session.add(make_staging("CAT-NEW"))
+    db_session.commit()
+    assert client.post("/products/upsert").status_code == 200
+    assert read_catalog_version(db_session) == version + 1
+
+    r = client.get("/products", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert [p["sku"] for p in r.json()] == ["CAT-NEW"]
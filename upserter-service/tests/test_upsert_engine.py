@@ -0,0 +1,122 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+
+from app.catalog import bump_catalog_version, read_catalog_version
+from app.models import CatalogVersion, ProductStaging, Products, UpsertWatermark, pending_upsert_filter
+from app.upserter import UPSERT_MODE_INCREMENTAL, UPSERT_MODES, get_watermark, upsert_valid_products
+
+from tests.test_products_upsert import make_staging
+
+
+def _product(sku, unit_price, expiration_date):
+    return Products(sku=sku, name="Producto", description="desc", category="categoria_a", manufacturer="manu",
+                    storage_type="cold", expiration_date=expiration_date, batch_number="B1", unit_price=unit_price)
+
+
+def _seed_existing(db_session):
+    # Catálogo previo: ACT-1 cambia de precio, IGU-1 llega igual
+    expiration = date.today() + timedelta(days=10)
+    db_session.add_all([_product("ACT-1", 1, expiration), _product("IGU-1", 10, expiration)])
+    staged = [
+        make_staging("NEW-1"),
+        make_staging("NEW-2"),
+        make_staging("ACT-1", unit_price=99, expiration_date=expiration),
+        make_staging("IGU-1", unit_price=10, expiration_date=expiration),
+    ]
+    for i, p in enumerate(staged):
+        p.validated_at = datetime(2026, 1, 1, 12, 0, i)
+    db_session.add_all(staged)
+    db_session.commit()
+
+
+@pytest.mark.parametrize("mode", UPSERT_MODES)
+def test_upsert_reports_inserted_updated_unchanged(db_session, mode):
+    _seed_existing(db_session)
+
+    counts = upsert_valid_products(db_session, mode=mode, batch_size=3)
+    assert counts == {"inserted": 2, "updated": 1, "unchanged": 1}
+
+    assert float(db_session.query(Products).filter_by(sku="ACT-1").one().unit_price) == 99
+    assert db_session.query(Products).count() == 4
+    assert db_session.query(ProductStaging).filter(ProductStaging.processed == False).count() == 0  # noqa: E712
+
+    # Segunda corrida: nada pendiente
+    assert upsert_valid_products(db_session, mode=mode) == {"inserted": 0, "updated": 0, "unchanged": 0}
+
+
+def test_upsert_endpoint_updates_existing_sku(client, db_session):
+    _seed_existing(db_session)
+
+    r = client.post("/products/upsert?mode=sql")
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["inserted"], body["updated"], body["unchanged"]) == (2, 1, 1)
+    assert body["message"].startswith("2 productos insertados correctamente")
+
+
+def test_upsert_endpoint_invalid_mode(client):
+    assert client.post("/products/upsert?mode=orm").status_code == 400
+
+
+def _validated(sku, validated_at):
+    p = make_staging(sku)
+    p.validated_at = validated_at
+    return p
+
+
+def test_incremental_picks_up_rows_behind_watermark(db_session):
+    t0 = datetime(2026, 1, 1, 12, 0, 0)
+    db_session.add_all([_validated("INC-1", t0), _validated("INC-2", t0 + timedelta(seconds=5))])
+    db_session.commit()
+
+    assert upsert_valid_products(db_session, mode=UPSERT_MODE_INCREMENTAL)["inserted"] == 2
+    watermark = db_session.get(UpsertWatermark, "products")
+    assert watermark.last_validated_at == t0 + timedelta(seconds=5)
+
+    # Chunks del validador que confirmaron tarde (validated_at muy anterior a
+    # la marca de agua) también se recogen: el índice parcial acota el delta
+    db_session.add_all([
+        _validated("INC-LATE", t0 + timedelta(seconds=1)),
+        _validated("INC-OLD", t0 - timedelta(hours=1)),
+        _validated("INC-3", t0 + timedelta(seconds=30)),
+    ])
+    db_session.commit()
+
+    assert upsert_valid_products(db_session, mode=UPSERT_MODE_INCREMENTAL)["inserted"] == 3
+    assert {p.sku for p in db_session.query(Products)} == {"INC-1", "INC-2", "INC-LATE", "INC-OLD", "INC-3"}
+    assert db_session.get(UpsertWatermark, "products").last_validated_at == t0 + timedelta(seconds=30)
+    assert upsert_valid_products(db_session, mode="batch")["inserted"] == 0
+
+
+def test_counter_rows_seeded_without_pk_race(db_session, monkeypatch):
+    # Otro proceso ya creó ambas filas entre nuestra lectura y nuestro INSERT
+    db_session.add_all([UpsertWatermark(name="products"), CatalogVersion(name="products", version=7)])
+    db_session.flush()
+
+    ejecutadas = []
+    execute = db_session.execute
+
+    def capturar(stmt, *args, **kwargs):
+        ejecutadas.append(stmt)
+        return execute(stmt, *args, **kwargs)
+
+    monkeypatch.setattr(db_session, "execute", capturar)
+    assert get_watermark(db_session).name == "products"
+    bump_catalog_version(db_session)
+    assert read_catalog_version(db_session) == 8
+
+    inserts = [str(stmt.compile(dialect=postgresql.dialect())) for stmt in ejecutadas
+               if str(stmt).startswith("INSERT")]
+    assert len(inserts) == 2
+    assert all(sql.rstrip().endswith("ON CONFLICT DO NOTHING") for sql in inserts)
+
+
+def test_pending_rows_use_partial_index(db_session):
+    stg = ProductStaging.__table__
+    stmt = select(stg.c.product_id).where(pending_upsert_filter()).order_by(stg.c.validated_at, stg.c.product_id)
+    sql = str(stmt.compile(dialect=db_session.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+    plan = " ".join(str(row) for row in db_session.execute(text("EXPLAIN QUERY PLAN " + sql)))
+    assert "ix_products_stg_pending_upsert" in plan
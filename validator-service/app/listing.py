@@ -0,0 +1,108 @@
+import base64
+import datetime
+import json
+import os
+from typing import Iterator, Optional
+
+from sqlalchemy import func, select
+
+from .models import ProductStagingErrors
+
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "2000"))
+
+ERROR_FIELDS = ["error_id", "sku", "import_id", "error_message", "created_at"]
+
+
+def encode_cursor(error_id: int) -> str:
+    """Cursor de GET /errors: error_id del último error entregado."""
+    raw = json.dumps({"after": error_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """error_id a partir del cual sigue la página de errores; ValueError si el cursor no es válido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        after = json.loads(base64.urlsafe_b64decode(padded.encode()))["after"]
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(after, int):
+        raise ValueError("Cursor inválido")
+    return after
+
+
+def _filtered(stmt, import_id=None, sku=None, created_from=None, created_to=None):
+    table = ProductStagingErrors.__table__
+    if import_id is not None:
+        stmt = stmt.where(table.c.import_id == import_id)
+    if sku is not None:
+        stmt = stmt.where(table.c.sku == sku)
+    if created_from is not None:
+        stmt = stmt.where(table.c.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(table.c.created_at < created_to)
+    return stmt
+
+
+def errors_select(
+    import_id: Optional[str] = None,
+    sku: Optional[str] = None,
+    created_from: Optional[datetime.datetime] = None,
+    created_to: Optional[datetime.datetime] = None,
+    after: Optional[int] = None,
+):
+    """
+    SELECT de products_stg_errors filtrado y ordenado por error_id para
+    paginar por keyset (`after` = último error_id de la página anterior).
+    El rango de fechas es [created_from, created_to).
+    """
+    table = ProductStagingErrors.__table__
+    stmt = _filtered(
+        select(*[table.c[f] for f in ERROR_FIELDS]),
+        import_id=import_id, sku=sku, created_from=created_from, created_to=created_to,
+    )
+    if after is not None:
+        stmt = stmt.where(table.c.error_id > after)
+    return stmt.order_by(table.c.error_id)
+
+
+def count_select(**filters):
+    """COUNT(*) de products_stg_errors con los mismos filtros (sin cursor)."""
+    return _filtered(select(func.count()).select_from(ProductStagingErrors.__table__), **filters)
+
+
+def summary_select(**filters):
+    """Conteo de errores por error_message (GROUP BY en la base), de mayor a menor."""
+    table = ProductStagingErrors.__table__
+    total = func.count().label("total")
+    stmt = _filtered(select(table.c.error_message, total), **filters)
+    return stmt.group_by(table.c.error_message).order_by(total.desc(), table.c.error_message)
+
+
+def format_error(row) -> dict:
+    error = dict(zip(ERROR_FIELDS, row))
+    error["import_id"] = str(error["import_id"])
+    return error
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+
+def iter_ndjson(db, stmt) -> Iterator[bytes]:
+    """
+    Recorre `stmt` con un cursor del lado del servidor (yield_per) y emite un
+    bloque NDJSON por cada lote de EXPORT_BATCH_SIZE filas.
+    """
+    result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    try:
+        for partition in result.partitions():
+            yield "".join(
+                json.dumps(format_error(row), default=_json_default, separators=(",", ":")) + "\n"
+                for row in partition
+            ).encode()
+    finally:
+        result.close()
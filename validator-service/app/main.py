@@ -1,10 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from .models import Base, ProductStaging, ProductStagingErrors
-from .validator import process_pending_products
+from .listing import (
+    MAX_PAGE_SIZE,
+    count_select,
+    decode_cursor,
+    encode_cursor,
+    errors_select,
+    format_error,
+    iter_ndjson,
+    summary_select,
+)
+from .models import Base, ProductStagingErrors, add_missing_indexes
+from .validator import (
+    VALIDATION_CHUNK_SIZE,
+    VALIDATION_MAX_WORKERS,
+    VALIDATION_MODE_CHUNKED,
+    VALIDATION_MODE_PUSHDOWN,
+    VALIDATION_MODES,
+    process_pending_products,
+    process_pending_products_parallel,
+    process_pending_products_pushdown,
+)
 from .database import SessionLocal, engine
 import os
 from datetime import datetime
+from typing import Optional
 
 # =========================
 #  Auth mínima por header
@@ -69,6 +90,8 @@ app = FastAPI(title="Validator Definitivo")
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    # create_all no agrega índices nuevos a tablas existentes
+    add_missing_indexes(engine, [ProductStagingErrors.__table__])
 
 def get_db():
     db = SessionLocal()
@@ -79,22 +102,33 @@ def get_db():
 
 @app.post("/validate")
 def validate_all(
+    chunk_size: int = Query(VALIDATION_CHUNK_SIZE, ge=1),
+    workers: int = Query(1, ge=1, le=VALIDATION_MAX_WORKERS),
+    mode: str = Query(VALIDATION_MODE_CHUNKED),
+    import_id: Optional[str] = None,  # solo filas de esa importación (pipeline de ingestion)
     db: Session = Depends(get_db),
     _user=Depends(require_token),
 ):
-    pending_products = (
-        db.query(ProductStaging)
-        .filter(ProductStaging.validation_status == "PENDING")
-        .all()
-    )
-    total_pendientes = len(pending_products)
-
-    total_validados, total_invalidos, total_errores = process_pending_products(db)
+    if mode not in VALIDATION_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo inválido: {mode}. Use uno de {', '.join(VALIDATION_MODES)}")
+
+    if mode == VALIDATION_MODE_PUSHDOWN:
+        # Todas las reglas se evalúan en la base de datos (INSERT ... SELECT + UPDATE)
+        total_validados, total_invalidos, total_errores = process_pending_products_pushdown(db, import_id=import_id)
+    elif workers > 1:
+        # Cada worker abre su propia sesión y reclama chunks con SKIP LOCKED
+        total_validados, total_invalidos, total_errores = process_pending_products_parallel(
+            SessionLocal, workers, chunk_size, import_id=import_id
+        )
+    else:
+        total_validados, total_invalidos, total_errores = process_pending_products(
+            db, chunk_size, import_id=import_id
+        )
 
     return {
         "estado": "validación completada",
         "resumen": {
-            "total_pendientes": total_pendientes,
+            "total_pendientes": total_validados + total_invalidos,
             "total_validados": total_validados,
             "total_invalidos": total_invalidos,
             "total_errores": total_errores,
@@ -104,23 +138,87 @@ def validate_all(
 
 @app.get("/errors")
 def list_errors(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    import_id: Optional[str] = None,
+    sku: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
     db: Session = Depends(get_db),
     _user=Depends(require_token),
 ):
-    errores = db.query(ProductStagingErrors).all()
+    """
+    Lista products_stg_errors por keyset sobre error_id, con filtros por
+    import_id, sku y rango de created_at [created_from, created_to).
+
+    Devuelve páginas de `limit` errores (100 por defecto, máximo
+    MAX_PAGE_SIZE): `total` es el total de errores que cumplen los filtros,
+    `count` los de esta página y `next_cursor` (también en el header
+    X-Next-Cursor) el cursor de la página siguiente, null en la última.
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filters = dict(import_id=import_id, sku=sku, created_from=created_from, created_to=created_to)
+    rows = db.execute(errors_select(after=after, **filters).limit(limit)).all()
+    next_cursor = encode_cursor(rows[-1].error_id) if len(rows) == limit else None
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
     return {
-        "total": len(errores),
-        "errores": [
-            {
-                "sku": e.sku,
-                "import_id": str(e.import_id),
-                "error_message": e.error_message,
-                "created_at": e.created_at,
-            }
-            for e in errores
-        ],
+        "total": db.execute(count_select(**filters)).scalar_one(),
+        "count": len(rows),
+        "next_cursor": next_cursor,
+        "errores": [format_error(row) for row in rows],
     }
 
+@app.get("/errors/summary")
+def summarize_errors(
+    import_id: Optional[str] = None,
+    sku: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    _user=Depends(require_token),
+):
+    """Conteo de errores agrupado por error_message (mismos filtros que /errors)."""
+    rows = db.execute(
+        summary_select(import_id=import_id, sku=sku, created_from=created_from, created_to=created_to)
+    ).all()
+    return {
+        "total": sum(row.total for row in rows),
+        "por_mensaje": [{"error_message": row.error_message, "total": row.total} for row in rows],
+    }
+
+@app.get("/errors/export")
+def export_errors(
+    import_id: Optional[str] = None,
+    sku: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    _user=Depends(require_token),
+):
+    """Volcado completo (filtrado) de products_stg_errors como NDJSON en streaming."""
+    stmt = errors_select(import_id=import_id, sku=sku, created_from=created_from, created_to=created_to)
+
+    def body():
+        # StreamingResponse consume el NDJSON después de que get_db terminó;
+        # el cierre queda a cargo del generador
+        try:
+            yield from iter_ndjson(db, stmt)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        body(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="errors.ndjson"'},
+    )
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
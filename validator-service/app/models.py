@@ -1,8 +1,32 @@
-from sqlalchemy import Column, Integer, Numeric, String, Text, Boolean, DECIMAL, Date, TIMESTAMP
+from sqlalchemy import Column, Integer, Numeric, String, Text, Boolean, DECIMAL, Date, TIMESTAMP, Index
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.types import TypeDecorator
 from .database import Base
 
 import datetime
 
+
+class GUID(TypeDecorator):
+    """
+    import_id de products_stg: ingestion-service crea la columna como UUID
+    nativo en Postgres (CHAR(36) en SQLite). Se compara como uuid y se
+    devuelve como texto, igual que en el resto del validador.
+    """
+    impl = String(36)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(PG_UUID(as_uuid=False))
+        return dialect.type_descriptor(String(36))
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else str(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else str(value)
+
+
 class ProductStaging(Base):
     __tablename__ = "products_stg"
 
@@ -24,7 +48,7 @@ class ProductStaging(Base):
     purchase_conditions = Column(Text)
     delivery_time_hours = Column(Integer)
     external_code = Column(String(100))
-    import_id = Column(String(36), nullable=False)
+    import_id = Column(GUID(), nullable=False)
     created_at = Column(TIMESTAMP, default=datetime.datetime.utcnow)
     updated_at = Column(TIMESTAMP, default=datetime.datetime.utcnow)
     created_by = Column(String(50))
@@ -36,6 +60,13 @@ class ProductStaging(Base):
 
 class ProductStagingErrors(Base):
     __tablename__ = "products_stg_errors"
+    # Soportan los filtros + keyset de /errors y el GROUP BY de /errors/summary
+    __table_args__ = (
+        Index("ix_products_stg_errors_import_error_id", "import_id", "error_id"),
+        Index("ix_products_stg_errors_sku_error_id", "sku", "error_id"),
+        Index("ix_products_stg_errors_created_error_id", "created_at", "error_id"),
+        Index("ix_products_stg_errors_import_message", "import_id", "error_message"),
+    )
 
     error_id = Column(Integer, primary_key=True)
     sku = Column(String(50))
@@ -44,5 +75,12 @@ class ProductStagingErrors(Base):
     created_at = Column(TIMESTAMP, default=datetime.datetime.utcnow)
 
 
-
-
+def add_missing_indexes(bind, tables=None):
+    """
+    Índices de products_stg_errors (import_id, sku y created_at con
+    error_id) que usa GET /errors cuando la tabla ya existía sin ellos.
+    """
+    tables = tables or Base.metadata.sorted_tables
+    for table in tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
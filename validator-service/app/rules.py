@@ -0,0 +1,248 @@
+"""
+Motor de reglas de validación por columnas.
+
+Las reglas se declaran una vez en un RuleRegistry y se compilan a un
+evaluador que recibe un lote de productos como DataFrame y devuelve una
+matriz booleana de errores (filas x reglas) calculada con máscaras de
+pandas/NumPy, sin recorrer las filas en Python.
+
+Cada regla puede declarar además su predicado SQL equivalente; con eso el
+modo "pushdown" del validador evalúa todo dentro de la base de datos.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Callable, List, Optional
+
+from sqlalchemy import String, and_, func, or_
+
+import numpy as np
+import pandas as pd
+
+# Columnas de products_stg que necesitan las reglas
+RULE_COLUMNS = [
+    "product_id", "sku", "name", "category", "import_id", "expiration_date",
+    "min_shelf_life_months", "cold_chain_required", "storage_type", "unit_price",
+]
+
+
+class LoweredCodes:
+    """
+    Columna de baja cardinalidad (categoría, almacenamiento) en minúsculas,
+    guardada como códigos enteros + valores distintos. Las comparaciones se
+    resuelven sobre los valores distintos y se expanden por código, así una
+    regla por categoría cuesta un indexado entero por fila y no una
+    comparación de strings.
+    """
+
+    def __init__(self, values: pd.Series):
+        self.index = values.index
+        self.codes, uniques = pd.factorize(values)
+        lowered = np.asarray(pd.Index(uniques, dtype=object).str.lower(), dtype=object)
+        # Código -1 (nulo) apunta al None añadido al final
+        self.uniques = np.append(lowered, None)
+
+    def isin(self, values) -> pd.Series:
+        hits = np.append(np.isin(self.uniques[:-1], list(values)), False)
+        return pd.Series(hits[self.codes], index=self.index)
+
+    def __eq__(self, value) -> pd.Series:
+        return self.isin([value])
+
+    __hash__ = None
+
+    def to_series(self) -> pd.Series:
+        return pd.Series(self.uniques[self.codes], index=self.index, dtype=object)
+
+
+def _to_float(values: pd.Series) -> pd.Series:
+    """Decimal/int/None -> float64 (NaN para nulos); to_numeric solo si hay texto."""
+    try:
+        return values.astype("float64")
+    except (TypeError, ValueError):
+        return pd.to_numeric(values, errors="coerce")
+
+
+class RuleBatch:
+    """
+    Vista columnar de un lote. Precalcula una sola vez lo que comparten las
+    reglas (categoría y almacenamiento en minúsculas, fechas, numéricos) y la
+    fecha de referencia `today`.
+    """
+
+    def __init__(self, frame: pd.DataFrame, today: date):
+        self.frame = frame
+        self.today = pd.Timestamp(today)
+        self.category = LoweredCodes(frame["category"])
+        self.storage_type = LoweredCodes(frame["storage_type"])
+        self.expiration_date = pd.to_datetime(frame["expiration_date"], errors="coerce")
+        self.min_shelf_life_months = _to_float(frame["min_shelf_life_months"])
+        self.unit_price = _to_float(frame["unit_price"])
+        self.cold_chain_required = frame["cold_chain_required"].fillna(False).astype(bool)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def missing(self, column: str) -> pd.Series:
+        """Equivalente vectorizado de `not valor` para columnas de texto."""
+        return self.frame[column].isin(["", None])
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    message: str
+    check: Callable[[RuleBatch], pd.Series]  # máscara True = la fila incumple
+    category: Optional[str] = None  # None = regla por defecto del grupo `name`
+    sql: Optional[Callable] = None  # (columnas, today) -> predicado SQL; True = incumple
+
+
+class CompiledRules:
+    """Reglas ya ordenadas y agrupadas; `evaluate` devuelve la matriz de errores."""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = list(rules)
+        self.messages = [rule.message for rule in self.rules]
+        # Categorías con variante propia por grupo: la regla por defecto no aplica a ellas
+        self._overridden = {}
+        for rule in self.rules:
+            if rule.category is not None:
+                self._overridden.setdefault(rule.name, set()).add(rule.category)
+
+    def evaluate(self, frame: pd.DataFrame, today: Optional[date] = None) -> np.ndarray:
+        """Matriz bool de forma (filas, reglas); [i, j] = la fila i incumple la regla j."""
+        batch = RuleBatch(frame, today or datetime.utcnow().date())
+        matrix = np.zeros((len(batch), len(self.rules)), dtype=bool)
+        for j, rule in enumerate(self.rules):
+            if rule.category is not None:
+                applies = batch.category == rule.category
+            elif rule.name in self._overridden:
+                applies = ~batch.category.isin(self._overridden[rule.name])
+            else:
+                applies = None
+            mask = rule.check(batch)
+            if applies is not None:
+                mask = mask & applies
+            matrix[:, j] = np.asarray(mask.fillna(False), dtype=bool)
+        return matrix
+
+    @property
+    def supports_sql(self) -> bool:
+        return all(rule.sql is not None for rule in self.rules)
+
+    def sql_predicates(self, table, today: date):
+        """
+        Lista de (regla, predicado SQL) con el mismo alcance por categoría que
+        `evaluate`. Requiere que todas las reglas declaren `sql`.
+        """
+        if not self.supports_sql:
+            missing = [rule.name for rule in self.rules if rule.sql is None]
+            raise ValueError(f"Reglas sin predicado SQL: {', '.join(missing)}")
+
+        category = func.lower(table.c.category)
+        predicates = []
+        for rule in self.rules:
+            predicate = rule.sql(table.c, today)
+            if rule.category is not None:
+                predicate = and_(category == rule.category, predicate)
+            elif rule.name in self._overridden:
+                overridden = sorted(self._overridden[rule.name])
+                predicate = and_(func.coalesce(category, "").notin_(overridden), predicate)
+            predicates.append((rule, predicate))
+        return predicates
+
+    def errors(self, matrix: np.ndarray):
+        """Pares (índice_fila, mensaje) en orden de fila y luego de regla."""
+        rows, cols = np.nonzero(matrix)
+        messages = np.asarray(self.messages, dtype=object)[cols]
+        return list(zip(rows.tolist(), messages.tolist()))
+
+
+class RuleRegistry:
+    def __init__(self):
+        self._rules: List[Rule] = []
+
+    def rule(self, name: str, message: str, category: Optional[str] = None, sql: Optional[Callable] = None):
+        """
+        Decorador para declarar una regla. Reglas con el mismo `name` y una
+        `category` reemplazan a la regla por defecto para esa categoría.
+        `sql` es el predicado equivalente para el modo pushdown.
+        """
+        def decorator(check):
+            self._rules.append(Rule(name, message, check, category.lower() if category else None, sql))
+            return check
+        return decorator
+
+    def compile(self) -> CompiledRules:
+        return CompiledRules(self._rules)
+
+
+def _sql_missing(column):
+    """
+    NULL o vacío. Solo las columnas de texto pueden estar vacías: import_id es
+    uuid en Postgres y compararlo con '' falla.
+    """
+    if isinstance(column.type, String):
+        return or_(column.is_(None), column == "")
+    return column.is_(None)
+
+
+def build_default_rules() -> RuleRegistry:
+    """Reglas de validación de products_stg (mismo orden y mensajes del validador original)."""
+    registry = RuleRegistry()
+
+    # 1. Campos obligatorios
+    for campo in ["sku", "name", "category", "import_id"]:
+        registry.rule(
+            f"required_{campo}",
+            f"Campo {campo} obligatorio",
+            sql=lambda c, today, campo=campo: _sql_missing(c[campo]),
+        )(lambda b, campo=campo: b.missing(campo))
+
+    # 2. Fecha de expiración
+    @registry.rule("expired", "Producto expirado", sql=lambda c, today: c.expiration_date < today)
+    def _expired(b):
+        return b.expiration_date < b.today
+
+    # 3. Vida útil mínima según categoría
+    @registry.rule(
+        "shelf_life",
+        "Producto no cumple mínimo de vida útil (24 meses)",
+        category="categoria_a",
+        sql=lambda c, today: c.min_shelf_life_months < 24,
+    )
+    def _shelf_life_categoria_a(b):
+        return b.min_shelf_life_months < 24
+
+    @registry.rule(
+        "shelf_life",
+        "Producto no cumple mínimo de vida útil (6 meses)",
+        sql=lambda c, today: c.min_shelf_life_months < 6,
+    )
+    def _shelf_life_default(b):
+        return b.min_shelf_life_months < 6
+
+    # 4. Cadena de frío
+    @registry.rule(
+        "cold_chain",
+        "Producto requiere cadena de frío pero almacenamiento no cumple",
+        sql=lambda c, today: and_(
+            c.cold_chain_required.is_(True),
+            func.coalesce(func.lower(c.storage_type), "").notin_(["cold", "refrigerated"]),
+        ),
+    )
+    def _cold_chain(b):
+        return b.cold_chain_required & ~b.storage_type.isin(["cold", "refrigerated"])
+
+    # 5. Precio unitario
+    @registry.rule(
+        "unit_price",
+        "Precio unitario inválido",
+        sql=lambda c, today: or_(c.unit_price.is_(None), c.unit_price < 0),
+    )
+    def _unit_price(b):
+        return b.unit_price.isna() | (b.unit_price < 0)
+
+    return registry
+
+
+DEFAULT_RULES = build_default_rules().compile()
@@ -1,72 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from sqlalchemy.orm import Session
+import os
+import pandas as pd
+from sqlalchemy import case, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
 from .models import ProductStaging, ProductStagingErrors
-from typing import List
+from .rules import DEFAULT_RULES, RULE_COLUMNS, CompiledRules
+from typing import Tuple
 
-def process_pending_products(db: Session):
+VALIDATION_MODE_CHUNKED = "chunked"
+VALIDATION_MODE_PUSHDOWN = "pushdown"
+VALIDATION_MODES = (VALIDATION_MODE_CHUNKED, VALIDATION_MODE_PUSHDOWN)
+# Filas PENDING que reclama cada chunk (una transacción por chunk)
+VALIDATION_CHUNK_SIZE = int(os.environ.get("VALIDATION_CHUNK_SIZE", "1000"))
+VALIDATION_MAX_WORKERS = int(os.environ.get("VALIDATION_MAX_WORKERS", "8"))
+
+
+def claim_pending_chunk(db: Session, chunk_size: int = VALIDATION_CHUNK_SIZE, import_id: str = None):
+    """
+    Reclama hasta `chunk_size` productos PENDING con SELECT ... FOR UPDATE
+    SKIP LOCKED: filas bloqueadas por otro worker se saltan en vez de
+    esperar, así varios validadores pueden correr a la vez sin procesar dos
+    veces la misma fila. (SQLite ignora el FOR UPDATE.) Devuelve solo las
+    columnas que usan las reglas, como filas (tuplas). Con `import_id` solo
+    reclama filas de esa importación.
+    """
+    table = ProductStaging.__table__
+    stmt = (
+        select(*[table.c[col] for col in RULE_COLUMNS])
+        .where(table.c.validation_status == "PENDING")
+        .order_by(table.c.product_id)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
+    )
+    if import_id is not None:
+        stmt = stmt.where(table.c.import_id == import_id)
+    return db.execute(stmt).all()
+
+
+def process_chunk(db: Session, rows, rules: CompiledRules = DEFAULT_RULES) -> Tuple[int, int, int]:
+    """
+    Valida un chunk ya reclamado con el evaluador por columnas y escribe el
+    resultado con dos UPDATE por conjunto (VALID / INVALID) y un INSERT
+    masivo de errores. No hace commit.
+    """
+    frame = pd.DataFrame.from_records(rows, columns=RULE_COLUMNS)
+    now = datetime.utcnow()
+    matrix = rules.evaluate(frame, today=now.date())
+    invalid = matrix.any(axis=1)
+
+    table = ProductStaging.__table__
+    product_ids = frame["product_id"].to_numpy()
+    for status, ids in (("VALID", product_ids[~invalid]), ("INVALID", product_ids[invalid])):
+        if len(ids):
+            db.execute(
+                update(table)
+                .where(table.c.product_id.in_(ids.tolist()))
+                .values(validation_status=status, validated_at=now)
+            )
+
+    skus = frame["sku"].tolist()
+    import_ids = frame["import_id"].tolist()
+    errores_bulk = [
+        {"sku": skus[i], "import_id": import_ids[i], "error_message": message, "created_at": now}
+        for i, message in rules.errors(matrix)
+    ]
+    if errores_bulk:
+        db.execute(insert(ProductStagingErrors), errores_bulk)
+
+    total_invalidos = int(invalid.sum())
+    return len(frame) - total_invalidos, total_invalidos, len(errores_bulk)
+
+
+def process_pending_products(
+    db: Session, chunk_size: int = VALIDATION_CHUNK_SIZE, max_chunks: int = None, import_id: str = None
+):
+    """
+    Valida los productos PENDING por chunks de `chunk_size`; cada chunk se
+    reclama, valida y confirma en su propia transacción. Devuelve los
+    totales agregados (validados, inválidos, errores).
+    """
     total_validados = 0
     total_invalidos = 0
     total_errores = 0
+    chunks = 0
 
-    # Traer todos los productos pendientes
-    pending_products: List[ProductStaging] = db.query(ProductStaging).filter(
-        ProductStaging.validation_status == "PENDING"
-    ).all()
-
-    errores_bulk: List[ProductStagingErrors] = []
-
-    for product in pending_products:
-        errores_producto = []
-
-        # 1. Campos obligatorios
-        for campo in ["sku", "name", "category", "import_id"]:
-            if not getattr(product, campo):
-                errores_producto.append(f"Campo {campo} obligatorio")
-
-        # 2. Fecha de expiración
-        if product.expiration_date and product.expiration_date < datetime.utcnow().date():
-            errores_producto.append("Producto expirado")
-
-        # 3. Vida útil mínima según categoría
-        if product.min_shelf_life_months is not None:
-            if product.category.lower() == "categoria_a" and product.min_shelf_life_months < 24:
-                errores_producto.append("Producto no cumple mínimo de vida útil (24 meses)")
-            elif product.category.lower() != "categoria_a" and product.min_shelf_life_months < 6:
-                errores_producto.append("Producto no cumple mínimo de vida útil (6 meses)")
-
-        # 4. Cadena de frío
-        if getattr(product, "cold_chain_required", False):
-            if getattr(product, "storage_type", "").lower() not in ["cold", "refrigerated"]:
-                errores_producto.append(
-                    "Producto requiere cadena de frío pero almacenamiento no cumple"
-                )
-
-        # 5. Precio unitario
-        if product.unit_price is None or product.unit_price < 0:
-            errores_producto.append("Precio unitario inválido")
-
-        if errores_producto:
-            product.validation_status = "INVALID"
-            total_invalidos += 1
-
-            for error_msg in errores_producto:
-                error = ProductStagingErrors(
-                    sku=product.sku,
-                    import_id=product.import_id,
-                    error_message=error_msg,
-                    created_at=datetime.utcnow(),
-                )
-                errores_bulk.append(error)
-                total_errores += 1
-        else:
-            product.validation_status = "VALID"
-            total_validados += 1
-
-    # Hacer un solo commit para todos los productos y errores
-    if pending_products:
-        db.bulk_save_objects(pending_products)
-    if errores_bulk:
-        db.bulk_save_objects(errores_bulk)
-    db.commit()
+    while max_chunks is None or chunks < max_chunks:
+        products = claim_pending_chunk(db, chunk_size, import_id)
+        if not products:
+            break
+        validados, invalidos, errores = process_chunk(db, products)
+        db.commit()
+        total_validados += validados
+        total_invalidos += invalidos
+        total_errores += errores
+        chunks += 1
 
     return total_validados, total_invalidos, total_errores
+
+
+def process_pending_products_pushdown(db: Session, rules: CompiledRules = DEFAULT_RULES, import_id: str = None):
+    """
+    Modo pushdown: valida todos los PENDING dentro de la base de datos, sin
+    traer filas a Python. Cada regla es un predicado SQL:
+
+    1. un INSERT ... SELECT por regla escribe sus errores en products_stg_errors;
+    2. un único UPDATE marca VALID/INVALID (CASE sobre el OR de los
+       predicados) y fija validated_at.
+
+    El conjunto se acota al product_id máximo PENDING leído al inicio, para
+    que filas que lleguen a mitad de camino no queden marcadas sin sus
+    errores. Produce los mismos estados y errores que
+    process_pending_products (los errores quedan ordenados por regla y no
+    por producto). No debe correr a la vez que los workers por chunks.
+    """
+    table = ProductStaging.__table__
+    errors_table = ProductStagingErrors.__table__
+    now = datetime.utcnow()
+    predicates = rules.sql_predicates(table, now.date())
+    any_error = or_(*[predicate for _, predicate in predicates])
+
+    pending = table.c.validation_status == "PENDING"
+    if import_id is not None:
+        pending = pending & (table.c.import_id == import_id)
+    high = db.execute(select(func.max(table.c.product_id)).where(pending)).scalar()
+    if high is None:
+        return 0, 0, 0
+    pending = pending & (table.c.product_id <= high)
+
+    total_invalidos = db.execute(
+        select(func.count()).select_from(table).where(pending, any_error)
+    ).scalar()
+
+    total_errores = 0
+    for rule, predicate in predicates:
+        result = db.execute(
+            insert(errors_table).from_select(
+                ["sku", "import_id", "error_message", "created_at"],
+                select(table.c.sku, table.c.import_id, literal(rule.message), literal(now)).where(pending, predicate),
+            )
+        )
+        total_errores += result.rowcount
+
+    result = db.execute(
+        update(table)
+        .where(pending)
+        .values(
+            validation_status=case((any_error, "INVALID"), else_="VALID"),
+            validated_at=now,
+        )
+    )
+    db.commit()
+    return result.rowcount - total_invalidos, total_invalidos, total_errores
+
+
+def _supports_skip_locked(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+def process_pending_products_parallel(
+    session_factory: sessionmaker, workers: int, chunk_size: int = VALIDATION_CHUNK_SIZE, import_id: str = None
+):
+    """
+    Lanza `workers` validadores concurrentes, cada uno con su sesión,
+    reclamando chunks con SKIP LOCKED. Sin SKIP LOCKED (SQLite) corre un
+    solo worker para no procesar filas dos veces.
+    """
+    with session_factory() as probe:
+        if not _supports_skip_locked(probe.get_bind()):
+            workers = 1
+
+    def _worker():
+        with session_factory() as db:
+            return process_pending_products(db, chunk_size, import_id=import_id)
+
+    if workers == 1:
+        return _worker()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="validator") as pool:
+        results = [f.result() for f in [pool.submit(_worker) for _ in range(workers)]]
+    return tuple(sum(values) for values in zip(*results))
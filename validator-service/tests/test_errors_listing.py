@@ -0,0 +1,94 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from app import listing
+from app.models import ProductStagingErrors
+
+IMPORT_A = "00000000-0000-0000-0000-00000000000a"
+IMPORT_B = "00000000-0000-0000-0000-00000000000b"
+
+
+@pytest.fixture
+def errors(db_session: Session):
+    db_session.add_all([
+        ProductStagingErrors(
+            sku=f"ERR-{i}",
+            import_id=IMPORT_A if i < 4 else IMPORT_B,
+            error_message="Precio unitario inválido" if i % 2 else "Producto expirado",
+            created_at=datetime(2026, 1, 1 + i),
+        )
+        for i in range(6)
+    ])
+    db_session.commit()
+
+
+def test_errors_keyset_pagination(client, errors):
+    r1 = client.get("/errors?limit=4")
+    assert r1.status_code == 200
+    body = r1.json()
+    assert [e["sku"] for e in body["errores"]] == [f"ERR-{i}" for i in range(4)]
+    # total sigue siendo el total de errores, no el tamaño de la página
+    assert body["total"] == 6 and body["count"] == 4
+    assert body["next_cursor"] == r1.headers["X-Next-Cursor"]
+
+    r2 = client.get(f"/errors?limit=4&cursor={body['next_cursor']}")
+    assert [e["sku"] for e in r2.json()["errores"]] == ["ERR-4", "ERR-5"]
+    assert r2.json()["total"] == 6 and r2.json()["next_cursor"] is None
+    assert "X-Next-Cursor" not in r2.headers
+
+
+def test_errors_filters(client, errors):
+    body = client.get(f"/errors?import_id={IMPORT_B}").json()
+    assert [e["sku"] for e in body["errores"]] == ["ERR-4", "ERR-5"]
+    assert body["total"] == 2
+
+    body = client.get("/errors?sku=ERR-2").json()
+    assert body["total"] == 1 and body["errores"][0]["import_id"] == IMPORT_A
+
+    body = client.get("/errors?created_from=2026-01-02T00:00:00&created_to=2026-01-04T00:00:00").json()
+    assert [e["sku"] for e in body["errores"]] == ["ERR-1", "ERR-2"]
+
+
+def test_errors_invalid_cursor(client):
+    assert client.get("/errors?cursor=xyz").status_code == 400
+
+
+def test_errors_summary_groups_by_message(client, errors):
+    body = client.get("/errors/summary").json()
+    assert body["total"] == 6
+    assert body["por_mensaje"] == [
+        {"error_message": "Precio unitario inválido", "total": 3},
+        {"error_message": "Producto expirado", "total": 3},
+    ]
+
+    body = client.get(f"/errors/summary?import_id={IMPORT_A}").json()
+    assert {m["error_message"]: m["total"] for m in body["por_mensaje"]} == {
+        "Precio unitario inválido": 2,
+        "Producto expirado": 2,
+    }
+
+
+def test_errors_export_ndjson(client, errors, monkeypatch):
+    # Lotes pequeños para recorrer varias particiones del cursor
+    monkeypatch.setattr(listing, "EXPORT_BATCH_SIZE", 4)
+    resp = client.get("/errors/export")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["sku"] for r in rows] == [f"ERR-{i}" for i in range(6)]
+    assert rows[0]["created_at"] == "2026-01-01T00:00:00"
+
+
+def test_errors_table_has_composite_indexes(db_session: Session):
+    names = {ix["name"] for ix in inspect(db_session.connection()).get_indexes("products_stg_errors")}
+    assert {
+        "ix_products_stg_errors_import_error_id",
+        "ix_products_stg_errors_sku_error_id",
+        "ix_products_stg_errors_created_error_id",
+        "ix_products_stg_errors_import_message",
+    } <= names
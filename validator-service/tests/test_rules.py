@@ -0,0 +1,138 @@
+"""
+Evaluador de reglas por columnas vs. el loop por fila original.
+
+El benchmark de 1M filas no corre por defecto:
+    RUN_BENCHMARKS=1 python -m pytest tests/test_rules.py -s
+"""
+import os
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.rules import DEFAULT_RULES, RULE_COLUMNS, build_default_rules
+
+BENCHMARK_ROWS = 1_000_000
+TODAY = date(2026, 1, 15)
+
+
+def _legacy_validate(product, today):
+    """Copia de las reglas if-chain de process_pending_products antes del motor de reglas."""
+    errores_producto = []
+    for campo in ["sku", "name", "category", "import_id"]:
+        if not getattr(product, campo):
+            errores_producto.append(f"Campo {campo} obligatorio")
+    if product.expiration_date and product.expiration_date < today:
+        errores_producto.append("Producto expirado")
+    if product.min_shelf_life_months is not None:
+        if product.category.lower() == "categoria_a" and product.min_shelf_life_months < 24:
+            errores_producto.append("Producto no cumple mínimo de vida útil (24 meses)")
+        elif product.category.lower() != "categoria_a" and product.min_shelf_life_months < 6:
+            errores_producto.append("Producto no cumple mínimo de vida útil (6 meses)")
+    if getattr(product, "cold_chain_required", False):
+        if getattr(product, "storage_type", "").lower() not in ["cold", "refrigerated"]:
+            errores_producto.append("Producto requiere cadena de frío pero almacenamiento no cumple")
+    if product.unit_price is None or product.unit_price < 0:
+        errores_producto.append("Precio unitario inválido")
+    return errores_producto
+
+
+def _synthetic(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    categories = np.array(["categoria_a", "CATEGORIA_A", "categoria_b", "otra"], dtype=object)
+    storages = np.array(["cold", "Refrigerated", "ambient", "dry"], dtype=object)
+    prices = np.array([Decimal("10.50"), Decimal("-1"), None, Decimal("0")], dtype=object)
+    expiry = np.array([TODAY - timedelta(days=3), TODAY + timedelta(days=90), None], dtype=object)
+    shelf = np.array([3, 12, 30, None], dtype=object)
+    names = np.array(["Producto", "", "Otro"], dtype=object)
+    return pd.DataFrame({
+        "product_id": np.arange(n),
+        "sku": [f"SKU-{i}" for i in range(n)],
+        "name": names[rng.integers(0, 3, n)],
+        "category": categories[rng.integers(0, 4, n)],
+        "import_id": "00000000-0000-0000-0000-000000000001",
+        "expiration_date": expiry[rng.integers(0, 3, n)],
+        "min_shelf_life_months": shelf[rng.integers(0, 4, n)],
+        "cold_chain_required": rng.integers(0, 2, n).astype(bool),
+        "storage_type": storages[rng.integers(0, 4, n)],
+        "unit_price": prices[rng.integers(0, 4, n)],
+    })[RULE_COLUMNS]
+
+
+def _objects(frame: pd.DataFrame):
+    return [SimpleNamespace(**record) for record in frame.to_dict("records")]
+
+
+def test_vectorized_rules_match_legacy_loop():
+    frame = _synthetic(2_000)
+    matrix = DEFAULT_RULES.evaluate(frame, today=TODAY)
+
+    expected = [_legacy_validate(p, TODAY) for p in _objects(frame)]
+    actual = [[] for _ in range(len(frame))]
+    for i, message in DEFAULT_RULES.errors(matrix):
+        actual[i].append(message)
+    assert actual == expected
+
+
+def test_missing_category_and_storage_do_not_crash():
+    frame = pd.DataFrame([{
+        "product_id": 1, "sku": "X", "name": "N", "category": None, "import_id": "i",
+        "expiration_date": None, "min_shelf_life_months": 2, "cold_chain_required": True,
+        "storage_type": None, "unit_price": Decimal("1"),
+    }])[RULE_COLUMNS]
+    matrix = DEFAULT_RULES.evaluate(frame, today=TODAY)
+    assert [m for _, m in DEFAULT_RULES.errors(matrix)] == [
+        "Campo category obligatorio",
+        "Producto no cumple mínimo de vida útil (6 meses)",
+        "Producto requiere cadena de frío pero almacenamiento no cumple",
+    ]
+
+
+def test_category_specific_rule_overrides_default():
+    registry = build_default_rules()
+
+    @registry.rule("shelf_life", "Producto no cumple mínimo de vida útil (36 meses)", category="categoria_c")
+    def _shelf_life_c(b):
+        return b.min_shelf_life_months < 36
+
+    rules = registry.compile()
+    frame = pd.DataFrame([
+        {"product_id": i, "sku": f"S{i}", "name": "N", "category": cat, "import_id": "i",
+         "expiration_date": None, "min_shelf_life_months": 12, "cold_chain_required": False,
+         "storage_type": "dry", "unit_price": Decimal("1")}
+        for i, cat in enumerate(["categoria_c", "Categoria_C", "categoria_b"])
+    ])[RULE_COLUMNS]
+    errors = rules.errors(rules.evaluate(frame, today=TODAY))
+    assert errors == [
+        (0, "Producto no cumple mínimo de vida útil (36 meses)"),
+        (1, "Producto no cumple mínimo de vida útil (36 meses)"),
+    ]
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Benchmark: definir RUN_BENCHMARKS=1")
+def test_benchmark_rules_1m_rows():
+    frame = _synthetic(BENCHMARK_ROWS)
+    objects = _objects(frame)
+
+    start = time.perf_counter()
+    for product in objects:
+        _legacy_validate(product, datetime.utcnow().date())
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = DEFAULT_RULES.evaluate(frame, today=TODAY)
+    matrix_elapsed = time.perf_counter() - start
+    DEFAULT_RULES.errors(matrix)
+    vectorized_elapsed = time.perf_counter() - start
+
+    print(
+        f"\nreglas sobre {BENCHMARK_ROWS} filas: loop {legacy_elapsed:.2f}s "
+        f"({BENCHMARK_ROWS / legacy_elapsed:,.0f} filas/s), matriz {matrix_elapsed:.2f}s, "
+        f"matriz + lista de errores {vectorized_elapsed:.2f}s "
+        f"({BENCHMARK_ROWS / vectorized_elapsed:,.0f} filas/s)"
+    )
+    assert vectorized_elapsed < legacy_elapsed
@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import psycopg
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.models import ProductStaging, ProductStagingErrors
+from app.validator import claim_pending_chunk, process_pending_products, process_pending_products_parallel
+
+
+def _seed(db_session: Session, n: int, prefix: str = "CHK"):
+    db_session.add_all([
+        ProductStaging(
+            sku=f"{prefix}-{i}",
+            name=f"Producto {i}",
+            category="categoria_b",
+            unit_price=-1 if i % 2 else 10,  # impares inválidos
+            expiration_date=date.today() + timedelta(days=30),
+            import_id="00000000-0000-0000-0000-000000000123",
+            validation_status="PENDING",
+        )
+        for i in range(n)
+    ])
+    db_session.commit()
+
+
+def test_validate_processes_in_chunks(client, db_session: Session):
+    _seed(db_session, 5)
+
+    r = client.post("/validate?chunk_size=2")
+    assert r.status_code == 200
+    resumen = r.json()["resumen"]
+    assert resumen["total_pendientes"] == 5
+    assert resumen["total_validados"] == 3
+    assert resumen["total_invalidos"] == 2
+    assert resumen["total_errores"] == 2
+
+    rows = db_session.query(ProductStaging).filter(ProductStaging.sku.like("CHK-%")).all()
+    assert all(p.validation_status in ("VALID", "INVALID") for p in rows)
+    assert all(p.validated_at is not None for p in rows)
+    assert db_session.query(ProductStagingErrors).filter(ProductStagingErrors.sku.like("CHK-%")).count() == 2
+
+
+def test_process_pending_products_respects_max_chunks(db_session: Session):
+    _seed(db_session, 4, prefix="MAX")
+    assert process_pending_products(db_session, chunk_size=1, max_chunks=3)[:2] == (2, 1)
+    pending = db_session.query(ProductStaging).filter(ProductStaging.validation_status == "PENDING").count()
+    assert pending == 1
+
+
+def test_claim_uses_skip_locked_on_postgres(db_session: Session, monkeypatch):
+    # Se compila la sentencia que claim_pending_chunk ejecuta de verdad
+    ejecutadas = []
+    execute = db_session.execute
+
+    def capturar(stmt, *args, **kwargs):
+        ejecutadas.append(stmt)
+        return execute(stmt, *args, **kwargs)
+
+    monkeypatch.setattr(db_session, "execute", capturar)
+    assert claim_pending_chunk(db_session, 10) == []
+    assert claim_pending_chunk(db_session, 10, import_id="00000000-0000-0000-0000-000000000001") == []
+
+    assert len(ejecutadas) == 2
+    for stmt in ejecutadas:
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert sql.rstrip().endswith("FOR UPDATE SKIP LOCKED")
+    # products_stg.import_id es uuid nativo en Postgres: el filtro no puede ser uuid = varchar
+    sql = str(ejecutadas[1].compile(dialect=psycopg.dialect()))
+    assert "products_stg.import_id = %(import_id_1)s::UUID" in sql
+
+
+def test_parallel_falls_back_to_single_worker_on_sqlite(db_session: Session):
+    _seed(db_session, 3, prefix="PAR")
+    factory = sessionmaker(bind=db_session.connection(), autoflush=False, future=True)
+
+    validados, invalidos, errores = process_pending_products_parallel(factory, workers=4, chunk_size=2)
+    assert (validados, invalidos, errores) == (2, 1, 1)
+
+
+def test_validate_scoped_to_import_id(client, db_session: Session):
+    _seed(db_session, 2, prefix="IMP")
+    db_session.add(ProductStaging(
+        sku="OTRA-1", name="Otro", category="categoria_b", unit_price=10,
+        import_id="00000000-0000-0000-0000-000000000999", validation_status="PENDING",
+    ))
+    db_session.commit()
+
+    r = client.post("/validate?import_id=00000000-0000-0000-0000-000000000123")
+    assert r.json()["resumen"]["total_pendientes"] == 2
+    assert db_session.query(ProductStaging).filter_by(sku="OTRA-1").one().validation_status == "PENDING"
@@ -0,0 +1,139 @@
+"""
+Modo pushdown (reglas como SQL) vs. el validador por chunks.
+
+El benchmark de 1M filas no corre por defecto:
+    RUN_BENCHMARKS=1 python -m pytest tests/test_validator_pushdown.py -s
+"""
+import os
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import delete, insert, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import psycopg
+from sqlalchemy.orm import Session
+
+from app.models import ProductStaging, ProductStagingErrors
+from app.rules import DEFAULT_RULES
+from app.validator import process_pending_products, process_pending_products_pushdown
+
+BENCHMARK_ROWS = 1_000_000
+IMPORT_ID = "00000000-0000-0000-0000-000000000456"
+
+
+def _rows(n: int, prefix: str):
+    categories = ["categoria_a", "CATEGORIA_A", "categoria_b", None, ""]
+    storages = ["cold", "Refrigerated", "ambient", None]
+    prices = [10.5, -1, None, 0]
+    expiry = [date.today() - timedelta(days=3), date.today() + timedelta(days=90), None]
+    shelf = [3, 12, 30, None]
+    return [
+        {
+            "sku": f"{prefix}-{i}",
+            "name": "" if i % 7 == 0 else f"Producto {i}",
+            "category": categories[i % 5],
+            "storage_type": storages[i % 4],
+            "unit_price": prices[i % 4],
+            "expiration_date": expiry[i % 3],
+            "min_shelf_life_months": shelf[(i // 3) % 4],
+            "cold_chain_required": bool(i % 2),
+            "import_id": IMPORT_ID,
+            "validation_status": "PENDING",
+        }
+        for i in range(n)
+    ]
+
+
+def _snapshot(db: Session, prefix: str):
+    statuses = dict(
+        db.query(ProductStaging.sku, ProductStaging.validation_status)
+        .filter(ProductStaging.sku.like(f"{prefix}-%"))
+        .all()
+    )
+    errors = Counter(
+        db.query(ProductStagingErrors.sku, ProductStagingErrors.error_message)
+        .filter(ProductStagingErrors.sku.like(f"{prefix}-%"))
+        .all()
+    )
+    return statuses, errors
+
+
+def test_pushdown_matches_chunked_validator(db_session: Session):
+    db_session.execute(insert(ProductStaging), _rows(300, "PSH"))
+    db_session.commit()
+
+    chunked = process_pending_products(db_session, chunk_size=64)
+    expected = _snapshot(db_session, "PSH")
+
+    db_session.execute(update(ProductStaging).values(validation_status="PENDING", validated_at=None))
+    db_session.execute(delete(ProductStagingErrors))
+    db_session.commit()
+
+    assert process_pending_products_pushdown(db_session) == chunked
+    assert _snapshot(db_session, "PSH") == expected
+    assert db_session.query(ProductStaging).filter(ProductStaging.validated_at.is_(None)).count() == 0
+
+
+def test_pushdown_without_pending_rows(db_session: Session):
+    assert process_pending_products_pushdown(db_session) == (0, 0, 0)
+
+
+def test_validate_endpoint_pushdown_mode(client, db_session: Session):
+    db_session.execute(insert(ProductStaging), _rows(10, "EPP"))
+    db_session.commit()
+
+    r = client.post("/validate?mode=pushdown")
+    assert r.status_code == 200
+    resumen = r.json()["resumen"]
+    assert resumen["total_pendientes"] == 10
+    assert resumen["total_validados"] + resumen["total_invalidos"] == 10
+
+    assert client.post("/validate?mode=turbo").status_code == 400
+
+
+def test_pushdown_import_id_compara_como_uuid(db_session: Session, monkeypatch):
+    db_session.execute(insert(ProductStaging), _rows(3, "UID"))
+    db_session.commit()
+    ejecutadas = []
+    execute = db_session.execute
+
+    def capturar(stmt, *args, **kwargs):
+        ejecutadas.append(stmt)
+        return execute(stmt, *args, **kwargs)
+
+    monkeypatch.setattr(db_session, "execute", capturar)
+    assert sum(process_pending_products_pushdown(db_session, import_id=IMPORT_ID)[:2]) == 3
+
+    filtros = [str(stmt.compile(dialect=psycopg.dialect())) for stmt in ejecutadas]
+    assert all("products_stg.import_id = %(import_id_1)s::UUID" in sql for sql in filtros)
+
+
+def test_sql_predicates_compile_for_postgres():
+    predicates = DEFAULT_RULES.sql_predicates(ProductStaging.__table__, date(2026, 1, 15))
+    assert [rule.name for rule, _ in predicates] == [rule.name for rule in DEFAULT_RULES.rules]
+
+    sql = [str(p.compile(dialect=postgresql.dialect())) for _, p in predicates]
+    assert "lower(products_stg.category) = " in sql[5]
+    assert "NOT IN" in sql[6]  # regla por defecto excluye categoria_a
+
+    # import_id es uuid en Postgres: solo IS NULL, sin comparar contra ''
+    requeridos = {rule.name: str(p.compile(dialect=psycopg.dialect())) for rule, p in predicates[:4]}
+    assert requeridos["required_import_id"] == "products_stg.import_id IS NULL"
+    assert requeridos["required_sku"] == (
+        "products_stg.sku IS NULL OR products_stg.sku = %(sku_1)s::VARCHAR"
+    )
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="Benchmark: definir RUN_BENCHMARKS=1")
+def test_benchmark_pushdown_1m_rows(db_session: Session):
+    db_session.execute(insert(ProductStaging), _rows(BENCHMARK_ROWS, "BMK"))
+    db_session.commit()
+
+    start = time.perf_counter()
+    validados, invalidos, _ = process_pending_products_pushdown(db_session)
+    elapsed = time.perf_counter() - start
+
+    print(f"\npushdown sobre {BENCHMARK_ROWS} filas: {elapsed:.2f}s ({BENCHMARK_ROWS / elapsed:,.0f} filas/s)")
+    assert validados + invalidos == BENCHMARK_ROWS